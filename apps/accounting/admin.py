@@ -1,15 +1,22 @@
 from django.contrib import admin
 from .models import (
-    AuditLog, BalanceSheet, BankPaymentLine, BankProfile, BankReceiptLine,
+    AccountBalance, AuditLog, BalanceSheet, BankPaymentLine, BankProfile, BankReceiptLine,
     BankStatement, CapitalContribution, CashFlowForecast, CashPaymentLine,
     CashReceiptLine, CashTransaction, Currency, Customer, DeferredExpense,
-    DeferredRevenue, FixedAsset, LedgerEntry, ModulePermission, PeriodLock,
+    DeferredRevenue, ExchangeRate, FixedAsset, LedgerEntry, ModulePermission, PeriodLock,
     ProfitLossReport, ReconciliationEntry, ReconciliationMatch, ReconciliationRecord,
     Shareholding, Stakeholder, TaxRate, TaxSummary, TaxTransaction, Theme,
     TrialBalance, UserEntity, UserThemePreference, VendorInvoice, VendorPayment, Vendor
 )
 
 
+@admin.register(AccountBalance)
+class AccountBalanceAdmin(admin.ModelAdmin):
+    list_display = ('account_code', 'period', 'total_debits', 'total_credits', 'balance')
+    list_filter = ('period',)
+    search_fields = ('account_code',)
+
+
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ('action', 'entity_type', 'entity_id', 'user', 'timestamp')
@@ -91,6 +98,7 @@ class CurrencyAdmin(admin.ModelAdmin):
     list_display = ('code', 'name', 'symbol', 'exchange_rate', 'is_base_currency')
     list_filter = ('is_base_currency',)
     search_fields = ('code', 'name')
+    readonly_fields = ('exchange_rate',)
 
 
 @admin.register(Customer)
@@ -114,6 +122,13 @@ class DeferredRevenueAdmin(admin.ModelAdmin):
     search_fields = ('description',)
 
 
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ('currency', 'rate', 'effective_date', 'source')
+    list_filter = ('currency', 'effective_date')
+    search_fields = ('currency',)
+
+
 @admin.register(FixedAsset)
 class FixedAssetAdmin(admin.ModelAdmin):
     list_display = ('asset_code', 'asset_name', 'asset_type', 'purchase_date', 'purchase_cost')
@@ -157,8 +172,8 @@ class ReconciliationEntryAdmin(admin.ModelAdmin):
 
 @admin.register(ReconciliationMatch)
 class ReconciliationMatchAdmin(admin.ModelAdmin):
-    list_display = ('match_date', 'system_entry', 'bank_entry', 'matched_amount', 'is_matched')
-    list_filter = ('is_matched', 'match_date')
+    list_display = ('match_date', 'system_entry', 'system_type', 'bank_entry', 'matched_amount', 'is_matched')
+    list_filter = ('is_matched', 'system_type', 'match_date')
 
 
 @admin.register(ReconciliationRecord)
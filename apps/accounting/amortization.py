@@ -0,0 +1,156 @@
+"""
+Deferred revenue and deferred expense amortization.
+
+Each run recognizes every month a deferral is due for up to the run's period:
+from the month after the last one amortized (or its start month) through the
+period, so a missed month is caught up by the next run. That is the monthly
+amount per month due, or everything that remains once only rounding residue
+would be left over. Per schedule, recognition totals come from one aggregate
+and remaining_amount is reduced by one UPDATE; the journal for both schedules
+is posted, dated at the period end, in a single transaction.
+
+Runs are incremental per period. Rows record the last period end they were
+amortized for, so a rerun only picks up deferrals added since, and each rerun
+numbers its journal entries with its own run sequence number.
+"""
+
+import logging
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from .balances import ZERO, month_end
+from .models import DeferredExpense, DeferredRevenue, LedgerEntry
+from .posting import post_entries, run_prefix
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AMORTIZATION_ACCOUNTS = {
+    'deferred_revenue': '2400',
+    'revenue': '4100',
+    'prepaid_expense': '1400',
+    'expense': '6200',
+}
+
+AMOUNT = DecimalField(max_digits=15, decimal_places=2)
+
+CENT = Decimal('0.01')
+
+Schedule = namedtuple('Schedule', 'model start_field months_field last_field debit_account credit_account')
+
+SCHEDULES = {
+    'REV': Schedule(DeferredRevenue, 'recognition_start_date', 'recognition_period_months', 'last_recognized_date',
+                    'deferred_revenue', 'revenue'),
+    'EXP': Schedule(DeferredExpense, 'amortization_start_date', 'deferral_period_months', 'last_amortized_date',
+                    'expense', 'prepaid_expense'),
+}
+
+
+def open_deferrals(schedule, end):
+    """Deferrals started by `end` with an amount left and not yet amortized for that period"""
+    return (
+        schedule.model.objects
+        .filter(**{f'{schedule.start_field}__lte': end, 'remaining_amount__gt': 0})
+        .filter(Q(**{f'{schedule.last_field}__isnull': True}) | Q(**{f'{schedule.last_field}__lt': end}))
+    )
+
+
+def month_index(value):
+    """Months since year zero, for a date or a date field name"""
+    if isinstance(value, str):
+        return ExtractYear(value) * 12 + ExtractMonth(value)
+    return value.year * 12 + value.month
+
+
+def months_due(schedule, end):
+    """Expression for the number of months a deferral row is due for through the period ending `end`"""
+    return Case(
+        When(**{f'{schedule.last_field}__isnull': True},
+             then=Value(month_index(end) + 1) - month_index(schedule.start_field)),
+        default=Value(month_index(end)) - month_index(schedule.last_field),
+        output_field=IntegerField(),
+    )
+
+
+def recognition(schedule, end):
+    """Expression for the amount recognized on a deferral row by a run for the period ending `end`"""
+    due = F('monthly_amount') * months_due(schedule, end)
+    # A rounded monthly amount leaves at most a cent per month behind; sweep it into the final period.
+    residue = F(schedule.months_field) * Value(CENT)
+    return Case(
+        When(remaining_amount__lte=due + residue, then=F('remaining_amount')),
+        default=due,
+        output_field=AMOUNT,
+    )
+
+
+def journal_entries(end, code, schedule, amount):
+    accounts = getattr(settings, 'AMORTIZATION_ACCOUNTS', DEFAULT_AMORTIZATION_ACCOUNTS)
+    label = schedule.model._meta.verbose_name.title()
+    reference = f'AMORTIZATION-{end:%Y-%m}'
+    prefix = run_prefix(f'AMR-{code}-{end:%Y%m}', reference)
+    return [
+        LedgerEntry(
+            entry_number=f'{prefix}-{suffix}',
+            account_code=accounts[account],
+            entry_type=entry_type,
+            amount=amount,
+            entry_date=end,
+            reference_document=reference,
+            description=f'{label} amortization for {end:%B %Y}',
+        )
+        for suffix, account, entry_type in (
+            ('DR', schedule.debit_account, 'DEBIT'),
+            ('CR', schedule.credit_account, 'CREDIT'),
+        )
+    ]
+
+
+def run_amortization(period_date, dry_run=False):
+    """Amortize all open deferrals for the month containing period_date and post the journal"""
+    end = month_end(period_date)
+    timings = {}
+    started = time.perf_counter()
+    result = {'period_end': end, 'dry_run': dry_run, 'schedules': {}}
+    entries = []
+
+    with transaction.atomic():
+        pending = []
+        for code, schedule in SCHEDULES.items():
+            step = time.perf_counter()
+            deferrals = open_deferrals(schedule, end)
+            totals = deferrals.aggregate(rows=Count('id'), amount=Sum(recognition(schedule, end)))
+            amount = Decimal(totals['amount'] or 0).quantize(CENT)
+            timings[f'{code.lower()}_aggregate_ms'] = (time.perf_counter() - step) * 1000
+            result['schedules'][code] = {'deferrals': totals['rows'], 'amount': str(amount)}
+            if totals['rows']:
+                pending.append((code, schedule, deferrals))
+                if amount:
+                    entries.extend(journal_entries(end, code, schedule, amount))
+
+        if not dry_run and pending:
+            for code, schedule, deferrals in pending:
+                step = time.perf_counter()
+                deferrals.update(**{
+                    'remaining_amount': F('remaining_amount') - recognition(schedule, end),
+                    schedule.last_field: end,
+                })
+                timings[f'{code.lower()}_update_ms'] = (time.perf_counter() - step) * 1000
+            step = time.perf_counter()
+            post_entries(entries)
+            timings['post_ms'] = (time.perf_counter() - step) * 1000
+
+    timings['total_ms'] = (time.perf_counter() - started) * 1000
+    result['entries'] = len(entries)
+    result['timings'] = {name: round(value, 2) for name, value in timings.items()}
+    logger.info(
+        'Amortization for %s: %s entries in %.1fms (%s)',
+        end, len(entries), timings['total_ms'],
+        ', '.join(f'{name}={value:.1f}' for name, value in timings.items()),
+    )
+    return result
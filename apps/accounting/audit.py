@@ -0,0 +1,279 @@
+"""
+Asynchronous, batched audit trail for accounting models.
+
+Model signals turn each committed create, update or delete into an audit
+record. Records go onto a bounded in-process queue and a background thread
+writes them with bulk_create, so requests never wait on an AuditLog insert.
+
+With AUDIT_LOG_MODE = 'celery' records skip the in-process queue and are
+handed to a Celery task as soon as their transaction commits, so they wait in
+redis rather than in memory. When the queue is full the caller writes the
+backlog itself rather than dropping records. A failed insert keeps its records
+for a retry on the next flush. At exit the flusher thread is stopped after
+writing the batch it holds, and whatever is still queued is written.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# Queued by stop() to let the flusher thread finish its batch and exit.
+_STOP = object()
+
+STATUS_ACTIONS = {
+    'APPROVED': 'APPROVE',
+    'REJECTED': 'REJECT',
+}
+
+_current_request = ContextVar('audit_request', default=None)
+
+
+class AuditContextMiddleware:
+    """Expose the current request to audit signal handlers"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+
+def _actor():
+    """Return (user, ip_address) for the request being served, if any"""
+    request = _current_request.get()
+    if request is None:
+        return 'system', None
+    # DRF authenticates inside the view and copies the user onto the Django request.
+    user = getattr(request, 'user', None)
+    username = user.get_username() if user is not None and user.is_authenticated else 'anonymous'
+    return username, request.META.get('REMOTE_ADDR')
+
+
+def field_values(instance):
+    """Concrete field values currently loaded on an instance, keyed by attname"""
+    loaded = instance.__dict__
+    return {
+        field.attname: loaded[field.attname]
+        for field in instance._meta.concrete_fields
+        if field.attname in loaded
+    }
+
+
+def to_json(values):
+    return json.loads(json.dumps(values, cls=DjangoJSONEncoder))
+
+
+def build_record(action, instance, old_value=None, new_value=None):
+    user, ip_address = _actor()
+    return {
+        'action': action,
+        'entity_type': instance._meta.label,
+        'entity_id': instance.pk,
+        'user': user,
+        'old_value': to_json(old_value) if old_value is not None else None,
+        'new_value': to_json(new_value) if new_value is not None else None,
+        'ip_address': ip_address,
+    }
+
+
+def change_record(instance, created):
+    """Build the audit record for a saved instance, or None if nothing changed"""
+    current = field_values(instance)
+    if created:
+        return build_record('CREATE', instance, new_value=current)
+
+    loaded = getattr(instance, '_audit_loaded', None) or {}
+    changed = [name for name, value in current.items() if name in loaded and loaded[name] != value]
+    if loaded and not changed:
+        return None
+    if not loaded:
+        changed = list(current)
+    action = 'UPDATE'
+    if 'status' in changed:
+        action = STATUS_ACTIONS.get(current['status'], action)
+    return build_record(
+        action,
+        instance,
+        old_value={name: loaded[name] for name in changed if name in loaded} or None,
+        new_value={name: current[name] for name in changed},
+    )
+
+
+def write_records(records):
+    """Insert audit records in bulk"""
+    AuditLog.objects.bulk_create(
+        [AuditLog(**record) for record in records],
+        batch_size=settings.AUDIT_LOG_BATCH_SIZE,
+    )
+
+
+class AuditLogWriter:
+    """Bounded queue of audit records drained by a background flusher thread"""
+
+    def __init__(self, batch_size=None, flush_interval=None, max_queue=None):
+        self.batch_size = batch_size or settings.AUDIT_LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.AUDIT_LOG_FLUSH_INTERVAL
+        self.max_queue = max_queue or settings.AUDIT_LOG_MAX_QUEUE
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._failed = []
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Restart after fork: threads do not survive into prefork worker processes.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, record):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            logger.warning('Audit queue full, writing backlog synchronously')
+            self._write(self._drain() + [record])
+
+    def _drain(self, limit=None):
+        records = []
+        while limit is None or len(records) < limit:
+            try:
+                record = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is not _STOP:
+                records.append(record)
+        return records
+
+    def _run(self):
+        while True:
+            try:
+                # Failed records are retried every flush interval even when nothing new arrives.
+                first = self._queue.get(timeout=self.flush_interval if self._failed else None)
+            except queue.Empty:
+                self._write([])
+                continue
+            if first is _STOP:
+                self._write([])
+                return
+            records = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(records) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    self._write(records)
+                    return
+                records.append(record)
+            self._write(records)
+            close_old_connections()
+
+    def _write(self, records):
+        """Write records together with earlier failures; keep them for a retry if the insert fails"""
+        with self._lock:
+            records, self._failed = self._failed + records, []
+        if not records:
+            return
+        try:
+            write_records(records)
+        except Exception:
+            logger.exception('Failed to write %d audit records, keeping them for a retry', len(records))
+            close_old_connections()
+            overflow = records[:-self.max_queue]
+            with self._lock:
+                self._failed = records[-self.max_queue:] + self._failed
+            if overflow:
+                _log_lost(overflow)
+
+    def flush(self):
+        """Write everything still queued in the calling thread"""
+        while True:
+            records = self._drain(self.batch_size)
+            if not records and not self._failed:
+                return
+            self._write(records)
+            if self._failed:
+                _log_lost(self._failed)
+                self._failed = []
+                return
+
+    def stop(self, timeout=None):
+        """Let the flusher thread write the batch it holds, then flush what is left; used at exit"""
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            try:
+                self._queue.put(_STOP, timeout=timeout or self.flush_interval)
+            except queue.Full:
+                pass
+            thread.join(timeout or self.flush_interval * 5)
+        self.flush()
+
+
+def _log_lost(records):
+    """Last resort when the database keeps refusing records: put them in the error log in full"""
+    for entry in records:
+        logger.error('Unwritten audit record: %s', json.dumps(entry, cls=DjangoJSONEncoder))
+
+
+def _dispatch(records):
+    """Hand records to the Celery task, writing them directly if the broker is unreachable"""
+    from .tasks import write_audit_logs
+    for start in range(0, len(records), settings.AUDIT_LOG_BATCH_SIZE):
+        batch = records[start:start + settings.AUDIT_LOG_BATCH_SIZE]
+        try:
+            write_audit_logs.delay(batch)
+        except Exception:
+            logger.exception('Could not queue %d audit records, writing them directly', len(batch))
+            write_records(batch)
+
+
+writer = AuditLogWriter()
+atexit.register(writer.stop)
+
+
+def record(entry):
+    """Queue an audit record once the surrounding transaction commits"""
+    mode = settings.AUDIT_LOG_MODE
+    if mode == 'off':
+        return
+    if mode == 'celery':
+        transaction.on_commit(lambda: _dispatch([entry]))
+    else:
+        transaction.on_commit(lambda: writer.enqueue(entry))
+
+
+def record_created(instances):
+    """Audit instances created with bulk_create, which sends no signals"""
+    if settings.AUDIT_LOG_MODE == 'celery':
+        entries = [change_record(instance, created=True) for instance in instances]
+        transaction.on_commit(lambda: _dispatch(entries))
+        return
+    for instance in instances:
+        record(change_record(instance, created=True))
@@ -0,0 +1,242 @@
+"""
+Materialized general-ledger balances.
+
+AccountBalance keeps one row per account and month with the period's debit
+and credit totals and the running balance at the end of the period. Rows are
+maintained incrementally as LedgerEntry rows are posted, so trial balances and
+financial statements are computed from a number of rows proportional to the
+chart of accounts instead of the whole ledger.
+
+Posting locks each touched account before reading or creating its rows (a
+transaction-scoped advisory lock on PostgreSQL, the account's rows in period
+order elsewhere), taking accounts in code order. Two postings to one account
+are therefore applied one after the other: a month created by one always sees
+the running-balance UPDATE of the other, so opening balances never miss a
+concurrent delta.
+"""
+
+from calendar import monthrange
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils.dateparse import parse_date
+
+from .models import AccountBalance, LedgerEntry
+
+ZERO = Decimal('0.00')
+
+# First key of the (namespace, account) advisory lock taken while posting.
+BALANCE_LOCK_NAMESPACE = 4201
+
+# Account classification by leading digit(s) of the account code. Override with
+# ACCOUNT_TYPE_PREFIXES in settings for a different chart of accounts.
+DEFAULT_ACCOUNT_TYPE_PREFIXES = {
+    '1': 'ASSET',
+    '2': 'LIABILITY',
+    '3': 'EQUITY',
+    '4': 'REVENUE',
+    '5': 'EXPENSE',
+    '6': 'EXPENSE',
+    '7': 'NON_OPERATING',
+    '8': 'NON_OPERATING',
+    '9': 'NON_OPERATING',
+}
+
+PROFIT_AND_LOSS_TYPES = ('REVENUE', 'EXPENSE', 'NON_OPERATING')
+
+
+def month_start(value):
+    """Return the first day of the month for a date (or YYYY-MM-DD string)"""
+    if isinstance(value, str):
+        value = parse_date(value)
+    return value.replace(day=1)
+
+
+def month_end(value):
+    """Return the last day of the month for a date"""
+    return value.replace(day=monthrange(value.year, value.month)[1])
+
+
+def account_type(account_code):
+    """Classify an account code using the longest matching prefix"""
+    prefixes = getattr(settings, 'ACCOUNT_TYPE_PREFIXES', DEFAULT_ACCOUNT_TYPE_PREFIXES)
+    for length in range(len(account_code), 0, -1):
+        account_kind = prefixes.get(account_code[:length])
+        if account_kind:
+            return account_kind
+    return 'ASSET'
+
+
+def entry_amount(entry_type):
+    """Expression yielding the entry amount for one side of the ledger, zero otherwise"""
+    return Case(
+        When(entry_type=entry_type, then=F('amount')),
+        default=Value(ZERO),
+        output_field=DecimalField(max_digits=15, decimal_places=2),
+    )
+
+
+def _lock_account(account_code):
+    """Serialize balance maintenance for one account until the transaction ends"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, hashtext(%s))', [BALANCE_LOCK_NAMESPACE, account_code])
+        return
+    list(
+        AccountBalance.objects
+        .select_for_update()
+        .filter(account_code=account_code)
+        .order_by('period')
+        .values_list('pk', flat=True)
+    )
+
+
+def _ensure_period(account_code, period):
+    """Create the balance row for a period, carrying the previous running balance"""
+    if AccountBalance.objects.filter(account_code=account_code, period=period).exists():
+        return
+    opening = (
+        AccountBalance.objects
+        .filter(account_code=account_code, period__lt=period)
+        .order_by('-period')
+        .values_list('balance', flat=True)
+        .first()
+    )
+    AccountBalance.objects.get_or_create(
+        account_code=account_code,
+        period=period,
+        defaults={'balance': opening or ZERO},
+    )
+
+
+def apply_entries(entries, sign=1):
+    """
+    Apply ledger entries to the balance table.
+
+    Entries are collapsed to one delta per (account, period) first, so posting
+    a batch costs a handful of queries per touched account rather than per
+    entry. Use sign=-1 to reverse previously applied entries.
+    """
+    deltas = defaultdict(lambda: [ZERO, ZERO])
+    for entry in entries:
+        key = (entry.account_code, month_start(entry.entry_date))
+        amount = Decimal(entry.amount) * sign
+        if entry.entry_type == 'DEBIT':
+            deltas[key][0] += amount
+        else:
+            deltas[key][1] += amount
+
+    with transaction.atomic():
+        locked = set()
+        for (account_code, period), (debits, credits) in sorted(deltas.items()):
+            if account_code not in locked:
+                _lock_account(account_code)
+                locked.add(account_code)
+            _ensure_period(account_code, period)
+            AccountBalance.objects.filter(account_code=account_code, period=period).update(
+                total_debits=F('total_debits') + debits,
+                total_credits=F('total_credits') + credits,
+            )
+            AccountBalance.objects.filter(account_code=account_code, period__gte=period).update(
+                balance=F('balance') + (debits - credits),
+            )
+
+
+def rebuild_balances(batch_size=1000):
+    """Recompute the whole balance table from raw ledger entries"""
+    totals = (
+        LedgerEntry.objects
+        .annotate(period=TruncMonth('entry_date'))
+        .values('account_code', 'period')
+        .annotate(debits=Sum(entry_amount('DEBIT')), credits=Sum(entry_amount('CREDIT')))
+        .order_by('account_code', 'period')
+    )
+
+    rows = []
+    current_account = None
+    running = ZERO
+    for row in totals.iterator():
+        if row['account_code'] != current_account:
+            current_account = row['account_code']
+            running = ZERO
+        running += row['debits'] - row['credits']
+        rows.append(AccountBalance(
+            account_code=row['account_code'],
+            period=row['period'],
+            total_debits=row['debits'],
+            total_credits=row['credits'],
+            balance=running,
+        ))
+
+    with transaction.atomic():
+        AccountBalance.objects.all().delete()
+        AccountBalance.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def closing_balances(period_date):
+    """Running balance per account as of the month containing period_date"""
+    latest_period = (
+        AccountBalance.objects
+        .filter(account_code=OuterRef('account_code'), period__lte=month_start(period_date))
+        .order_by('-period')
+        .values('period')[:1]
+    )
+    return dict(
+        AccountBalance.objects
+        .filter(period=Subquery(latest_period))
+        .values_list('account_code', 'balance')
+    )
+
+
+def period_activity(period_start, period_end):
+    """Net movement (debits - credits) per account for the months in a range"""
+    rows = (
+        AccountBalance.objects
+        .filter(period__gte=month_start(period_start), period__lte=month_start(period_end))
+        .values('account_code')
+        .annotate(debits=Sum('total_debits'), credits=Sum('total_credits'))
+    )
+    return {row['account_code']: row['debits'] - row['credits'] for row in rows}
+
+
+def ledger_activity(period_start, period_end):
+    """Net movement (debits - credits) per account from ledger entries dated within a range"""
+    rows = (
+        LedgerEntry.objects
+        .filter(entry_date__gte=period_start, entry_date__lte=period_end)
+        .values('account_code')
+        .annotate(debits=Sum(entry_amount('DEBIT')), credits=Sum(entry_amount('CREDIT')))
+        .order_by()
+    )
+    return {row['account_code']: row['debits'] - row['credits'] for row in rows}
+
+
+def activity(period_start, period_end):
+    """Net movement per account dated within a range: stored months where whole, the ledger for partial months"""
+    first = period_start if period_start.day == 1 else month_end(period_start) + timedelta(days=1)
+    last = period_end if period_end == month_end(period_end) else month_start(period_end) - timedelta(days=1)
+    if first > last:
+        return ledger_activity(period_start, period_end)
+    totals = period_activity(first, last)
+    for start, end in ((period_start, first - timedelta(days=1)), (last + timedelta(days=1), period_end)):
+        if start <= end:
+            for account_code, amount in ledger_activity(start, end).items():
+                totals[account_code] = totals.get(account_code, ZERO) + amount
+    return totals
+
+
+def balances_at(day):
+    """Running balance per account at the end of a day: stored months plus the ledger for a partial month"""
+    if day == month_end(day):
+        return closing_balances(day)
+    period = month_start(day)
+    totals = closing_balances(period - timedelta(days=1))
+    for account_code, amount in ledger_activity(period, day).items():
+        totals[account_code] = totals.get(account_code, ZERO) + amount
+    return totals
@@ -0,0 +1,121 @@
+"""
+Monthly fixed-asset depreciation run.
+
+The charge for every asset is computed by the database as one expression
+(straight-line or declining-balance, capped at the remaining depreciable
+amount), so a run is one grouped aggregate for the journal totals and one
+UPDATE of accumulated_depreciation, whatever the number of assets.
+
+Charges are posted as one debit to depreciation expense and one credit to
+accumulated depreciation per asset type. An asset is depreciated at most once
+per period: last_depreciation_date records the period end it was charged for,
+so rerunning a period only charges assets added since the last run. Each run
+of a period numbers its entries with the run's sequence number, so reruns post
+alongside the earlier journal.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Least, Round
+
+from .balances import ZERO, month_end
+from .models import FixedAsset, LedgerEntry
+from .posting import post_entries, run_prefix
+
+DEFAULT_DEPRECIATION_ACCOUNTS = {
+    'expense': '6100',
+    'accumulated': '1590',
+}
+
+# Double-declining balance unless overridden.
+DEFAULT_DECLINING_BALANCE_FACTOR = Decimal('2')
+
+AMOUNT = DecimalField(max_digits=15, decimal_places=2)
+
+
+def depreciation_charge():
+    """Expression for one month of depreciation on a FixedAsset row"""
+    factor = getattr(settings, 'DECLINING_BALANCE_FACTOR', DEFAULT_DECLINING_BALANCE_FACTOR)
+    months = F('useful_life_years') * 12
+    remaining = F('purchase_cost') - F('salvage_value') - F('accumulated_depreciation')
+    monthly = Case(
+        When(
+            depreciation_method='DECLINING_BALANCE',
+            then=(F('purchase_cost') - F('accumulated_depreciation')) * Value(factor) / months,
+        ),
+        default=(F('purchase_cost') - F('salvage_value')) / months,
+        output_field=AMOUNT,
+    )
+    return Round(Least(monthly, remaining, output_field=AMOUNT), 2, output_field=AMOUNT)
+
+
+def depreciable_assets(end):
+    """Assets in service by `end` with value left to depreciate and not yet charged for that period"""
+    return (
+        FixedAsset.objects
+        .filter(purchase_date__lte=end)
+        .filter(accumulated_depreciation__lt=F('purchase_cost') - F('salvage_value'))
+        .filter(Q(last_depreciation_date__isnull=True) | Q(last_depreciation_date__lt=end))
+    )
+
+
+def journal_entries(end, totals):
+    accounts = getattr(settings, 'DEPRECIATION_ACCOUNTS', DEFAULT_DEPRECIATION_ACCOUNTS)
+    reference = f'DEPRECIATION-{end:%Y-%m}'
+    prefix = run_prefix(f'DEP-{end:%Y%m}', reference) if totals else None
+    entries = []
+    for asset_type, amount in totals.items():
+        for suffix, account_code, entry_type in (
+            ('DR', accounts['expense'], 'DEBIT'),
+            ('CR', accounts['accumulated'], 'CREDIT'),
+        ):
+            entries.append(LedgerEntry(
+                entry_number=f'{prefix}-{asset_type}-{suffix}',
+                account_code=account_code,
+                entry_type=entry_type,
+                amount=amount,
+                entry_date=end,
+                reference_document=reference,
+                description=f'{asset_type.title()} depreciation for {end:%B %Y}',
+            ))
+    return entries
+
+
+def run_depreciation(period_date, dry_run=False):
+    """Depreciate all assets for the month containing period_date and post the journal"""
+    end = month_end(period_date)
+    with transaction.atomic():
+        assets = depreciable_assets(end)
+        charge = depreciation_charge()
+        rows = (
+            assets
+            .values('asset_type')
+            .annotate(assets=Count('id'), amount=Sum(charge))
+            .order_by('asset_type')
+        )
+        totals = {}
+        asset_count = 0
+        for row in rows:
+            asset_count += row['assets']
+            if row['amount']:
+                totals[row['asset_type']] = Decimal(row['amount']).quantize(Decimal('0.01'))
+
+        entries = journal_entries(end, totals)
+        if not dry_run and asset_count:
+            assets.update(
+                accumulated_depreciation=F('accumulated_depreciation') + charge,
+                last_depreciation_date=end,
+            )
+            post_entries(entries)
+
+    return {
+        'period_end': end,
+        'assets': asset_count,
+        'total_depreciation': str(sum(totals.values(), ZERO)),
+        'by_asset_type': {asset_type: str(amount) for asset_type, amount in totals.items()},
+        'entries': len(entries),
+        'dry_run': dry_run,
+    }
@@ -0,0 +1,209 @@
+"""
+Profit & loss and balance sheet builders.
+
+Finalizing a locked month stores its P&L and closing balance sheet as
+FINALIZED rows that can no longer change. Statements for any range are then
+built incrementally: the P&L sums the longest run of finalized snapshots inside
+the range and the balance sheet starts from the latest finalized snapshot. The
+days the snapshots do not cover come from the monthly AccountBalance rows for
+whole months, and only partial months are read from the ledger. A year-to-date
+P&L in a year whose closed months are finalized reads a dozen snapshot rows
+plus the current month's entries; without snapshots it reads one balance row
+per account and month instead of the whole ledger.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .balances import PROFIT_AND_LOSS_TYPES, ZERO, account_type, activity, balances_at, month_end, month_start
+from .models import BalanceSheet, ProfitLossReport
+from .period_locks import calendar
+
+FINALIZED_STATUSES = ('FINALIZED', 'CLOSED')
+PROFIT_LOSS_FIGURES = ('period_start', 'period_end', 'total_revenue', 'total_expenses', 'operating_profit', 'net_profit')
+BALANCE_SHEET_FIGURES = ('period_start', 'period_end', 'total_assets', 'total_liabilities', 'total_equity')
+
+ONE_DAY = timedelta(days=1)
+CENT = Decimal('0.01')
+
+
+class SnapshotFinalizedError(ValidationError):
+    """Raised when a finalized statement snapshot would be changed or deleted"""
+
+
+def type_delta(*ranges):
+    """Net movement (debits - credits) per account type for entries dated within any (start, end) range"""
+    totals = defaultdict(lambda: ZERO)
+    for start, end in ranges:
+        amounts = balances_at(end) if start is None else activity(start, end)
+        for account_code, amount in amounts.items():
+            totals[account_type(account_code)] += amount
+    return totals
+
+
+def _snapshot_chain(period_start, period_end):
+    """Longest run of contiguous finalized P&L snapshots inside the range"""
+    snapshots = (
+        ProfitLossReport.objects
+        .filter(status='FINALIZED', period_start__gte=period_start, period_end__lte=period_end)
+        .order_by('period_start', '-period_end')
+        .values_list('period_start', 'period_end', 'total_revenue', 'total_expenses', 'operating_profit', 'net_profit')
+    )
+    best, chain = [], []
+    for snapshot in snapshots:
+        if chain and snapshot[0] <= chain[-1][1]:
+            continue
+        if chain and snapshot[0] != chain[-1][1] + ONE_DAY:
+            best, chain = max(best, chain, key=len), []
+        chain.append(snapshot)
+    return max(best, chain, key=len)
+
+
+def profit_loss(period_start, period_end):
+    """P&L figures for a range from finalized snapshots plus account balances for the days they do not cover"""
+    chain = _snapshot_chain(period_start, period_end)
+    revenue = expenses = non_operating = ZERO
+    for _, _, total_revenue, total_expenses, operating_profit, net_profit in chain:
+        revenue += total_revenue
+        expenses += total_expenses
+        non_operating += operating_profit - net_profit
+
+    if chain:
+        gaps = [(period_start, chain[0][0] - ONE_DAY), (chain[-1][1] + ONE_DAY, period_end)]
+    else:
+        gaps = [(period_start, period_end)]
+    gaps = [(start, end) for start, end in gaps if start <= end]
+    if gaps:
+        delta = type_delta(*gaps)
+        revenue -= delta['REVENUE']
+        expenses += delta['EXPENSE']
+        non_operating += delta['NON_OPERATING']
+
+    operating_profit = revenue - expenses
+    return {
+        'period_start': period_start,
+        'period_end': period_end,
+        'total_revenue': revenue.quantize(CENT),
+        'total_expenses': expenses.quantize(CENT),
+        'operating_profit': operating_profit.quantize(CENT),
+        'net_profit': (operating_profit - non_operating).quantize(CENT),
+        'snapshots': len(chain),
+        'ledger_ranges': gaps,
+    }
+
+
+def balance_sheet(period_end):
+    """Balance sheet figures at period_end from the latest finalized snapshot plus account balances after it"""
+    snapshot = (
+        BalanceSheet.objects
+        .filter(status__in=FINALIZED_STATUSES, period_end__lte=period_end)
+        .order_by('-period_end')
+        .values('period_end', 'total_assets', 'total_liabilities', 'total_equity')
+        .first()
+    )
+    if snapshot is None:
+        assets = liabilities = equity = ZERO
+        start = None
+    else:
+        assets, liabilities, equity = snapshot['total_assets'], snapshot['total_liabilities'], snapshot['total_equity']
+        start = snapshot['period_end'] + ONE_DAY
+
+    if start is None or start <= period_end:
+        delta = type_delta((start, period_end))
+        assets += delta['ASSET']
+        liabilities -= delta['LIABILITY']
+        # Revenue, expenses and non-operating items close to retained earnings.
+        equity -= delta['EQUITY'] + sum((delta[kind] for kind in PROFIT_AND_LOSS_TYPES), ZERO)
+
+    return {
+        'period_end': period_end,
+        'total_assets': assets.quantize(CENT),
+        'total_liabilities': liabilities.quantize(CENT),
+        'total_equity': equity.quantize(CENT),
+        'snapshot': snapshot['period_end'] if snapshot else None,
+        'ledger_from': start if start is None or start <= period_end else None,
+    }
+
+
+def as_response(figures):
+    """Figures with amounts as strings, the way the API renders decimals"""
+    return {key: str(value) if isinstance(value, Decimal) else value for key, value in figures.items()}
+
+
+def build_profit_loss(period_start, period_end):
+    """Create a draft ProfitLossReport for the range"""
+    figures = profit_loss(period_start, period_end)
+    return ProfitLossReport.objects.create(**{field: figures[field] for field in PROFIT_LOSS_FIGURES})
+
+
+def build_balance_sheet(period_start, period_end, prepared_by):
+    """Create a draft BalanceSheet as of period_end"""
+    figures = balance_sheet(period_end)
+    return BalanceSheet.objects.create(
+        period_start=period_start,
+        prepared_by=prepared_by,
+        **{field: figures[field] for field in BALANCE_SHEET_FIGURES if field != 'period_start'},
+    )
+
+
+@transaction.atomic
+def finalize_period(period_date, prepared_by='system'):
+    """Snapshot the P&L and closing balance sheet of a locked month as FINALIZED rows"""
+    period_start, period_end = month_start(period_date), month_end(period_date)
+    if not calendar.is_locked(period_end):
+        raise ValidationError(f'Lock the accounting period through {period_end} before finalizing it')
+
+    existing_profit_loss = ProfitLossReport.objects.filter(
+        status='FINALIZED', period_start=period_start, period_end=period_end
+    ).first()
+    existing_balance_sheet = BalanceSheet.objects.filter(
+        status__in=FINALIZED_STATUSES, period_start=period_start, period_end=period_end
+    ).first()
+    # Draft copies of the same month are superseded by the snapshot.
+    ProfitLossReport.objects.filter(status='DRAFT', period_start=period_start, period_end=period_end).delete()
+    BalanceSheet.objects.filter(status='DRAFT', period_start=period_start, period_end=period_end).delete()
+
+    finalized_date = timezone.now()
+    report = existing_profit_loss or ProfitLossReport.objects.create(
+        status='FINALIZED',
+        **{field: value for field, value in profit_loss(period_start, period_end).items() if field in PROFIT_LOSS_FIGURES},
+    )
+    sheet = existing_balance_sheet or BalanceSheet.objects.create(
+        status='FINALIZED',
+        period_start=period_start,
+        prepared_by=prepared_by,
+        finalized_date=finalized_date,
+        **{field: value for field, value in balance_sheet(period_end).items() if field in BALANCE_SHEET_FIGURES},
+    )
+    return report, sheet
+
+
+def _stored_snapshot(sender, instance):
+    if instance.pk is None:
+        return None
+    stored = sender.objects.filter(pk=instance.pk).first()
+    return stored if stored is not None and stored.status in FINALIZED_STATUSES else None
+
+
+def guard_snapshot_save(sender, instance, raw=False, **kwargs):
+    """Reject edits to the figures of a finalized statement; status may only move forward"""
+    if raw:
+        return
+    stored = _stored_snapshot(sender, instance)
+    if stored is None:
+        return
+    fields = PROFIT_LOSS_FIGURES if sender is ProfitLossReport else BALANCE_SHEET_FIGURES
+    if instance.status == 'DRAFT' or any(getattr(instance, field) != getattr(stored, field) for field in fields):
+        raise SnapshotFinalizedError(f'{stored} is finalized and cannot be changed')
+
+
+def guard_snapshot_delete(sender, instance, **kwargs):
+    """Reject deleting a finalized statement"""
+    stored = _stored_snapshot(sender, instance)
+    if stored is not None:
+        raise SnapshotFinalizedError(f'{stored} is finalized and cannot be deleted')
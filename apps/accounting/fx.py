@@ -0,0 +1,156 @@
+"""
+Currency conversion from the dated ExchangeRate history.
+
+Rates are held per process in an interval index: for each currency a sorted
+list of effective dates, so the rate for any date is one bisect. The table is
+shared between processes through the cache (redis), keyed by a version that is
+bumped whenever a rate changes, so only the first process after a change reads
+the database. Checking that version is a cache round trip, so batches take
+one converter() per batch or request rather than calling convert() per amount;
+a converter memoizes (currency, date) pairs, so converting millions of amounts
+costs one lookup per distinct pair and no queries.
+
+Currency.exchange_rate is kept as a read-only mirror of the latest dated rate
+for display; conversions never read it.
+"""
+
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Currency, ExchangeRate
+
+VERSION_KEY = 'accounting:fx-version'
+TABLE_KEY = 'accounting:fx-rates:{version}'
+CACHE_TIMEOUT = 24 * 60 * 60
+MAX_AGE = 300
+
+ONE = Decimal('1')
+CENT = Decimal('0.01')
+
+
+class MissingRateError(LookupError):
+    """Raised when no exchange rate is effective for a currency on a date"""
+
+
+class RateIndex:
+    """Interval index over dated exchange rates, quoted in home currency per unit"""
+
+    def __init__(self, home_currency, series):
+        self.home_currency = home_currency
+        self.series = series
+
+    def rate(self, currency, on):
+        currency = currency.upper()
+        if currency == self.home_currency:
+            return ONE
+        try:
+            dates, rates = self.series[currency]
+        except KeyError:
+            raise MissingRateError(f'No exchange rates for {currency}')
+        position = bisect_right(dates, on) - 1
+        if position < 0:
+            raise MissingRateError(f'No {currency} exchange rate effective on {on}')
+        return rates[position]
+
+    def cross_rate(self, currency, to_currency, on):
+        if to_currency is None or to_currency.upper() == self.home_currency:
+            return self.rate(currency, on)
+        return self.rate(currency, on) / self.rate(to_currency, on)
+
+    def converter(self, to_currency=None):
+        """Return convert(amount, currency, on) memoizing rates per (currency, date)"""
+        memo = {}
+
+        def convert(amount, currency, on):
+            key = (currency, on)
+            rate = memo.get(key)
+            if rate is None:
+                rate = memo[key] = self.cross_rate(currency, to_currency, on)
+            return (Decimal(str(amount)) * rate).quantize(CENT)
+
+        return convert
+
+
+def _load_table():
+    home_currency = (
+        Currency.objects.filter(is_base_currency=True).values_list('code', flat=True).first()
+        or getattr(settings, 'HOME_CURRENCY', 'USD')
+    )
+    series = defaultdict(lambda: ([], []))
+    rows = ExchangeRate.objects.order_by('currency', 'effective_date').values_list('currency', 'effective_date', 'rate')
+    for currency, effective_date, rate in rows.iterator(chunk_size=5000):
+        dates, rates = series[currency.upper()]
+        dates.append(effective_date)
+        rates.append(rate)
+    return {'home_currency': home_currency.upper(), 'series': dict(series)}
+
+
+class RateCache:
+    """Per-process RateIndex refreshed from the shared cache when rates change"""
+
+    def __init__(self, max_age=MAX_AGE):
+        self.max_age = max_age
+        self._index = None
+        self._version = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def _is_stale(self):
+        if self._index is None or time.monotonic() - self._loaded_at > self.max_age:
+            return True
+        return cache.get(VERSION_KEY) != self._version
+
+    def index(self):
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    version = cache.get_or_set(VERSION_KEY, 0, timeout=None)
+                    key = TABLE_KEY.format(version=version)
+                    table = cache.get(key)
+                    if table is None:
+                        table = _load_table()
+                        cache.set(key, table, CACHE_TIMEOUT)
+                    self._index = RateIndex(table['home_currency'], table['series'])
+                    self._version = version
+                    self._loaded_at = time.monotonic()
+        return self._index
+
+    def invalidate(self):
+        """Drop the local index and make every process rebuild the shared table"""
+        self._index = None
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 1, timeout=None)
+
+
+rates = RateCache()
+
+
+def converter(to_currency=None):
+    """Return convert(amount, currency, on) bound to the current rate index; use one per batch or request"""
+    return rates.index().converter(to_currency)
+
+
+def convert(amount, currency, on, to_currency=None):
+    """Convert a single amount into the home currency (or to_currency); batches should use converter()"""
+    return converter(to_currency)(amount, currency, on)
+
+
+def sync_currency_rate(currency):
+    """Mirror the latest dated rate of a currency onto Currency.exchange_rate"""
+    latest = (
+        ExchangeRate.objects
+        .filter(currency__iexact=currency)
+        .order_by('-effective_date')
+        .values_list('rate', flat=True)
+        .first()
+    )
+    if latest is not None:
+        Currency.objects.filter(code__iexact=currency).update(exchange_rate=latest.quantize(Decimal('0.0001')))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.accounting.models import ReconciliationRecord
+from apps.accounting.reconciliation import auto_match
+
+
+class Command(BaseCommand):
+    help = 'Automatically match pending bank lines for a reconciliation record'
+
+    def add_arguments(self, parser):
+        parser.add_argument('record_id', type=int, help='ReconciliationRecord to reconcile')
+        parser.add_argument('--start-date', help='First statement date (defaults to the start of the record month)')
+        parser.add_argument('--end-date', help='Last statement date (defaults to the end of the record month)')
+        parser.add_argument('--window-days', type=int, help='Maximum days between bank and system dates')
+        parser.add_argument('--tolerance', help='Maximum amount difference for tolerance matches')
+
+    def handle(self, *args, **options):
+        try:
+            record = ReconciliationRecord.objects.get(pk=options['record_id'])
+        except ReconciliationRecord.DoesNotExist:
+            raise CommandError(f"Reconciliation record {options['record_id']} does not exist")
+        start = parse_date(options['start_date']) if options['start_date'] else None
+        end = parse_date(options['end_date']) if options['end_date'] else None
+        started = time.perf_counter()
+        result = auto_match(record, start, end, window_days=options['window_days'], tolerance=options['tolerance'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Matched {result['matched']} of {result['bank_lines']} bank lines against "
+            f"{result['system_lines']} system lines in {elapsed:.2f}s; unmatched amount {result['unmatched_amount']}"
+        ))
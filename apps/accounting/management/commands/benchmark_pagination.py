@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.accounting.models import AuditLog
+from apps.accounting.views import AuditLogViewSet, StandardPagination
+
+
+class Command(BaseCommand):
+    help = 'Seed audit logs and compare deep-page latency of offset vs keyset pagination (seeded rows are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Number of audit log rows to seed')
+        parser.add_argument('--page', type=int, default=10_000, help='Page number to fetch')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        page_size = StandardPagination.page_size
+        rows = max(options['rows'], options['page'] * page_size)
+        factory = APIRequestFactory()
+        view = AuditLogViewSet()
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            batch = []
+            for number in range(rows):
+                batch.append(AuditLog(action='UPDATE', entity_type='Benchmark', entity_id=number, user='benchmark'))
+                if len(batch) >= options['batch_size']:
+                    AuditLog.objects.bulk_create(batch)
+                    batch = []
+            if batch:
+                AuditLog.objects.bulk_create(batch)
+            self.stdout.write(f'Seeded {rows} audit logs in {time.perf_counter() - started:.2f}s')
+            queryset = AuditLog.objects.order_by('-timestamp', '-id')
+
+            request = Request(factory.get('/', {'page': options['page']}))
+            started = time.perf_counter()
+            page = PageNumberPagination.paginate_queryset(StandardPagination(), queryset, request, view)
+            offset_ms = (time.perf_counter() - started) * 1000
+
+            # Position the cursor on the last row of the previous page, as a client walking the pages would.
+            paginator = StandardPagination()
+            boundary = queryset[(options['page'] - 1) * page_size - 1]
+            keyset = paginator.keyset_pagination_class()
+            keyset.model = AuditLog
+            keyset.ordering = tuple(view.keyset_ordering)
+            cursor = keyset.encode_cursor(keyset._position(boundary), reverse=False)
+            request = Request(factory.get('/', {'cursor': cursor}))
+            started = time.perf_counter()
+            keyset_page = paginator.paginate_queryset(queryset, request, view)
+            keyset_ms = (time.perf_counter() - started) * 1000
+
+            same = [row.pk for row in page] == [row.pk for row in keyset_page]
+            self.stdout.write(f'Page {options["page"]}: offset {offset_ms:.1f}ms, keyset {keyset_ms:.1f}ms (same rows={same})')
+
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Benchmark data rolled back'))
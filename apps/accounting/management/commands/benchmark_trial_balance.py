@@ -0,0 +1,68 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.accounting.balances import rebuild_balances
+from apps.accounting.models import LedgerEntry
+from apps.accounting.trial_balance import compute_trial_balance, invalidate
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic ledger and time trial balance generation (seeded rows are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=5_000_000, help='Number of ledger entries to seed')
+        parser.add_argument('--accounts', type=int, default=500, help='Number of distinct account codes')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Rows per bulk insert')
+        parser.add_argument('--repeat', type=int, default=5, help='Cached generations to time')
+
+    def handle(self, *args, **options):
+        entries = options['entries']
+        rng = random.Random(42)
+        accounts = [f'{rng.choice("1234567")}{n:04d}' for n in range(options['accounts'])]
+        start = date(2020, 1, 1)
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            batch = []
+            # Entries are seeded in balanced debit/credit pairs.
+            for number in range(0, entries, 2):
+                amount = Decimal(rng.randint(100, 1_000_000)) / 100
+                entry_date = start + timedelta(days=rng.randint(0, 5 * 365))
+                for offset, entry_type in enumerate(('DEBIT', 'CREDIT')):
+                    batch.append(LedgerEntry(
+                        entry_number=f'BENCH-{number + offset:09d}',
+                        account_code=rng.choice(accounts),
+                        entry_type=entry_type,
+                        amount=amount,
+                        entry_date=entry_date,
+                        reference_document='BENCHMARK',
+                    ))
+                if len(batch) >= options['batch_size']:
+                    LedgerEntry.objects.bulk_create(batch)
+                    batch = []
+            if batch:
+                LedgerEntry.objects.bulk_create(batch)
+            rebuild_balances()
+            self.stdout.write(f'Seeded {entries} entries and their balances in {time.perf_counter() - started:.2f}s')
+
+            period_date = start + timedelta(days=5 * 365)
+            invalidate()
+            started = time.perf_counter()
+            result = compute_trial_balance(period_date)
+            self.stdout.write(f'Cold generation: {(time.perf_counter() - started) * 1000:.1f}ms '
+                              f'({len(result["accounts"])} accounts, balanced={result["is_balanced"]})')
+
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                compute_trial_balance(period_date)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(f'Cached generation: best {min(timings):.2f}ms, worst {max(timings):.2f}ms')
+
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Benchmark data rolled back'))
@@ -0,0 +1,25 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.accounting.financial_statements import finalize_period
+
+
+class Command(BaseCommand):
+    help = 'Snapshot the profit & loss and balance sheet of a locked month as finalized statements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('period_date', help='Any date in the month to finalize (YYYY-MM-DD)')
+        parser.add_argument('--prepared-by', default='system', help='Name recorded on the balance sheet')
+
+    def handle(self, *args, **options):
+        period_date = parse_date(options['period_date'])
+        if period_date is None:
+            raise CommandError('period_date must be a YYYY-MM-DD date')
+        try:
+            report, sheet = finalize_period(period_date, options['prepared_by'])
+        except ValidationError as exc:
+            raise CommandError(exc.messages[0])
+        self.stdout.write(f'{report}: net profit {report.net_profit}')
+        self.stdout.write(f'{sheet}: assets {sheet.total_assets}, liabilities {sheet.total_liabilities}, equity {sheet.total_equity}')
+        self.stdout.write(self.style.SUCCESS('Period finalized'))
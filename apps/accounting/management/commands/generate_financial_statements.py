@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.accounting import financial_statements
+from apps.accounting.trial_balance import create_trial_balance
+
+
+class Command(BaseCommand):
+    help = 'Generate the trial balance, profit & loss report and balance sheet for a period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('period_start', help='Period start date (YYYY-MM-DD)')
+        parser.add_argument('period_end', help='Period end date (YYYY-MM-DD)')
+        parser.add_argument('--prepared-by', default='system', help='Name recorded on the balance sheet')
+
+    def handle(self, *args, **options):
+        period_start = parse_date(options['period_start'])
+        period_end = parse_date(options['period_end'])
+        if not period_start or not period_end or period_start > period_end:
+            raise CommandError('Provide a valid period_start and period_end (YYYY-MM-DD)')
+
+        trial_balance, _ = create_trial_balance(period_end)
+        profit_loss = financial_statements.build_profit_loss(period_start, period_end)
+        balance_sheet = financial_statements.build_balance_sheet(period_start, period_end, options['prepared_by'])
+
+        self.stdout.write(f'{trial_balance}: debits {trial_balance.total_debits}, credits {trial_balance.total_credits}')
+        self.stdout.write(f'{profit_loss}: net profit {profit_loss.net_profit}')
+        self.stdout.write(f'{balance_sheet}: assets {balance_sheet.total_assets}')
+        self.stdout.write(self.style.SUCCESS('Financial statements generated'))
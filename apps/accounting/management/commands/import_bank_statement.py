@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounting.models import BankProfile
+from apps.accounting.period_locks import PeriodLockedError
+from apps.accounting.statements import PARSERS, StatementFormatError, detect_format, import_statement
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV, MT940 or CAMT.053 bank statement file into reconciliation entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Statement file to import')
+        parser.add_argument('--bank-profile', type=int, required=True, help='BankProfile the statement belongs to')
+        parser.add_argument('--format', choices=sorted(PARSERS), help='Statement format (detected from the extension by default)')
+        parser.add_argument('--opening-balance', help='Opening balance when the file does not state one')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Lines per bulk insert')
+
+    def handle(self, *args, **options):
+        try:
+            bank_profile = BankProfile.objects.get(pk=options['bank_profile'])
+        except BankProfile.DoesNotExist:
+            raise CommandError(f"Bank profile {options['bank_profile']} does not exist")
+        opening_balance = Decimal(options['opening_balance']) if options['opening_balance'] else None
+        try:
+            statement_format = options['format'] or detect_format(options['path'])
+            with open(options['path'], 'rb') as stream:
+                result = import_statement(
+                    stream, statement_format, bank_profile,
+                    opening_balance=opening_balance, chunk_size=options['chunk_size'],
+                )
+        except (OSError, StatementFormatError, PeriodLockedError) as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['inserted']} of {result['rows']} lines ({result['duplicates']} duplicates) "
+            f"into statement {result['statement']} in {result['seconds']:.2f}s "
+            f"({result['rows_per_second']} rows/s)"
+        ))
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounting import partitions
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly AuditLog partitions and archive partitions past the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true', help='Convert an unpartitioned audit table first')
+        parser.add_argument('--months-ahead', type=int, default=3, help='Months of future partitions to keep ready')
+        parser.add_argument('--retention-months', type=int, default=settings.AUDIT_LOG_RETENTION_MONTHS,
+                            help='Months of audit history to keep in the database')
+        parser.add_argument('--archive-dir', default=settings.AUDIT_LOG_ARCHIVE_DIR,
+                            help='Directory for compressed partition archives')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be archived without changing anything')
+
+    def handle(self, *args, **options):
+        try:
+            if not partitions.is_partitioned():
+                if not options['convert']:
+                    raise CommandError('The audit table is not partitioned yet; run with --convert')
+                if options['dry_run']:
+                    self.stdout.write('Would convert the audit table to monthly partitions')
+                    return
+                partitions.convert_table(months_ahead=options['months_ahead'])
+                self.stdout.write(self.style.SUCCESS('Converted the audit table to monthly partitions'))
+
+            if options['dry_run']:
+                for month in partitions.default_months():
+                    self.stdout.write(f'Would move {month:%Y-%m} out of the default partition')
+                for _, name in partitions.expired_partitions(options['retention_months']):
+                    self.stdout.write(f'Would archive {name}')
+                return
+            result = partitions.maintain(options['months_ahead'], options['retention_months'], options['archive_dir'])
+        except partitions.PartitioningError as exc:
+            raise CommandError(str(exc))
+
+        for name in result['created']:
+            self.stdout.write(f'Created partition {name}')
+        for path in result['archived']:
+            self.stdout.write(f'Archived {path}')
+        self.stdout.write(self.style.SUCCESS('Audit log partitions are up to date'))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.accounting.balances import rebuild_balances
+
+
+class Command(BaseCommand):
+    help = 'Recompute materialized account balances from raw ledger entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_balances(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} account balance rows in {elapsed:.2f}s'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.accounting.amortization import run_amortization
+from apps.accounting.period_locks import PeriodLockedError
+
+
+class Command(BaseCommand):
+    help = 'Amortize deferred revenue and expenses for the month containing the given date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('period_date', help='Any date in the period to amortize (YYYY-MM-DD)')
+        parser.add_argument('--dry-run', action='store_true', help='Compute recognition without posting')
+
+    def handle(self, *args, **options):
+        period_date = parse_date(options['period_date'])
+        if period_date is None:
+            raise CommandError('period_date must be a YYYY-MM-DD date')
+        try:
+            result = run_amortization(period_date, dry_run=options['dry_run'])
+        except PeriodLockedError as exc:
+            raise CommandError(exc.messages[0])
+        for code, schedule in result['schedules'].items():
+            self.stdout.write(f"{code}: {schedule['deferrals']} deferrals, {schedule['amount']}")
+        for name, value in result['timings'].items():
+            self.stdout.write(f'  {name}: {value:.2f}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Posted {result['entries']} entries for period ending {result['period_end']}"
+            + (' (dry run)' if result['dry_run'] else '')
+        ))
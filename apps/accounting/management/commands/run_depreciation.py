@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.accounting.depreciation import run_depreciation
+from apps.accounting.period_locks import PeriodLockedError
+
+
+class Command(BaseCommand):
+    help = 'Depreciate fixed assets for the month containing the given date and post the journal'
+
+    def add_arguments(self, parser):
+        parser.add_argument('period_date', help='Any date in the period to depreciate (YYYY-MM-DD)')
+        parser.add_argument('--dry-run', action='store_true', help='Compute charges without posting')
+
+    def handle(self, *args, **options):
+        period_date = parse_date(options['period_date'])
+        if period_date is None:
+            raise CommandError('period_date must be a YYYY-MM-DD date')
+        started = time.perf_counter()
+        try:
+            result = run_depreciation(period_date, dry_run=options['dry_run'])
+        except PeriodLockedError as exc:
+            raise CommandError(exc.messages[0])
+        elapsed = time.perf_counter() - started
+        for asset_type, amount in result['by_asset_type'].items():
+            self.stdout.write(f'{asset_type}: {amount}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Depreciated {result['assets']} assets for period ending {result['period_end']}: "
+            f"{result['total_depreciation']} in {elapsed:.2f}s"
+            + (' (dry run)' if result['dry_run'] else '')
+        ))
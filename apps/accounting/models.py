@@ -3,6 +3,25 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
 
+class AccountBalance(models.Model):
+    """Per-account, per-period balances maintained from ledger entries"""
+    account_code = models.CharField(max_length=50)
+    period = models.DateField(help_text="First day of the month")
+    total_debits = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    total_credits = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=15, decimal_places=2, default=0, help_text="Running balance (debits - credits) up to the end of the period")
+
+    class Meta:
+        ordering = ['account_code', 'period']
+        unique_together = [('account_code', 'period')]
+        indexes = [
+            models.Index(fields=['period', 'account_code']),
+        ]
+
+    def __str__(self):
+        return f"{self.account_code} - {self.period:%Y-%m}"
+
+
 class AuditLog(models.Model):
     """Track audit logs for accounting operations"""
     ACTION_CHOICES = (
@@ -24,6 +43,9 @@ class AuditLog(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.action} - {self.entity_type} ({self.entity_id})"
@@ -240,7 +262,10 @@ class Currency(models.Model):
     code = models.CharField(max_length=3, unique=True)
     name = models.CharField(max_length=100)
     symbol = models.CharField(max_length=10)
-    exchange_rate = models.DecimalField(max_digits=10, decimal_places=4, default=1)
+    exchange_rate = models.DecimalField(
+        max_digits=10, decimal_places=4, default=1,
+        help_text="Deprecated: mirror of the latest ExchangeRate, kept for display; conversions use ExchangeRate"
+    )
     is_base_currency = models.BooleanField(default=False)
     
     class Meta:
@@ -282,6 +307,7 @@ class DeferredExpense(models.Model):
     amortization_start_date = models.DateField()
     monthly_amount = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
     remaining_amount = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
+    last_amortized_date = models.DateField(null=True, blank=True, help_text="End of the last period amortized")
     
     def __str__(self):
         return f"Deferred Expense - {self.description}"
@@ -296,11 +322,28 @@ class DeferredRevenue(models.Model):
     recognition_start_date = models.DateField()
     monthly_amount = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
     remaining_amount = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
+    last_recognized_date = models.DateField(null=True, blank=True, help_text="End of the last period recognized")
     
     def __str__(self):
         return f"Deferred Revenue - {self.description}"
 
 
+class ExchangeRate(models.Model):
+    """Dated exchange rates: home currency units per unit of currency, effective until the next rate"""
+    currency = models.CharField(max_length=3)
+    rate = models.DecimalField(max_digits=18, decimal_places=8, validators=[MinValueValidator(0)])
+    effective_date = models.DateField()
+    source = models.CharField(max_length=100, blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['currency', '-effective_date']
+        unique_together = [('currency', 'effective_date')]
+    
+    def __str__(self):
+        return f"{self.currency} {self.rate} ({self.effective_date})"
+
+
 class FixedAsset(models.Model):
     """Fixed assets"""
     ASSET_TYPE = (
@@ -311,6 +354,10 @@ class FixedAsset(models.Model):
         ('FURNITURE', 'Furniture'),
         ('OTHER', 'Other'),
     )
+    DEPRECIATION_METHOD = (
+        ('STRAIGHT_LINE', 'Straight Line'),
+        ('DECLINING_BALANCE', 'Declining Balance'),
+    )
     
     asset_code = models.CharField(max_length=50, unique=True)
     asset_name = models.CharField(max_length=255)
@@ -320,6 +367,8 @@ class FixedAsset(models.Model):
     salvage_value = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
     useful_life_years = models.IntegerField(validators=[MinValueValidator(1)])
     accumulated_depreciation = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
+    depreciation_method = models.CharField(max_length=20, choices=DEPRECIATION_METHOD, default='STRAIGHT_LINE')
+    last_depreciation_date = models.DateField(null=True, blank=True, help_text="End of the last period depreciated")
     location = models.CharField(max_length=255, blank=True)
     
     def __str__(self):
@@ -342,6 +391,12 @@ class LedgerEntry(models.Model):
     description = models.TextField(blank=True)
     posted_date = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['posted_date', 'id']),
+            models.Index(fields=['entry_date', 'account_code']),
+        ]
+    
     def __str__(self):
         return f"Entry {self.entry_number}"
 
@@ -417,6 +472,11 @@ class ReconciliationEntry(models.Model):
     description = models.TextField(blank=True)
     created_date = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'entry_date']),
+        ]
+    
     def __str__(self):
         return f"Reconciliation {self.reference_number}"
 
@@ -425,10 +485,17 @@ class ReconciliationMatch(models.Model):
     """Reconciliation matches between system and bank"""
     match_date = models.DateField()
     system_entry = models.CharField(max_length=100)
+    system_type = models.CharField(max_length=50, blank=True, help_text="Model of the matched system line")
+    system_id = models.BigIntegerField(null=True, blank=True, help_text="Primary key of the matched system line")
     bank_entry = models.CharField(max_length=100)
     matched_amount = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
     is_matched = models.BooleanField(default=False)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['system_type', 'system_id']),
+        ]
+    
     def __str__(self):
         return f"Match {self.system_entry} - {self.bank_entry}"
 
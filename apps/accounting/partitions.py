@@ -0,0 +1,208 @@
+"""
+Monthly PostgreSQL partitions for AuditLog.
+
+The audit table is range-partitioned on timestamp with one partition per
+month plus a default partition, so queries filtered on timestamp only scan
+the matching months. Months older than the retention window are copied to
+gzip-compressed CSV files, then detached and dropped. maintain() runs daily
+from Celery beat to keep partitions ready ahead of time and archive old ones.
+
+Rows that land in the default partition (a month nobody created a partition
+for) would make creating that month's partition fail. ensure_partitions()
+therefore also creates a partition for every month found in the default
+partition, moving those rows into it with the default detached, so they are
+queried and archived like any other month.
+
+The primary key becomes (id, timestamp) because PostgreSQL requires the
+partition key in every unique constraint; ids still come from one sequence.
+"""
+
+import gzip
+import os
+from datetime import date
+
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .models import AuditLog
+
+TABLE = AuditLog._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+UNPARTITIONED_TABLE = f'{TABLE}_unpartitioned'
+
+
+class PartitioningError(Exception):
+    """Raised when the database cannot hold a partitioned audit table"""
+
+
+def add_months(value, months):
+    """Return the first day of the month `months` after value's month"""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _check_backend():
+    if connection.vendor != 'postgresql':
+        raise PartitioningError('AuditLog partitioning requires PostgreSQL')
+
+
+def is_partitioned():
+    _check_backend()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+            'WHERE c.relname = %s AND pg_table_is_visible(c.oid)',
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def partitions():
+    """Return {month: partition name} for the attached monthly partitions"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits i '
+            'JOIN pg_class parent ON parent.oid = i.inhparent '
+            'JOIN pg_class child ON child.oid = i.inhrelid '
+            'WHERE parent.relname = %s AND pg_table_is_visible(parent.oid)',
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = f'{TABLE}_p'
+    months = {}
+    for name in names:
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            months[date(int(suffix[:4]), int(suffix[4:]), 1)] = name
+    return months
+
+
+def create_partition(month, cursor):
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {_quote(partition_name(month))} PARTITION OF {_quote(TABLE)} '
+        'FOR VALUES FROM (%s) TO (%s)',
+        [month, add_months(month, 1)],
+    )
+
+
+def default_months():
+    """Months with rows in the default partition, oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT DISTINCT date_trunc(%s, "timestamp")::date FROM {_quote(DEFAULT_PARTITION)} ORDER BY 1',
+            ['month'],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _move_out_of_default(months, cursor):
+    """Create partitions for months that have rows in the default partition and move those rows into them"""
+    table, default = _quote(TABLE), _quote(DEFAULT_PARTITION)
+    # Inserts would otherwise be routed to the default while it is detached.
+    cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+    cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {default}')
+    for month in months:
+        bounds = [month, add_months(month, 1)]
+        create_partition(month, cursor)
+        cursor.execute(f'INSERT INTO {table} SELECT * FROM {default} WHERE "timestamp" >= %s AND "timestamp" < %s', bounds)
+        cursor.execute(f'DELETE FROM {default} WHERE "timestamp" >= %s AND "timestamp" < %s', bounds)
+    cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT')
+
+
+def ensure_partitions(start, end):
+    """Create monthly partitions from start through end and for months stuck in the default; return names created"""
+    existing = partitions()
+    stranded = [month for month in default_months() if month not in existing]
+    missing = []
+    month = add_months(start, 0)
+    while month <= end:
+        if month not in existing and month not in stranded:
+            missing.append(month)
+        month = add_months(month, 1)
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            if stranded:
+                _move_out_of_default(stranded, cursor)
+            for month in missing:
+                create_partition(month, cursor)
+    except DatabaseError as exc:
+        raise PartitioningError(f'Could not create audit partitions: {exc}') from exc
+    return [partition_name(month) for month in sorted(stranded + missing)]
+
+
+@transaction.atomic
+def convert_table(months_ahead=3):
+    """Rebuild the audit table as a partitioned table, moving existing rows into monthly partitions"""
+    if is_partitioned():
+        return False
+    table, old = _quote(TABLE), _quote(UNPARTITIONED_TABLE)
+    # The old identity sequence still holds the <table>_id_seq name until the old table is dropped.
+    sequence = f'{TABLE}_pk_seq'
+    with connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'SELECT min("timestamp"), max(id) FROM {table}')
+        oldest, max_id = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE {table} RENAME TO {old}')
+        cursor.execute(
+            f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING STORAGE) '
+            'PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, "timestamp")')
+        # Partitioned tables cannot carry an identity column before PostgreSQL 17.
+        cursor.execute(f'CREATE SEQUENCE {_quote(sequence)} AS bigint OWNED BY {table}.id')
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+        if max_id is not None:
+            cursor.execute('SELECT setval(%s, %s)', [sequence, max_id])
+        cursor.execute(f'CREATE TABLE {_quote(DEFAULT_PARTITION)} PARTITION OF {table} DEFAULT')
+
+        today = timezone.now().date()
+        month = add_months(oldest or today, 0)
+        while month <= add_months(today, months_ahead):
+            create_partition(month, cursor)
+            month = add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+        cursor.execute(f'DROP TABLE {old}')
+        for index in AuditLog._meta.indexes:
+            columns = ', '.join(_quote(AuditLog._meta.get_field(name).column) for name in index.fields)
+            cursor.execute(f'CREATE INDEX {_quote(index.name)} ON {table} ({columns})')
+    return True
+
+
+def expired_partitions(retention_months, today=None):
+    """Return [(month, name)] of partitions entirely older than the retention window"""
+    cutoff = add_months(today or timezone.now().date(), -retention_months)
+    return sorted((month, name) for month, name in partitions().items() if add_months(month, 1) <= cutoff)
+
+
+def archive_partition(month, archive_dir):
+    """Copy a partition to <archive_dir>/<name>.csv.gz, then detach and drop it; return the file path"""
+    name = partition_name(month)
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f'{name}.csv.gz')
+    partial = f'{path}.partial'
+    with connection.cursor() as cursor, gzip.open(partial, 'wb') as archive:
+        cursor.copy_expert(f'COPY {_quote(name)} TO STDOUT WITH (FORMAT csv, HEADER)', archive)
+    os.replace(partial, path)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {_quote(TABLE)} DETACH PARTITION {_quote(name)}')
+        cursor.execute(f'DROP TABLE {_quote(name)}')
+    return path
+
+
+def maintain(months_ahead, retention_months, archive_dir):
+    """Create the coming months' partitions and archive expired ones; return the names created and archive paths"""
+    this_month = timezone.now().date().replace(day=1)
+    created = ensure_partitions(this_month, add_months(this_month, months_ahead))
+    archived = [archive_partition(month, archive_dir) for month, _ in expired_partitions(retention_months)]
+    return {'created': created, 'archived': archived}
@@ -0,0 +1,108 @@
+"""
+Period lock enforcement.
+
+The books are closed through the latest lock_date of the active PeriodLocks:
+anything dated on or before it is locked. That date is held per process, so
+checking a write costs no database round-trip. It is reloaded when a
+PeriodLock changes in this process, when another process bumps the version
+key in the shared (Redis) cache, or after MAX_AGE seconds as a safety net.
+The version key is read at most once every VERSION_CHECK_INTERVAL seconds, so
+most checks make no cache round-trip either; a lock set in another process
+takes effect here within that interval.
+"""
+
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Max
+
+from .models import (
+    BankPaymentLine, BankReceiptLine, CashPaymentLine, CashReceiptLine, CashTransaction,
+    LedgerEntry, PeriodLock, ReconciliationEntry, TaxTransaction, VendorInvoice, VendorPayment
+)
+
+VERSION_KEY = 'accounting:period-lock-version'
+MAX_AGE = 300
+VERSION_CHECK_INTERVAL = 5
+
+# Dated accounting models guarded by period locks and the field holding their accounting date.
+LOCKED_DATE_FIELDS = {
+    BankPaymentLine: 'payment_date',
+    BankReceiptLine: 'receipt_date',
+    CashPaymentLine: 'payment_date',
+    CashReceiptLine: 'receipt_date',
+    CashTransaction: 'transaction_date',
+    LedgerEntry: 'entry_date',
+    ReconciliationEntry: 'entry_date',
+    TaxTransaction: 'transaction_date',
+    VendorInvoice: 'invoice_date',
+    VendorPayment: 'payment_date',
+}
+
+
+class PeriodLockedError(ValidationError):
+    """Raised when a write targets a locked accounting period"""
+
+
+class PeriodLockCalendar:
+    """In-process copy of the date the books are closed through"""
+
+    def __init__(self, max_age=MAX_AGE, check_interval=VERSION_CHECK_INTERVAL):
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self._loaded = False
+        self._lock_date = None
+        self._version = None
+        self._loaded_at = 0
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def _is_stale(self):
+        now = time.monotonic()
+        if not self._loaded or now - self._loaded_at > self.max_age:
+            return True
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        return cache.get(VERSION_KEY) != self._version
+
+    def _load(self):
+        with self._lock:
+            if not self._is_stale():
+                return
+            version = cache.get_or_set(VERSION_KEY, 0, timeout=None)
+            self._lock_date = PeriodLock.objects.filter(is_locked=True).aggregate(lock_date=Max('lock_date'))['lock_date']
+            self._version = version
+            self._loaded = True
+            self._loaded_at = self._checked_at = time.monotonic()
+
+    def lock_date(self):
+        """Date the books are closed through, or None when nothing is locked"""
+        if self._is_stale():
+            self._load()
+        return self._lock_date
+
+    def is_locked(self, value):
+        """Return True if value is on or before the lock date"""
+        lock_date = self.lock_date()
+        return lock_date is not None and value <= lock_date
+
+    def check(self, *values):
+        """Raise PeriodLockedError if any of the given dates falls in a locked period"""
+        lock_date = self.lock_date()
+        for value in values:
+            if value and lock_date is not None and value <= lock_date:
+                raise PeriodLockedError(f"Entries dated on or before {lock_date} fall in a locked period ({value})")
+
+    def invalidate(self):
+        """Drop the local calendar and tell other processes to reload theirs"""
+        self._loaded = False
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 1, timeout=None)
+
+
+calendar = PeriodLockCalendar()
@@ -0,0 +1,41 @@
+"""
+Ledger posting service.
+
+All bulk writers of LedgerEntry go through post_entries so that materialized
+balances and cached trial balances stay consistent with the ledger even though
+bulk_create does not send model signals.
+"""
+
+import re
+
+from django.db import transaction
+
+from . import audit, balances, trial_balance
+from .models import LedgerEntry
+from .period_locks import calendar
+
+RUN_NUMBER = re.compile(r'-R(\d+)-')
+
+
+def post_entries(entries, batch_size=1000):
+    """Insert ledger entries in bulk and apply them to account balances in one transaction"""
+    calendar.check(*{entry.entry_date for entry in entries})
+    with transaction.atomic():
+        created = LedgerEntry.objects.bulk_create(entries, batch_size=batch_size)
+        balances.apply_entries(created)
+        audit.record_created(created)
+    trial_balance.invalidate()
+    return created
+
+
+def run_prefix(prefix, reference_document):
+    """Entry number prefix for the next run posting under a reference: prefix, then prefix-R2, prefix-R3, ..."""
+    numbers = list(
+        LedgerEntry.objects
+        .filter(reference_document=reference_document, entry_number__startswith=f'{prefix}-')
+        .values_list('entry_number', flat=True)
+    )
+    if not numbers:
+        return prefix
+    runs = (RUN_NUMBER.match(number, len(prefix)) for number in numbers)
+    return f'{prefix}-R{max((int(run.group(1)) for run in runs if run), default=1) + 1}'
@@ -0,0 +1,214 @@
+"""
+Automatic bank reconciliation.
+
+Pending ReconciliationEntry rows (bank statement lines, signed: deposits
+positive, withdrawals negative) are matched against system-side bank
+payments, bank receipts and cash transactions in two passes:
+
+1. Exact: a hash index keyed on (amount, reference) pairs each bank line with
+   the closest-dated system line carrying the same signed amount and the same
+   reference number or transaction id.
+2. Tolerance: remaining lines are matched by amount within a tolerance and date
+   within a window, using system lines sorted by amount and then by date.
+
+Both passes run in memory over two queries' worth of rows; matches are written
+with one bulk_create and statuses with one UPDATE per chunk. Matches record the
+model and id of their system line, and system lines already matched are left
+out by id, whatever the date of the bank line they were matched to. Bank lines
+in a locked accounting period are not matched, since their status can no
+longer change.
+"""
+
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Abs
+from django.utils import timezone
+
+from .balances import ZERO, month_end, month_start
+from .models import (
+    BankPaymentLine, BankReceiptLine, CashTransaction, ReconciliationEntry, ReconciliationMatch
+)
+from .period_locks import calendar
+
+DEFAULT_DATE_WINDOW_DAYS = 3
+DEFAULT_AMOUNT_TOLERANCE = Decimal('0.00')
+CENT = Decimal('0.01')
+UPDATE_CHUNK_SIZE = 5000
+
+Line = namedtuple('Line', 'reference transaction_id date cents source pk')
+
+
+def _cents(amount):
+    return int((amount * 100).to_integral_value())
+
+
+def _normalize(reference):
+    return (reference or '').strip().upper()
+
+
+def system_lines(start, end):
+    """Unreconciled system-side lines dated start..end, with payments as negative amounts"""
+    sources = (
+        (BankPaymentLine.objects.exclude(status='CANCELLED'), 'payment_date', 'transaction_id', -1),
+        (BankReceiptLine.objects.exclude(status='CANCELLED'), 'receipt_date', 'transaction_id', 1),
+        (CashTransaction.objects.filter(transaction_type='PAYMENT'), 'transaction_date', None, -1),
+        (CashTransaction.objects.filter(transaction_type='RECEIPT'), 'transaction_date', None, 1),
+    )
+    lines = []
+    for queryset, date_field, transaction_field, sign in sources:
+        source = queryset.model.__name__
+        matched = ReconciliationMatch.objects.filter(is_matched=True, system_type=source).values('system_id')
+        fields = ['pk', 'reference_number', date_field, 'amount'] + ([transaction_field] if transaction_field else [])
+        rows = (
+            queryset
+            .filter(**{f'{date_field}__range': (start, end)})
+            .exclude(pk__in=matched)
+            .values_list(*fields)
+        )
+        for row in rows.iterator(chunk_size=5000):
+            transaction_id = row[4] if transaction_field else ''
+            lines.append(Line(row[1], transaction_id, row[2], sign * _cents(row[3]), source, row[0]))
+    return lines
+
+
+class Matcher:
+    """Two-pass matcher over in-memory bank and system lines"""
+
+    def __init__(self, system, window_days, tolerance):
+        self.window = timedelta(days=window_days)
+        self.tolerance = _cents(tolerance)
+        self.system = system
+        self.used = [False] * len(system)
+
+        self.by_key = defaultdict(list)
+        by_amount = defaultdict(list)
+        for index, line in enumerate(system):
+            for reference in {_normalize(line.reference), _normalize(line.transaction_id)} - {''}:
+                self.by_key[(line.cents, reference)].append(index)
+            by_amount[line.cents].append((line.date, index))
+        # Per amount, system lines sorted by date so a date window is a bisect away.
+        self.amounts = sorted(by_amount)
+        self.by_amount = {cents: sorted(lines) for cents, lines in by_amount.items()}
+
+    def _closest(self, candidates, bank_date):
+        best, best_gap = None, None
+        for index in candidates:
+            if self.used[index]:
+                continue
+            gap = abs(self.system[index].date - bank_date)
+            if gap <= self.window and (best_gap is None or gap < best_gap):
+                best, best_gap = index, gap
+        return best
+
+    def exact(self, bank):
+        return self._closest(self.by_key.get((bank.cents, _normalize(bank.reference)), ()), bank.date)
+
+    def tolerant(self, bank):
+        candidates = []
+        position = bisect_left(self.amounts, bank.cents - self.tolerance)
+        while position < len(self.amounts) and self.amounts[position] <= bank.cents + self.tolerance:
+            lines = self.by_amount[self.amounts[position]]
+            low = bisect_left(lines, (bank.date - self.window, -1))
+            for line_date, index in lines[low:]:
+                if line_date > bank.date + self.window:
+                    break
+                candidates.append(index)
+            position += 1
+        return self._closest(candidates, bank.date)
+
+    def match(self, bank_lines):
+        """Return [(bank line, system line)] pairs, exact matches first"""
+        pairs = []
+        remaining = []
+        for bank in bank_lines:
+            index = self.exact(bank)
+            if index is None:
+                remaining.append(bank)
+            else:
+                self.used[index] = True
+                pairs.append((bank, self.system[index]))
+        for bank in remaining:
+            index = self.tolerant(bank)
+            if index is not None:
+                self.used[index] = True
+                pairs.append((bank, self.system[index]))
+        return pairs
+
+
+def period_range(record):
+    """Default statement range for a reconciliation record: the month of its reconciliation date"""
+    return month_start(record.reconciliation_date), month_end(record.reconciliation_date)
+
+
+def auto_match(record, start=None, end=None, window_days=None, tolerance=None):
+    """Match pending bank lines dated start..end and update the record's unmatched amount"""
+    if window_days is None:
+        window_days = getattr(settings, 'RECONCILIATION_DATE_WINDOW_DAYS', DEFAULT_DATE_WINDOW_DAYS)
+    if tolerance is None:
+        tolerance = getattr(settings, 'RECONCILIATION_AMOUNT_TOLERANCE', DEFAULT_AMOUNT_TOLERANCE)
+    default_start, default_end = period_range(record)
+    start, end = start or default_start, end or default_end
+
+    pending = ReconciliationEntry.objects.filter(status='PENDING', entry_date__range=(start, end))
+    lock_date = calendar.lock_date()
+    if lock_date is not None:
+        pending = pending.filter(entry_date__gt=lock_date)
+    bank = [
+        Line(reference, '', entry_date, _cents(amount), 'ReconciliationEntry', pk)
+        for pk, reference, entry_date, amount in pending.values_list('pk', 'reference_number', 'entry_date', 'amount').iterator(chunk_size=5000)
+    ]
+    window = timedelta(days=window_days)
+    system = system_lines(start - window, end + window)
+    pairs = Matcher(system, window_days, Decimal(tolerance)).match(bank)
+
+    with transaction.atomic():
+        ReconciliationMatch.objects.bulk_create(
+            [
+                ReconciliationMatch(
+                    match_date=bank_line.date,
+                    system_entry=system_line.reference,
+                    system_type=system_line.source,
+                    system_id=system_line.pk,
+                    bank_entry=bank_line.reference,
+                    matched_amount=Decimal(abs(system_line.cents)) / 100,
+                    is_matched=True,
+                )
+                for bank_line, system_line in pairs
+            ],
+            batch_size=1000,
+        )
+        # .update() skips the period lock signals, so re-check the dates being changed.
+        calendar.check(*{bank_line.date for bank_line, _ in pairs})
+        entry_ids = [bank_line.pk for bank_line, _ in pairs]
+        for chunk in range(0, len(entry_ids), UPDATE_CHUNK_SIZE):
+            ReconciliationEntry.objects.filter(
+                pk__in=entry_ids[chunk:chunk + UPDATE_CHUNK_SIZE]
+            ).update(status='RECONCILED')
+
+        statement = ReconciliationEntry.objects.filter(entry_date__range=(start, end)).exclude(status='REJECTED')
+        total = statement.aggregate(total=Sum(Abs('amount')))['total'] or ZERO
+        unmatched = statement.filter(status='PENDING').aggregate(total=Sum(Abs('amount')))['total'] or ZERO
+        record.total_amount = Decimal(total).quantize(CENT)
+        record.unmatched_amount = Decimal(unmatched).quantize(CENT)
+        if unmatched:
+            record.status = 'IN_PROGRESS'
+        else:
+            record.status = 'COMPLETED'
+            record.completed_date = timezone.now().date()
+        record.save(update_fields=['total_amount', 'unmatched_amount', 'status', 'completed_date'])
+
+    return {
+        'start': start,
+        'end': end,
+        'bank_lines': len(bank),
+        'system_lines': len(system),
+        'matched': len(pairs),
+        'unmatched': len(bank) - len(pairs),
+        'unmatched_amount': str(record.unmatched_amount),
+    }
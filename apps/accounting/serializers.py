@@ -1,5 +1,17 @@
+from collections import Counter
+
+from django.db import IntegrityError
 from rest_framework import serializers
 from .models import *
+from . import tax
+from .period_locks import PeriodLockedError, calendar
+from .posting import post_entries
+
+
+class AccountBalanceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AccountBalance
+        fields = '__all__'
 
 
 class AuditLogSerializer(serializers.ModelSerializer):
@@ -72,6 +84,7 @@ class CurrencySerializer(serializers.ModelSerializer):
     class Meta:
         model = Currency
         fields = '__all__'
+        read_only_fields = ('exchange_rate',)
 
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -92,6 +105,12 @@ class DeferredRevenueSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class ExchangeRateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExchangeRate
+        fields = '__all__'
+
+
 class FixedAssetSerializer(serializers.ModelSerializer):
     class Meta:
         model = FixedAsset
@@ -104,6 +123,47 @@ class LedgerEntrySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class LedgerEntryLineSerializer(serializers.ModelSerializer):
+    """Single journal line; uniqueness is checked for the whole batch at once"""
+    class Meta:
+        model = LedgerEntry
+        fields = ['entry_number', 'account_code', 'entry_type', 'amount', 'entry_date', 'reference_document', 'description']
+        extra_kwargs = {'entry_number': {'validators': []}}
+
+
+class LedgerEntryBulkSerializer(serializers.Serializer):
+    """Balanced batch of journal lines posted in a single transaction"""
+    entries = LedgerEntryLineSerializer(many=True, allow_empty=False)
+
+    def validate_entries(self, entries):
+        entry_numbers = [entry['entry_number'] for entry in entries]
+        duplicates = sorted(number for number, count in Counter(entry_numbers).items() if count > 1)
+        if duplicates:
+            raise serializers.ValidationError(f"Duplicate entry numbers in batch: {', '.join(duplicates[:20])}")
+
+        existing = sorted(LedgerEntry.objects.filter(entry_number__in=entry_numbers).values_list('entry_number', flat=True))
+        if existing:
+            raise serializers.ValidationError(f"Entry numbers already posted: {', '.join(existing[:20])}")
+
+        total_debits = sum(entry['amount'] for entry in entries if entry['entry_type'] == 'DEBIT')
+        total_credits = sum(entry['amount'] for entry in entries if entry['entry_type'] == 'CREDIT')
+        if total_debits != total_credits:
+            raise serializers.ValidationError(f"Debits ({total_debits}) do not equal credits ({total_credits})")
+
+        try:
+            calendar.check(*{entry['entry_date'] for entry in entries})
+        except PeriodLockedError as exc:
+            raise serializers.ValidationError(exc.messages)
+        return entries
+
+    def create(self, validated_data):
+        try:
+            return post_entries([LedgerEntry(**entry) for entry in validated_data['entries']])
+        except IntegrityError:
+            # A concurrent post took one of the entry numbers after validation.
+            raise serializers.ValidationError({'entries': ['Entry numbers already posted; nothing from this batch was posted']})
+
+
 class ModulePermissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = ModulePermission
@@ -165,9 +225,32 @@ class TaxSummarySerializer(serializers.ModelSerializer):
 
 
 class TaxTransactionSerializer(serializers.ModelSerializer):
+    tax_code = serializers.CharField(write_only=True, required=False)
+
     class Meta:
         model = TaxTransaction
         fields = '__all__'
+        extra_kwargs = {'tax_amount': {'required': False}}
+
+    def validate(self, attrs):
+        """Compute tax_amount from the effective rate unless the client supplies it"""
+        tax_code = attrs.pop('tax_code', None)
+        changed = self.instance is None or tax_code or {'taxable_amount', 'transaction_date', 'tax_type'} & set(attrs)
+        if 'tax_amount' not in attrs and changed:
+            taxable_amount = attrs.get('taxable_amount', getattr(self.instance, 'taxable_amount', None))
+            transaction_date = attrs.get('transaction_date', getattr(self.instance, 'transaction_date', None))
+            tax_type = attrs.get('tax_type', getattr(self.instance, 'tax_type', None))
+            try:
+                attrs['tax_amount'] = tax.compute(taxable_amount, tax_code or tax_type, transaction_date)
+            except tax.MissingTaxRateError as exc:
+                raise serializers.ValidationError({'tax_amount': str(exc)})
+        return attrs
+
+
+class TaxComputeLineSerializer(serializers.Serializer):
+    amount = serializers.DecimalField(max_digits=15, decimal_places=2)
+    tax = serializers.CharField()
+    date = serializers.DateField()
 
 
 class ThemeSerializer(serializers.ModelSerializer):
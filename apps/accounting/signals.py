@@ -0,0 +1,128 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import audit, balances, financial_statements, fx, tax, trial_balance
+from .models import (
+    AccountBalance, AuditLog, BalanceSheet, ExchangeRate, LedgerEntry, PeriodLock, ProfitLossReport, TaxRate
+)
+from .period_locks import LOCKED_DATE_FIELDS, calendar
+
+
+@receiver(pre_save, sender=LedgerEntry)
+def remember_posted_entry(sender, instance, raw=False, **kwargs):
+    """Keep the stored version of an edited entry so its balance effect can be reversed"""
+    instance._posted_entry = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._posted_entry = LedgerEntry.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=LedgerEntry)
+def post_entry_to_balances(sender, instance, raw=False, **kwargs):
+    """Update account balances when an entry is posted or edited"""
+    if raw:
+        return
+    previous = getattr(instance, '_posted_entry', None)
+    if previous is not None:
+        balances.apply_entries([previous], sign=-1)
+    balances.apply_entries([instance])
+    trial_balance.invalidate()
+
+
+@receiver(post_delete, sender=LedgerEntry)
+def reverse_entry_from_balances(sender, instance, **kwargs):
+    """Remove a deleted entry from account balances"""
+    balances.apply_entries([instance], sign=-1)
+    trial_balance.invalidate()
+
+
+def guard_locked_period(sender, instance, signal=None, raw=False, **kwargs):
+    """Reject saves and deletes dated in a locked accounting period"""
+    if raw:
+        return
+    field = LOCKED_DATE_FIELDS[sender]
+    stored_date = None
+    if sender is LedgerEntry and signal is pre_save:
+        stored_date = getattr(instance._posted_entry, field, None)
+    elif instance.pk is not None and not instance._state.adding:
+        # Moving a row out of a locked period is as much a change to it as editing it there.
+        stored_date = getattr(instance, '_stored_locked_date', None)
+        if stored_date is None:
+            # Only rows loaded with the date deferred get here.
+            stored_date = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    calendar.check(getattr(instance, field), stored_date)
+
+
+def remember_locked_date(sender, instance, **kwargs):
+    """Keep the accounting date a row was loaded or last saved with, without loading deferred fields"""
+    field = LOCKED_DATE_FIELDS[sender]
+    value = instance.__dict__.get(field)
+    instance._stored_locked_date = sender._meta.get_field(field).to_python(value) if value is not None else None
+
+
+for model in LOCKED_DATE_FIELDS:
+    pre_save.connect(guard_locked_period, sender=model, dispatch_uid=f'period_lock_save_{model.__name__}')
+    pre_delete.connect(guard_locked_period, sender=model, dispatch_uid=f'period_lock_delete_{model.__name__}')
+    post_init.connect(remember_locked_date, sender=model, dispatch_uid=f'period_lock_init_{model.__name__}')
+    post_save.connect(remember_locked_date, sender=model, dispatch_uid=f'period_lock_saved_{model.__name__}')
+
+
+for model in (BalanceSheet, ProfitLossReport):
+    pre_save.connect(financial_statements.guard_snapshot_save, sender=model, dispatch_uid=f'snapshot_save_{model.__name__}')
+    pre_delete.connect(financial_statements.guard_snapshot_delete, sender=model, dispatch_uid=f'snapshot_delete_{model.__name__}')
+
+
+@receiver(post_save, sender=PeriodLock)
+@receiver(post_delete, sender=PeriodLock)
+def refresh_period_locks(sender, **kwargs):
+    """Reload the lock calendar in every process after a lock changes"""
+    calendar.invalidate()
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def refresh_exchange_rates(sender, instance, raw=False, **kwargs):
+    """Rebuild the shared rate index after a rate changes"""
+    fx.rates.invalidate()
+    if not raw:
+        fx.sync_currency_rate(instance.currency)
+
+
+@receiver(post_save, sender=TaxRate)
+@receiver(post_delete, sender=TaxRate)
+def refresh_tax_rates(sender, **kwargs):
+    """Recompile the tax rate lookup in every process after a rate changes"""
+    tax.rates.invalidate()
+
+
+def remember_loaded_values(sender, instance, **kwargs):
+    """Keep the values an instance was loaded with so updates can be audited as diffs"""
+    instance._audit_loaded = audit.field_values(instance)
+
+
+def audit_save(sender, instance, created=False, raw=False, **kwargs):
+    """Queue an audit record for a created or changed instance"""
+    if raw:
+        return
+    entry = audit.change_record(instance, created)
+    instance._audit_loaded = audit.field_values(instance)
+    if entry is not None:
+        audit.record(entry)
+
+
+def audit_delete(sender, instance, **kwargs):
+    """Queue an audit record for a deleted instance"""
+    audit.record(audit.build_record('DELETE', instance, old_value=audit.field_values(instance)))
+
+
+# AccountBalance is derived from LedgerEntry and AuditLog is the trail itself.
+AUDITED_MODELS = [
+    model for model in apps.get_app_config('accounting').get_models()
+    if model not in (AccountBalance, AuditLog)
+]
+
+for model in AUDITED_MODELS:
+    post_init.connect(remember_loaded_values, sender=model, dispatch_uid=f'audit_init_{model.__name__}')
+    post_save.connect(audit_save, sender=model, dispatch_uid=f'audit_save_{model.__name__}')
+    post_delete.connect(audit_delete, sender=model, dispatch_uid=f'audit_delete_{model.__name__}')
@@ -0,0 +1,381 @@
+"""
+Streaming bank statement import.
+
+CSV, MT940 and CAMT.053 files are parsed one line (or one XML entry) at a time
+into ReconciliationEntry rows ready for auto-matching, so memory use stays flat
+apart from the set of references seen. Lines are inserted in chunks, each
+deduplicated against existing reference numbers with one IN query and committed
+on its own, so a file that fails half-way keeps the chunks before the failure
+and can simply be imported again. Lines of one file that share a reference are
+all kept: repeats get an occurrence suffix (REF#2, REF#3), which is stable
+across re-imports of the same file. A BankStatement summarizing the file is
+recorded at the end. Unreadable files raise StatementFormatError.
+"""
+
+import csv
+import hashlib
+import io
+import re
+import time
+import xml.etree.ElementTree as ElementTree
+from collections import defaultdict, namedtuple
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .balances import ZERO
+from .models import BankStatement, ReconciliationEntry
+from .period_locks import calendar
+
+CHUNK_SIZE = 5000
+
+StatementLine = namedtuple('StatementLine', 'reference entry_date amount description')
+
+
+class StatementFormatError(ValueError):
+    """Raised when a statement file cannot be parsed"""
+
+
+class Summary:
+    """Opening/closing balances collected while a statement is parsed"""
+
+    def __init__(self):
+        self.opening_balance = None
+        self.closing_balance = None
+        self.statement_date = None
+
+
+def _decimal(value, decimal_comma=False):
+    text = value.strip()
+    text = text.replace('.', '').replace(',', '.') if decimal_comma else text.replace(',', '')
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        raise StatementFormatError(f'Invalid amount {value!r}')
+
+
+def _date(value, formats=('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y%m%d', '%y%m%d')):
+    text = value.strip()[:10]
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise StatementFormatError(f'Invalid date {value!r}')
+
+
+# CSV ---------------------------------------------------------------------
+
+CSV_COLUMNS = {
+    'date': ('date', 'booking date', 'transaction date', 'value date', 'entry_date'),
+    'reference': ('reference', 'reference number', 'reference_number', 'ref', 'transaction id'),
+    'amount': ('amount', 'signed amount'),
+    'debit': ('debit', 'withdrawal', 'withdrawals'),
+    'credit': ('credit', 'deposit', 'deposits'),
+    'description': ('description', 'details', 'narrative', 'memo'),
+}
+
+
+def _csv_columns(header):
+    normalized = {name.strip().lower(): name for name in header}
+    columns = {}
+    for key, aliases in CSV_COLUMNS.items():
+        columns[key] = next((normalized[alias] for alias in aliases if alias in normalized), None)
+    if not columns['date'] or not (columns['amount'] or columns['debit'] or columns['credit']):
+        raise StatementFormatError('CSV statements need a date column and an amount or debit/credit columns')
+    return columns
+
+
+def parse_csv(stream, summary):
+    reader = csv.DictReader(stream)
+    columns = _csv_columns(reader.fieldnames or [])
+    for row in reader:
+        if columns['amount'] and row.get(columns['amount'], '').strip():
+            amount = _decimal(row[columns['amount']])
+        else:
+            credit = row.get(columns['credit'] or '', '') or ''
+            debit = row.get(columns['debit'] or '', '') or ''
+            amount = (_decimal(credit) if credit.strip() else ZERO) - (_decimal(debit) if debit.strip() else ZERO)
+        yield StatementLine(
+            (row.get(columns['reference'] or '') or '').strip(),
+            _date(row[columns['date']]),
+            amount,
+            (row.get(columns['description'] or '') or '').strip(),
+        )
+
+
+# MT940 -------------------------------------------------------------------
+
+MT940_TAG = re.compile(r'^:(\d{2}[A-Z]?):(.*)$')
+MT940_LINE = re.compile(
+    r'^(?P<date>\d{6})(?P<entry>\d{4})?(?P<mark>R?[CD])[A-Z]?(?P<amount>[\d,]+)'
+    r'[A-Z](?P<type>[A-Z0-9]{3})(?P<reference>[^/]*)(//(?P<bank_reference>.*))?$'
+)
+MT940_BALANCE = re.compile(r'^(?P<mark>[CD])(?P<date>\d{6})[A-Z]{3}(?P<amount>[\d,]+)$')
+MT940_DATE = ('%y%m%d',)
+
+
+def _mt940_balance(value):
+    match = MT940_BALANCE.match(value.strip())
+    if not match:
+        raise StatementFormatError(f'Invalid MT940 balance {value!r}')
+    amount = _decimal(match['amount'], decimal_comma=True)
+    return _date(match['date'], MT940_DATE), -amount if match['mark'] == 'D' else amount
+
+
+def _mt940_statement_line(value, description):
+    match = MT940_LINE.match(value.strip())
+    if not match:
+        raise StatementFormatError(f'Invalid MT940 statement line {value!r}')
+    amount = _decimal(match['amount'], decimal_comma=True)
+    # D (debit) and RC (reversal of credit) reduce the account balance.
+    if match['mark'] in ('D', 'RC'):
+        amount = -amount
+    reference = match['reference'].strip()
+    if reference.upper() == 'NONREF':
+        reference = (match['bank_reference'] or '').strip()
+    return StatementLine(reference, _date(match['date'], MT940_DATE), amount, description)
+
+
+def parse_mt940(stream, summary):
+    """Parse MT940 tag by tag, holding at most one statement line until its :86: details arrive"""
+    pending = None
+    description = []
+    tag, value = None, ''
+
+    def finish(tag, value):
+        nonlocal pending, description
+        if tag == '61':
+            pending, description = _mt940_statement_line(value.split('\n')[0], ''), []
+        elif tag == '86' and pending is not None:
+            description.append(' '.join(part.strip() for part in value.split('\n')))
+        elif tag in ('60F', '60M') and summary.opening_balance is None:
+            summary.statement_date, summary.opening_balance = _mt940_balance(value)
+        elif tag in ('62F', '62M'):
+            summary.statement_date, summary.closing_balance = _mt940_balance(value)
+
+    def flush():
+        nonlocal pending, description
+        if pending is None:
+            return None
+        line = pending._replace(description=' '.join(description))
+        pending, description = None, []
+        return line
+
+    for raw in stream:
+        text = raw.rstrip('\r\n')
+        match = MT940_TAG.match(text)
+        if match is None:
+            if text.strip() in ('-', '-}') or text.startswith('{'):
+                continue
+            value += '\n' + text
+            continue
+        if tag is not None:
+            finish(tag, value)
+        tag, value = match.group(1), match.group(2)
+        if tag != '86':
+            line = flush()
+            if line is not None:
+                yield line
+    if tag is not None:
+        finish(tag, value)
+    line = flush()
+    if line is not None:
+        yield line
+
+
+# CAMT.053 ----------------------------------------------------------------
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _find(element, *path):
+    for name in path:
+        if element is None:
+            return None
+        element = next((child for child in element if _local(child.tag) == name), None)
+    return element
+
+
+def _text(element, *path):
+    found = _find(element, *path)
+    return found.text.strip() if found is not None and found.text else ''
+
+
+def _camt_reference(entry):
+    details = _find(entry, 'NtryDtls', 'TxDtls', 'Refs')
+    for value in (
+        _text(entry, 'AcctSvcrRef'),
+        _text(entry, 'NtryRef'),
+        _text(details, 'EndToEndId') if details is not None else '',
+        _text(details, 'AcctSvcrRef') if details is not None else '',
+    ):
+        if value and value != 'NOTPROVIDED':
+            return value
+    return ''
+
+
+def parse_camt(stream, summary):
+    """Parse CAMT.053 with iterparse, detaching each entry from the tree once it has been read"""
+    parents = []
+    for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            parents.append(element)
+            continue
+        parents.pop()
+        name = _local(element.tag)
+        if name == 'Ntry':
+            amount = _decimal(_text(element, 'Amt'))
+            if _text(element, 'CdtDbtInd') == 'DBIT':
+                amount = -amount
+            booked = _text(element, 'BookgDt', 'Dt') or _text(element, 'BookgDt', 'DtTm') or _text(element, 'ValDt', 'Dt')
+            description = _text(element, 'AddtlNtryInf') or _text(element, 'NtryDtls', 'TxDtls', 'RmtInf', 'Ustrd')
+            yield StatementLine(_camt_reference(element), _date(booked), amount, description)
+        elif name == 'Bal':
+            code = _text(element, 'Tp', 'CdOrPrtry', 'Cd')
+            amount = _decimal(_text(element, 'Amt') or '0')
+            if _text(element, 'CdtDbtInd') == 'DBIT':
+                amount = -amount
+            balance_date = _text(element, 'Dt', 'Dt') or _text(element, 'Dt', 'DtTm')
+            if code == 'OPBD':
+                summary.opening_balance = amount
+            elif code == 'CLBD':
+                summary.closing_balance = amount
+                if balance_date:
+                    summary.statement_date = _date(balance_date)
+        else:
+            continue
+        if parents:
+            parents[-1].remove(element)
+
+
+PARSERS = {
+    'csv': (parse_csv, 'text'),
+    'mt940': (parse_mt940, 'text'),
+    'camt': (parse_camt, 'binary'),
+}
+
+EXTENSIONS = {
+    '.csv': 'csv',
+    '.sta': 'mt940',
+    '.mt940': 'mt940',
+    '.940': 'mt940',
+    '.xml': 'camt',
+    '.camt': 'camt',
+}
+
+
+def detect_format(filename):
+    for extension, statement_format in EXTENSIONS.items():
+        if filename.lower().endswith(extension):
+            return statement_format
+    raise StatementFormatError(f'Cannot tell the statement format of {filename!r}; pass it explicitly')
+
+
+def _synthetic_reference(bank_profile, line, number):
+    """Stable reference for lines without one, so re-importing the same file still deduplicates"""
+    key = f'{bank_profile.account_number}|{line.entry_date}|{line.amount}|{line.description}|{number}'
+    return f'STMT-{hashlib.sha1(key.encode()).hexdigest()[:24]}'
+
+
+def _occurrence_reference(reference, occurrence):
+    """Reference for the nth line of a file carrying the same reference"""
+    if occurrence == 1:
+        return reference[:100]
+    suffix = f'#{occurrence}'
+    return reference[:100 - len(suffix)] + suffix
+
+
+def _parsed_lines(parser, stream, summary):
+    """Lines from a parser, with decoding and syntax errors reported as StatementFormatError"""
+    try:
+        yield from parser(stream, summary)
+    except UnicodeDecodeError as exc:
+        raise StatementFormatError(f'Statement is not UTF-8 text: {exc}')
+    except ElementTree.ParseError as exc:
+        raise StatementFormatError(f'Invalid XML: {exc}')
+    except (csv.Error, InvalidOperation) as exc:
+        raise StatementFormatError(f'Unreadable statement: {exc}')
+
+
+@transaction.atomic
+def _insert_chunk(chunk):
+    """Insert a chunk of lines not already stored; return the number inserted"""
+    existing = set(
+        ReconciliationEntry.objects
+        .filter(reference_number__in=[line.reference for line in chunk])
+        .values_list('reference_number', flat=True)
+    )
+    entries = []
+    for line in chunk:
+        if line.reference in existing:
+            continue
+        entries.append(ReconciliationEntry(
+            reference_number=line.reference,
+            entry_date=line.entry_date,
+            amount=line.amount,
+            description=line.description,
+        ))
+    calendar.check(*{entry.entry_date for entry in entries})
+    ReconciliationEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(entries)
+
+
+def import_statement(stream, statement_format, bank_profile, opening_balance=None, chunk_size=CHUNK_SIZE):
+    """Stream a statement file into ReconciliationEntry rows and record a BankStatement; return import stats"""
+    parser, mode = PARSERS[statement_format]
+    if mode == 'text' and not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    summary = Summary()
+    started = time.perf_counter()
+    rows = inserted = 0
+    deposits = withdrawals = ZERO
+    last_date = None
+    chunk = []
+    occurrences = defaultdict(int)
+
+    for number, line in enumerate(_parsed_lines(parser, stream, summary), start=1):
+        if not line.reference:
+            line = line._replace(reference=_synthetic_reference(bank_profile, line, number))
+        occurrences[line.reference] += 1
+        line = line._replace(reference=_occurrence_reference(line.reference, occurrences[line.reference]))
+        rows += 1
+        if line.amount >= 0:
+            deposits += line.amount
+        else:
+            withdrawals -= line.amount
+        last_date = max(last_date, line.entry_date) if last_date else line.entry_date
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            inserted += _insert_chunk(chunk)
+            chunk = []
+    if chunk:
+        inserted += _insert_chunk(chunk)
+
+    opening = summary.opening_balance
+    if opening is None:
+        opening = opening_balance if opening_balance is not None else bank_profile.current_balance
+    closing = summary.closing_balance
+    if closing is None:
+        closing = opening + deposits - withdrawals
+    # Re-importing a file whose lines are all on record reuses its statement.
+    statement, _ = BankStatement.objects.get_or_create(
+        bank_profile=bank_profile,
+        statement_date=summary.statement_date or last_date or date.today(),
+        opening_balance=opening,
+        closing_balance=closing,
+        total_deposits=deposits,
+        total_withdrawals=withdrawals,
+    )
+
+    elapsed = time.perf_counter() - started
+    return {
+        'statement': statement.pk,
+        'rows': rows,
+        'inserted': inserted,
+        'duplicates': rows - inserted,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed) if elapsed else rows,
+    }
@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import partitions
+from .amortization import run_amortization
+from .audit import write_records
+
+
+@shared_task(autoretry_for=(DatabaseError,), retry_backoff=True, max_retries=5)
+def write_audit_logs(records):
+    """Persist a batch of audit records handed off by an AuditLogWriter"""
+    write_records(records)
+    return len(records)
+
+
+@shared_task
+def amortize_deferrals(period_date=None):
+    """Amortize deferrals for period_date (YYYY-MM-DD), defaulting to the month just ended"""
+    if period_date:
+        period = parse_date(period_date)
+    else:
+        period = timezone.now().date().replace(day=1) - timedelta(days=1)
+    result = run_amortization(period)
+    return {'period_end': str(result['period_end']), 'entries': result['entries'], 'timings': result['timings']}
+
+
+@shared_task
+def manage_audit_partitions(months_ahead=3):
+    """Keep monthly audit partitions ready and archive those past AUDIT_LOG_RETENTION_MONTHS"""
+    try:
+        if not partitions.is_partitioned():
+            return {'skipped': 'the audit table is not partitioned'}
+    except partitions.PartitioningError as exc:
+        return {'skipped': str(exc)}
+    return partitions.maintain(months_ahead, settings.AUDIT_LOG_RETENTION_MONTHS, settings.AUDIT_LOG_ARCHIVE_DIR)
@@ -0,0 +1,176 @@
+"""
+Tax computation from effective-dated TaxRate rows.
+
+Rates are compiled per process into a lookup keyed by tax code and by tax
+type, each holding its date intervals sorted by effective date, so the rate
+for a line is one dict access and a bisect. Batches of lines are computed
+without touching the database. A tax type only stands in for a code while a
+single rate of that type is effective; where several codes of one type overlap
+the lookup raises rather than pick one, and the caller must name the code. The
+lookup is reloaded when a TaxRate changes in any process (shared version key
+in the cache) or after MAX_AGE seconds.
+
+Tax summaries aggregate a period's TaxTransaction rows in one grouped query.
+"""
+
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+
+from . import audit
+from .balances import ZERO
+from .models import TaxRate, TaxSummary, TaxTransaction
+
+VERSION_KEY = 'accounting:tax-rate-version'
+MAX_AGE = 300
+
+CENT = Decimal('0.01')
+HUNDRED = Decimal('100')
+
+
+class MissingTaxRateError(LookupError):
+    """Raised when no tax rate is effective for a tax code or type on a date"""
+
+
+class AmbiguousTaxRateError(MissingTaxRateError):
+    """Raised when several tax codes of a tax type are effective on a date"""
+
+
+def _tax(amount, rate):
+    return (Decimal(str(amount)) * rate / HUNDRED).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class TaxRateLookup:
+    """Precompiled effective-dated rates by tax code and by tax type"""
+
+    def __init__(self, rows):
+        intervals = defaultdict(list)
+        for tax_code, tax_type, rate, effective_date, end_date in rows:
+            intervals[('code', tax_code.upper())].append((effective_date, end_date, rate))
+            intervals[('type', tax_type.upper())].append((effective_date, end_date, rate))
+        self.intervals = {}
+        for key, values in intervals.items():
+            values.sort(key=lambda value: value[0])
+            self.intervals[key] = ([value[0] for value in values], [(value[1], value[2]) for value in values])
+
+    @staticmethod
+    def _effective(series, on):
+        """Rates of the intervals in a series that cover `on`"""
+        starts, periods = series
+        return [rate for end_date, rate in periods[:bisect_right(starts, on)] if end_date is None or on <= end_date]
+
+    def rate(self, tax, on):
+        """Percentage rate effective on `on` for a tax code, falling back to a tax type"""
+        key = tax.upper()
+        series = self.intervals.get(('code', key))
+        if series is None and ('type', key) in self.intervals:
+            effective = self._effective(self.intervals[('type', key)], on)
+            if len(effective) > 1:
+                raise AmbiguousTaxRateError(f'Several {tax} tax codes are effective on {on}; give the tax code')
+        elif series is not None:
+            effective = self._effective(series, on)
+        else:
+            effective = []
+        if effective:
+            return effective[-1]
+        raise MissingTaxRateError(f'No {tax} tax rate effective on {on}')
+
+    def tax(self, amount, tax, on):
+        return _tax(amount, self.rate(tax, on))
+
+
+class TaxRateTable:
+    """Per-process TaxRateLookup refreshed when rates change"""
+
+    def __init__(self, max_age=MAX_AGE):
+        self.max_age = max_age
+        self._lookup = None
+        self._version = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def _is_stale(self):
+        if self._lookup is None or time.monotonic() - self._loaded_at > self.max_age:
+            return True
+        return cache.get(VERSION_KEY) != self._version
+
+    def lookup(self):
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    version = cache.get_or_set(VERSION_KEY, 0, timeout=None)
+                    self._lookup = TaxRateLookup(
+                        TaxRate.objects.values_list('tax_code', 'tax_type', 'rate', 'effective_date', 'end_date')
+                    )
+                    self._version = version
+                    self._loaded_at = time.monotonic()
+        return self._lookup
+
+    def invalidate(self):
+        """Drop the local lookup and tell other processes to reload theirs"""
+        self._lookup = None
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 1, timeout=None)
+
+
+rates = TaxRateTable()
+
+
+def compute(amount, tax, on):
+    """Tax on one amount for a tax code or type at the rate effective on `on`"""
+    return rates.lookup().tax(amount, tax, on)
+
+
+def compute_many(lines):
+    """Return the tax for each (amount, tax code or type, date) line, using one rate lookup per distinct pair"""
+    lookup = rates.lookup()
+    memo = {}
+    results = []
+    for amount, tax, on in lines:
+        key = (tax, on)
+        rate = memo.get(key)
+        if rate is None:
+            rate = memo[key] = lookup.rate(tax, on)
+        results.append(_tax(amount, rate))
+    return results
+
+
+def summarize(period_start, period_end, save=False):
+    """Build one TaxSummary per tax type for the period; with save, replace the period's draft summaries"""
+    rows = (
+        TaxTransaction.objects
+        .filter(transaction_date__range=(period_start, period_end))
+        .values('tax_type')
+        .annotate(taxable=Sum('taxable_amount'), tax=Sum('tax_amount'))
+        .order_by('tax_type')
+    )
+    summaries = [
+        TaxSummary(
+            period_start=period_start,
+            period_end=period_end,
+            tax_type=row['tax_type'],
+            total_taxable_amount=row['taxable'] or ZERO,
+            total_tax_amount=row['tax'] or ZERO,
+        )
+        for row in rows
+    ]
+    if not save:
+        return summaries
+
+    with transaction.atomic():
+        existing = TaxSummary.objects.filter(period_start=period_start, period_end=period_end)
+        filed = set(existing.filter(status='FILED').values_list('tax_type', flat=True))
+        existing.filter(status='DRAFT').delete()
+        # Filed returns are never regenerated.
+        summaries = [summary for summary in summaries if summary.tax_type not in filed]
+        created = TaxSummary.objects.bulk_create(summaries)
+        audit.record_created(created)
+    return created
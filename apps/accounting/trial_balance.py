@@ -0,0 +1,102 @@
+"""
+On-demand trial balance computed from the materialized AccountBalance rows.
+
+Balances at a date come from the month-end running balances, plus the ledger
+entries of the date's own month when the date is not a month end, so the work
+grows with the chart of accounts and one month of postings rather than with
+the ledger. A range is the balance at its end less the balance the day before
+it starts. Results are cached under a ledger version bumped on every write, so
+repeat requests are served from the cache until the ledger changes.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+
+from .balances import ZERO, account_type, balances_at
+from .models import TrialBalance
+
+CACHE_TIMEOUT = 60 * 60
+VERSION_KEY = 'accounting:ledger-version'
+
+
+def ledger_version():
+    return cache.get_or_set(VERSION_KEY, 0, timeout=None)
+
+
+def invalidate():
+    """Invalidate cached trial balances after ledger writes"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
+
+
+def _cache_key(period_date, period_start):
+    return f'accounting:trial-balance:{period_start or ""}:{period_date}:{ledger_version()}'
+
+
+def account_balances(period_date, period_start=None):
+    """Net balance (debits - credits) per account at period_date, or its movement from period_start"""
+    totals = balances_at(period_date)
+    if period_start:
+        for account_code, amount in balances_at(period_start - timedelta(days=1)).items():
+            totals[account_code] = totals.get(account_code, ZERO) - amount
+    return totals
+
+
+def compute_trial_balance(period_date, period_start=None):
+    """Return the trial balance at period_date, optionally limited to entries from period_start"""
+    key = _cache_key(period_date, period_start)
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    accounts = []
+    groups = defaultdict(lambda: {'debits': ZERO, 'credits': ZERO})
+    total_debits = ZERO
+    total_credits = ZERO
+    for account_code, balance in sorted(account_balances(period_date, period_start).items()):
+        if not balance:
+            continue
+        debit_balance = balance if balance > 0 else ZERO
+        credit_balance = -balance if balance < 0 else ZERO
+        kind = account_type(account_code)
+        groups[kind]['debits'] += debit_balance
+        groups[kind]['credits'] += credit_balance
+        total_debits += debit_balance
+        total_credits += credit_balance
+        accounts.append({
+            'account_code': account_code,
+            'account_type': kind,
+            'debit': str(debit_balance),
+            'credit': str(credit_balance),
+        })
+
+    result = {
+        'period_start': str(period_start) if period_start else None,
+        'period_date': str(period_date),
+        'total_debits': str(total_debits),
+        'total_credits': str(total_credits),
+        'is_balanced': total_debits == total_credits,
+        'groups': {
+            kind: {'debits': str(totals['debits']), 'credits': str(totals['credits'])}
+            for kind, totals in sorted(groups.items())
+        },
+        'accounts': accounts,
+    }
+    cache.set(key, result, CACHE_TIMEOUT)
+    return result
+
+
+def create_trial_balance(period_date, period_start=None):
+    """Compute the trial balance and store its totals as a TrialBalance; return (row, result)"""
+    result = compute_trial_balance(period_date, period_start)
+    trial_balance = TrialBalance.objects.create(
+        period_date=period_date,
+        total_debits=result['total_debits'],
+        total_credits=result['total_credits'],
+        is_balanced=result['is_balanced'],
+    )
+    return trial_balance, result
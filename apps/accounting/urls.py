@@ -5,6 +5,7 @@ from . import views
 app_name = 'accounting'
 
 router = DefaultRouter()
+router.register(r'account-balances', views.AccountBalanceViewSet, basename='accountbalance')
 router.register(r'audit-logs', views.AuditLogViewSet, basename='auditlog')
 router.register(r'balance-sheets', views.BalanceSheetViewSet, basename='balancesheet')
 router.register(r'bank-payment-lines', views.BankPaymentLineViewSet, basename='bankpaymentline')
@@ -20,6 +21,7 @@ router.register(r'currencies', views.CurrencyViewSet, basename='currency')
 router.register(r'customers', views.CustomerViewSet, basename='customer')
 router.register(r'deferred-expenses', views.DeferredExpenseViewSet, basename='deferredexpense')
 router.register(r'deferred-revenues', views.DeferredRevenueViewSet, basename='deferredrevenue')
+router.register(r'exchange-rates', views.ExchangeRateViewSet, basename='exchangerate')
 router.register(r'fixed-assets', views.FixedAssetViewSet, basename='fixedasset')
 router.register(r'ledger-entries', views.LedgerEntryViewSet, basename='ledgerentry')
 router.register(r'module-permissions', views.ModulePermissionViewSet, basename='modulepermission')
@@ -1,28 +1,60 @@
-from rest_framework import viewsets, filters
+from decimal import Decimal
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
+from apps.cash_management import revaluation
+from core.pagination import KeysetOptInMixin
+from core.params import parse_date_param
 from .models import *
 from .serializers import *
+from . import financial_statements, fx, tax
+from .balances import month_start
+from .depreciation import run_depreciation
+from .exports import StreamingExportMixin
+from .reconciliation import auto_match
+from .statements import PARSERS, StatementFormatError, detect_format, import_statement
+from .trial_balance import compute_trial_balance, create_trial_balance
 
 
-class StandardPagination(PageNumberPagination):
+class StandardPagination(KeysetOptInMixin, PageNumberPagination):
     page_size = 50
     page_size_query_param = 'page_size'
     max_page_size = 1000
 
 
-class AuditLogViewSet(viewsets.ModelViewSet):
+class AccountBalanceViewSet(StreamingExportMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = AccountBalance.objects.all()
+    serializer_class = AccountBalanceSerializer
+    pagination_class = StandardPagination
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['account_code', 'period']
+    search_fields = ['account_code']
+    ordering_fields = ['account_code', 'period']
+
+
+class AuditLogViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     pagination_class = StandardPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['action', 'entity_type', 'user']
+    # Bounding timestamp lets PostgreSQL prune audit partitions to the requested months.
+    filterset_fields = {
+        'action': ['exact'],
+        'entity_type': ['exact'],
+        'user': ['exact'],
+        'timestamp': ['gte', 'lt'],
+    }
     search_fields = ['entity_type', 'user']
     ordering_fields = ['timestamp']
     ordering = ['-timestamp']
+    keyset_ordering = ['-timestamp', '-id']
 
 
-class BalanceSheetViewSet(viewsets.ModelViewSet):
+class BalanceSheetViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = BalanceSheet.objects.all()
     serializer_class = BalanceSheetSerializer
     pagination_class = StandardPagination
@@ -31,8 +63,22 @@ class BalanceSheetViewSet(viewsets.ModelViewSet):
     ordering_fields = ['period_end']
     ordering = ['-period_end']
 
-
-class BankPaymentLineViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get', 'post'])
+    def build(self, request):
+        """Build the balance sheet at period_end from the latest snapshot; POST also stores a draft"""
+        params = request.data if request.method == 'POST' else request.query_params
+        period_end = parse_date_param(params, 'period_end')
+        period_start = parse_date_param(params, 'period_start') or (period_end and month_start(period_end))
+        if not period_end:
+            return Response({'detail': 'period_end must be a YYYY-MM-DD date'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.method == 'POST':
+            prepared_by = params.get('prepared_by') or request.user.get_username()
+            sheet = financial_statements.build_balance_sheet(period_start, period_end, prepared_by)
+            return Response(BalanceSheetSerializer(sheet).data, status=status.HTTP_201_CREATED)
+        return Response(financial_statements.as_response(financial_statements.balance_sheet(period_end)))
+
+
+class BankPaymentLineViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = BankPaymentLine.objects.all()
     serializer_class = BankPaymentLineSerializer
     pagination_class = StandardPagination
@@ -42,7 +88,7 @@ class BankPaymentLineViewSet(viewsets.ModelViewSet):
     ordering_fields = ['payment_date']
 
 
-class BankProfileViewSet(viewsets.ModelViewSet):
+class BankProfileViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = BankProfile.objects.all()
     serializer_class = BankProfileSerializer
     pagination_class = StandardPagination
@@ -51,7 +97,7 @@ class BankProfileViewSet(viewsets.ModelViewSet):
     search_fields = ['bank_name', 'account_number']
 
 
-class BankReceiptLineViewSet(viewsets.ModelViewSet):
+class BankReceiptLineViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = BankReceiptLine.objects.all()
     serializer_class = BankReceiptLineSerializer
     pagination_class = StandardPagination
@@ -61,7 +107,7 @@ class BankReceiptLineViewSet(viewsets.ModelViewSet):
     ordering_fields = ['receipt_date']
 
 
-class BankStatementViewSet(viewsets.ModelViewSet):
+class BankStatementViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = BankStatement.objects.all()
     serializer_class = BankStatementSerializer
     pagination_class = StandardPagination
@@ -69,8 +115,27 @@ class BankStatementViewSet(viewsets.ModelViewSet):
     filterset_fields = ['status']
     ordering_fields = ['statement_date']
 
-
-class CapitalContributionViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_statement(self, request):
+        """Stream an uploaded CSV, MT940 or CAMT.053 statement into reconciliation entries"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'detail': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            bank_profile = BankProfile.objects.get(pk=request.data.get('bank_profile'))
+        except (BankProfile.DoesNotExist, ValueError):
+            return Response({'detail': 'bank_profile must reference an existing bank profile'}, status=status.HTTP_400_BAD_REQUEST)
+        statement_format = request.data.get('format')
+        if statement_format and statement_format not in PARSERS:
+            return Response({'detail': f"format must be one of: {', '.join(PARSERS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            result = import_statement(upload.file, statement_format or detect_format(upload.name), bank_profile)
+        except StatementFormatError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+
+class CapitalContributionViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = CapitalContribution.objects.all()
     serializer_class = CapitalContributionSerializer
     pagination_class = StandardPagination
@@ -79,7 +144,7 @@ class CapitalContributionViewSet(viewsets.ModelViewSet):
     search_fields = ['contributor_name']
 
 
-class CashFlowForecastViewSet(viewsets.ModelViewSet):
+class CashFlowForecastViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = CashFlowForecast.objects.all()
     serializer_class = CashFlowForecastSerializer
     pagination_class = StandardPagination
@@ -87,7 +152,7 @@ class CashFlowForecastViewSet(viewsets.ModelViewSet):
     ordering_fields = ['period_end']
 
 
-class CashPaymentLineViewSet(viewsets.ModelViewSet):
+class CashPaymentLineViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = CashPaymentLine.objects.all()
     serializer_class = CashPaymentLineSerializer
     pagination_class = StandardPagination
@@ -96,7 +161,7 @@ class CashPaymentLineViewSet(viewsets.ModelViewSet):
     search_fields = ['reference_number', 'payee']
 
 
-class CashReceiptLineViewSet(viewsets.ModelViewSet):
+class CashReceiptLineViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = CashReceiptLine.objects.all()
     serializer_class = CashReceiptLineSerializer
     pagination_class = StandardPagination
@@ -105,7 +170,7 @@ class CashReceiptLineViewSet(viewsets.ModelViewSet):
     search_fields = ['reference_number', 'payer']
 
 
-class CashTransactionViewSet(viewsets.ModelViewSet):
+class CashTransactionViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = CashTransaction.objects.all()
     serializer_class = CashTransactionSerializer
     pagination_class = StandardPagination
@@ -114,7 +179,7 @@ class CashTransactionViewSet(viewsets.ModelViewSet):
     search_fields = ['reference_number']
 
 
-class CurrencyViewSet(viewsets.ModelViewSet):
+class CurrencyViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = Currency.objects.all()
     serializer_class = CurrencySerializer
     pagination_class = StandardPagination
@@ -123,7 +188,7 @@ class CurrencyViewSet(viewsets.ModelViewSet):
     search_fields = ['code', 'name']
 
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     pagination_class = StandardPagination
@@ -132,7 +197,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
     search_fields = ['code', 'name', 'email']
 
 
-class DeferredExpenseViewSet(viewsets.ModelViewSet):
+class DeferredExpenseViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = DeferredExpense.objects.all()
     serializer_class = DeferredExpenseSerializer
     pagination_class = StandardPagination
@@ -140,7 +205,7 @@ class DeferredExpenseViewSet(viewsets.ModelViewSet):
     search_fields = ['description']
 
 
-class DeferredRevenueViewSet(viewsets.ModelViewSet):
+class DeferredRevenueViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = DeferredRevenue.objects.all()
     serializer_class = DeferredRevenueSerializer
     pagination_class = StandardPagination
@@ -148,25 +213,80 @@ class DeferredRevenueViewSet(viewsets.ModelViewSet):
     search_fields = ['description']
 
 
-class FixedAssetViewSet(viewsets.ModelViewSet):
+class ExchangeRateViewSet(StreamingExportMixin, viewsets.ModelViewSet):
+    queryset = ExchangeRate.objects.all()
+    serializer_class = ExchangeRateSerializer
+    pagination_class = StandardPagination
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = {'currency': ['exact'], 'effective_date': ['exact', 'gte', 'lte']}
+    ordering_fields = ['effective_date']
+
+    @action(detail=False, methods=['get', 'post'])
+    def convert(self, request):
+        """Convert amounts at the rate effective on each date; POST takes a list of {amount, currency, date}"""
+        params = request.query_params if request.method == 'GET' else request.data
+        items = [params] if request.method == 'GET' else params.get('items', [])
+        try:
+            convert = fx.converter(params.get('to_currency') or None)
+            results = []
+            for item in items:
+                on = parse_date_param(item, 'date') or timezone.now().date()
+                results.append({
+                    'amount': str(item['amount']),
+                    'currency': item['currency'],
+                    'date': on,
+                    'converted': str(convert(item['amount'], item['currency'], on)),
+                })
+        except (KeyError, TypeError, ArithmeticError):
+            return Response({'detail': 'Each item needs amount, currency and an optional date'}, status=status.HTTP_400_BAD_REQUEST)
+        except fx.MissingRateError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(results[0] if request.method == 'GET' else {'results': results})
+
+    @action(detail=False, methods=['post'])
+    def revalue(self, request):
+        """Revalue treasury FX exposures and accounts into home currency as of as_of_date"""
+        return Response(revaluation.revalue(parse_date_param(request.data, 'as_of_date')))
+
+
+class FixedAssetViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = FixedAsset.objects.all()
     serializer_class = FixedAssetSerializer
     pagination_class = StandardPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ['asset_type']
+    filterset_fields = ['asset_type', 'depreciation_method']
     search_fields = ['asset_code', 'asset_name']
 
+    @action(detail=False, methods=['post'])
+    def depreciate(self, request):
+        """Run depreciation for the month containing period_date; dry_run only reports the charges"""
+        period_date = parse_date_param(request.data, 'period_date')
+        if not period_date:
+            return Response({'detail': 'period_date must be a YYYY-MM-DD date'}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+        return Response(run_depreciation(period_date, dry_run=dry_run))
 
-class LedgerEntryViewSet(viewsets.ModelViewSet):
+
+class LedgerEntryViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = LedgerEntry.objects.all()
     serializer_class = LedgerEntrySerializer
     pagination_class = StandardPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['entry_type']
     search_fields = ['entry_number', 'account_code']
+    keyset_ordering = ['-posted_date', '-id']
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Post a balanced list of journal lines in one transaction"""
+        data = {'entries': request.data} if isinstance(request.data, list) else request.data
+        serializer = LedgerEntryBulkSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        created = serializer.save()
+        return Response({'created': len(created)}, status=status.HTTP_201_CREATED)
 
 
-class ModulePermissionViewSet(viewsets.ModelViewSet):
+class ModulePermissionViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = ModulePermission.objects.all()
     serializer_class = ModulePermissionSerializer
     pagination_class = StandardPagination
@@ -174,7 +294,7 @@ class ModulePermissionViewSet(viewsets.ModelViewSet):
     filterset_fields = ['module_name', 'permission_type', 'is_granted']
 
 
-class PeriodLockViewSet(viewsets.ModelViewSet):
+class PeriodLockViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = PeriodLock.objects.all()
     serializer_class = PeriodLockSerializer
     pagination_class = StandardPagination
@@ -182,8 +302,20 @@ class PeriodLockViewSet(viewsets.ModelViewSet):
     filterset_fields = ['is_locked']
     ordering_fields = ['lock_date']
 
+    @action(detail=False, methods=['post'])
+    def finalize(self, request):
+        """Snapshot the P&L and balance sheet of the locked month containing period_date"""
+        period_date = parse_date_param(request.data, 'period_date')
+        if not period_date:
+            return Response({'detail': 'period_date must be a YYYY-MM-DD date'}, status=status.HTTP_400_BAD_REQUEST)
+        report, sheet = financial_statements.finalize_period(period_date, request.user.get_username() or 'system')
+        return Response({
+            'profit_loss': ProfitLossReportSerializer(report).data,
+            'balance_sheet': BalanceSheetSerializer(sheet).data,
+        })
 
-class ProfitLossReportViewSet(viewsets.ModelViewSet):
+
+class ProfitLossReportViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = ProfitLossReport.objects.all()
     serializer_class = ProfitLossReportSerializer
     pagination_class = StandardPagination
@@ -191,8 +323,24 @@ class ProfitLossReportViewSet(viewsets.ModelViewSet):
     filterset_fields = ['status']
     ordering_fields = ['period_end']
 
-
-class ReconciliationEntryViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get', 'post'])
+    def build(self, request):
+        """Build the P&L for a range from finalized snapshots plus newer postings; POST also stores a draft"""
+        params = request.data if request.method == 'POST' else request.query_params
+        period_start = parse_date_param(params, 'period_start')
+        period_end = parse_date_param(params, 'period_end')
+        if not period_start or not period_end or period_start > period_end:
+            return Response(
+                {'detail': 'period_start and period_end must be YYYY-MM-DD dates in order'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if request.method == 'POST':
+            report = financial_statements.build_profit_loss(period_start, period_end)
+            return Response(ProfitLossReportSerializer(report).data, status=status.HTTP_201_CREATED)
+        return Response(financial_statements.as_response(financial_statements.profit_loss(period_start, period_end)))
+
+
+class ReconciliationEntryViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = ReconciliationEntry.objects.all()
     serializer_class = ReconciliationEntrySerializer
     pagination_class = StandardPagination
@@ -201,7 +349,7 @@ class ReconciliationEntryViewSet(viewsets.ModelViewSet):
     search_fields = ['reference_number']
 
 
-class ReconciliationMatchViewSet(viewsets.ModelViewSet):
+class ReconciliationMatchViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = ReconciliationMatch.objects.all()
     serializer_class = ReconciliationMatchSerializer
     pagination_class = StandardPagination
@@ -209,7 +357,7 @@ class ReconciliationMatchViewSet(viewsets.ModelViewSet):
     filterset_fields = ['is_matched']
 
 
-class ReconciliationRecordViewSet(viewsets.ModelViewSet):
+class ReconciliationRecordViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = ReconciliationRecord.objects.all()
     serializer_class = ReconciliationRecordSerializer
     pagination_class = StandardPagination
@@ -217,8 +365,20 @@ class ReconciliationRecordViewSet(viewsets.ModelViewSet):
     filterset_fields = ['status']
     search_fields = ['reconciliation_period']
 
+    @action(detail=True, methods=['post'], url_path='auto-match')
+    def auto_match(self, request, pk=None):
+        """Match pending bank lines for this reconciliation against payments, receipts and cash transactions"""
+        start = parse_date_param(request.data, 'start_date')
+        end = parse_date_param(request.data, 'end_date')
+        try:
+            window_days = int(request.data.get('window_days', 0)) or None
+            tolerance = Decimal(str(request.data['tolerance'])) if 'tolerance' in request.data else None
+        except (ValueError, ArithmeticError):
+            return Response({'detail': 'window_days must be an integer and tolerance a decimal'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(auto_match(self.get_object(), start, end, window_days=window_days, tolerance=tolerance))
 
-class ShareholdingViewSet(viewsets.ModelViewSet):
+
+class ShareholdingViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = Shareholding.objects.all()
     serializer_class = ShareholdingSerializer
     pagination_class = StandardPagination
@@ -226,7 +386,7 @@ class ShareholdingViewSet(viewsets.ModelViewSet):
     search_fields = ['shareholder_name']
 
 
-class StakeholderViewSet(viewsets.ModelViewSet):
+class StakeholderViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = Stakeholder.objects.all()
     serializer_class = StakeholderSerializer
     pagination_class = StandardPagination
@@ -235,7 +395,7 @@ class StakeholderViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'email']
 
 
-class TaxRateViewSet(viewsets.ModelViewSet):
+class TaxRateViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = TaxRate.objects.all()
     serializer_class = TaxRateSerializer
     pagination_class = StandardPagination
@@ -244,7 +404,7 @@ class TaxRateViewSet(viewsets.ModelViewSet):
     search_fields = ['tax_code']
 
 
-class TaxSummaryViewSet(viewsets.ModelViewSet):
+class TaxSummaryViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = TaxSummary.objects.all()
     serializer_class = TaxSummarySerializer
     pagination_class = StandardPagination
@@ -252,8 +412,21 @@ class TaxSummaryViewSet(viewsets.ModelViewSet):
     filterset_fields = ['status', 'tax_type']
     ordering_fields = ['period_end']
 
-
-class TaxTransactionViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def generate(self, request):
+        """Summarize the period's tax transactions per tax type, replacing draft summaries"""
+        period_start = parse_date_param(request.data, 'period_start')
+        period_end = parse_date_param(request.data, 'period_end')
+        if not period_start or not period_end or period_start > period_end:
+            return Response(
+                {'detail': 'period_start and period_end must be YYYY-MM-DD dates in order'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        summaries = tax.summarize(period_start, period_end, save=True)
+        return Response(TaxSummarySerializer(summaries, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class TaxTransactionViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = TaxTransaction.objects.all()
     serializer_class = TaxTransactionSerializer
     pagination_class = StandardPagination
@@ -261,8 +434,26 @@ class TaxTransactionViewSet(viewsets.ModelViewSet):
     filterset_fields = ['tax_type']
     search_fields = ['transaction_number']
 
-
-class ThemeViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def compute(self, request):
+        """Compute tax for a list of {amount, tax, date} lines, where tax is a tax code or type"""
+        serializer = TaxComputeLineSerializer(data=request.data.get('lines', []), many=True)
+        serializer.is_valid(raise_exception=True)
+        lines = serializer.validated_data
+        try:
+            amounts = tax.compute_many((line['amount'], line['tax'], line['date']) for line in lines)
+        except tax.MissingTaxRateError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'lines': [
+                dict(TaxComputeLineSerializer(line).data, tax_amount=str(amount))
+                for line, amount in zip(lines, amounts)
+            ],
+            'total_tax': str(sum(amounts, Decimal('0'))),
+        })
+
+
+class ThemeViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = Theme.objects.all()
     serializer_class = ThemeSerializer
     pagination_class = StandardPagination
@@ -271,7 +462,7 @@ class ThemeViewSet(viewsets.ModelViewSet):
     search_fields = ['name']
 
 
-class TrialBalanceViewSet(viewsets.ModelViewSet):
+class TrialBalanceViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = TrialBalance.objects.all()
     serializer_class = TrialBalanceSerializer
     pagination_class = StandardPagination
@@ -279,8 +470,26 @@ class TrialBalanceViewSet(viewsets.ModelViewSet):
     filterset_fields = ['is_balanced']
     ordering_fields = ['period_date']
 
-
-class UserEntityViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get', 'post'])
+    def generate(self, request):
+        """Compute the trial balance from account balances; POST also stores it"""
+        params = request.data if request.method == 'POST' else request.query_params
+        period_date = parse_date_param(params, 'period_date')
+        period_start = parse_date_param(params, 'period_start')
+        if not period_date or (params.get('period_start') and not period_start):
+            return Response({'detail': 'period_date (and optional period_start) must be YYYY-MM-DD dates'}, status=status.HTTP_400_BAD_REQUEST)
+        if period_start and period_start > period_date:
+            return Response({'detail': 'period_start must not be after period_date'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.method == 'POST':
+            trial_balance, result = create_trial_balance(period_date, period_start)
+            result = dict(result, trial_balance=self.get_serializer(trial_balance).data)
+        else:
+            result = compute_trial_balance(period_date, period_start)
+        return Response(result)
+
+
+class UserEntityViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = UserEntity.objects.all()
     serializer_class = UserEntitySerializer
     pagination_class = StandardPagination
@@ -289,7 +498,7 @@ class UserEntityViewSet(viewsets.ModelViewSet):
     search_fields = ['entity_name']
 
 
-class UserThemePreferenceViewSet(viewsets.ModelViewSet):
+class UserThemePreferenceViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = UserThemePreference.objects.all()
     serializer_class = UserThemePreferenceSerializer
     pagination_class = StandardPagination
@@ -297,7 +506,7 @@ class UserThemePreferenceViewSet(viewsets.ModelViewSet):
     filterset_fields = ['dark_mode']
 
 
-class VendorInvoiceViewSet(viewsets.ModelViewSet):
+class VendorInvoiceViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = VendorInvoice.objects.all()
     serializer_class = VendorInvoiceSerializer
     pagination_class = StandardPagination
@@ -306,7 +515,7 @@ class VendorInvoiceViewSet(viewsets.ModelViewSet):
     search_fields = ['invoice_number', 'vendor_name']
 
 
-class VendorPaymentViewSet(viewsets.ModelViewSet):
+class VendorPaymentViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = VendorPayment.objects.all()
     serializer_class = VendorPaymentSerializer
     pagination_class = StandardPagination
@@ -315,7 +524,7 @@ class VendorPaymentViewSet(viewsets.ModelViewSet):
     ordering_fields = ['payment_date']
 
 
-class VendorViewSet(viewsets.ModelViewSet):
+class VendorViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
     pagination_class = StandardPagination
@@ -0,0 +1,26 @@
+"""
+Accounts payable aging: open bills (received, approved or partially paid) by
+vendor, built on core.aging.
+"""
+
+from core.aging import DocumentAging
+
+from .models import APAging, VendorBill
+
+OPEN_STATUSES = ('RECEIVED', 'APPROVED', 'PARTIALLY_PAID')
+
+bill_aging = DocumentAging(
+    model=VendorBill,
+    snapshot=APAging,
+    amount_field='bill_amount',
+    date_field='bill_date',
+    party_field='vendor_name',
+    open_statuses=OPEN_STATUSES,
+    cache_prefix='accounts-payable',
+    report_key='vendors',
+)
+
+aging_rows = bill_aging.rows
+aging_report = bill_aging.report
+build_snapshot = bill_aging.build_snapshot
+invalidate = bill_aging.invalidate
@@ -5,3 +5,6 @@ class AccountsPayableConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.accounts_payable'
     verbose_name = 'Accounts Payable'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,42 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.accounts_payable.payment_run import execute_run, plan_run
+
+
+class Command(BaseCommand):
+    help = 'Plan a vendor payment run for a cash budget, capturing the most early-payment discount'
+
+    def add_arguments(self, parser):
+        parser.add_argument('budget', help='Cash available for the run')
+        parser.add_argument('--payment-date', help='Payment date (YYYY-MM-DD); defaults to today')
+        parser.add_argument('--skip-due', action='store_true', help='Only pay bills that earn a discount')
+        parser.add_argument('--execute', action='store_true', help='Create pending VendorPayment rows for the plan')
+        parser.add_argument('--payment-method', default='BANK_TRANSFER')
+
+    def handle(self, *args, **options):
+        try:
+            budget = Decimal(options['budget'])
+        except InvalidOperation:
+            raise CommandError('budget must be an amount')
+        payment_date = None
+        if options['payment_date']:
+            payment_date = parse_date(options['payment_date'])
+            if payment_date is None:
+                raise CommandError('--payment-date must be a YYYY-MM-DD date')
+
+        plan = plan_run(budget, payment_date, include_due=not options['skip_due'])
+        for candidate in plan['payments']:
+            self.stdout.write(
+                f'{candidate.bill_number} {candidate.vendor_name}: pay {candidate.payment} '
+                f'(discount {candidate.discount}, {candidate.reason.lower()})'
+            )
+        if options['execute']:
+            execute_run(plan, options['payment_method'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(plan['payments'])} of {plan['bills_considered']} bills: pay {plan['total_payment']}, "
+            f"discount {plan['total_discount']}, {plan['remaining_budget']} left"
+            + ('' if options['execute'] else ' (plan only)')
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.accounts_payable import aging
+from apps.accounts_payable.totals import bill_totals
+
+
+class Command(BaseCommand):
+    help = 'Recompute bill line totals, bill amounts, paid amounts and statuses from lines and payments'
+
+    def handle(self, *args, **options):
+        fixed = bill_totals.repair()
+        aging.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Fixed {fixed['lines']} line totals, {fixed['headers']} bill totals and {fixed['statuses']} statuses"
+        ))
@@ -15,6 +15,9 @@ class APAging(models.Model):
     
     class Meta:
         verbose_name_plural = "AP Agings"
+        indexes = [
+            models.Index(fields=['report_date', 'vendor_name']),
+        ]
     
     def __str__(self):
         return f"AP Aging - {self.vendor_name}"
@@ -90,11 +93,12 @@ class VendorBill(models.Model):
     vendor_name = models.CharField(max_length=255)
     bill_date = models.DateField()
     due_date = models.DateField()
-    bill_amount = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
+    bill_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     paid_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT')
     description = models.TextField(blank=True)
     received_date = models.DateField(null=True, blank=True)
+    purchase_order_number = models.CharField(max_length=100, blank=True, db_index=True)
     
     def __str__(self):
         return f"{self.bill_number} - {self.vendor_name}"
@@ -106,7 +110,7 @@ class VendorBillLineItem(models.Model):
     description = models.CharField(max_length=255)
     quantity = models.IntegerField(validators=[MinValueValidator(1)])
     unit_price = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
-    line_total = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
+    line_total = models.DecimalField(max_digits=15, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     
     def __str__(self):
         return f"{self.vendor_bill.bill_number} - {self.description}"
@@ -123,6 +127,7 @@ class VendorPayment(models.Model):
     payment_number = models.CharField(max_length=100, unique=True)
     vendor_bill = models.ForeignKey(VendorBill, on_delete=models.CASCADE)
     payment_amount = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
+    discount_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     payment_date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     payment_method = models.CharField(max_length=50)
@@ -1,5 +1,58 @@
 from rest_framework import serializers
+from core.serializers import NestedLinesMixin
 from .models import *
+from .totals import bill_totals
 
-# Auto-create serializers for all models
 
+class APAgingSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = APAging
+        fields = '__all__'
+
+
+class APDiscountSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = APDiscount
+        fields = '__all__'
+
+
+class APReconciliationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = APReconciliation
+        fields = '__all__'
+
+
+class APSettingsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = APSettings
+        fields = '__all__'
+
+
+class VendorBillLineItemNestedSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VendorBillLineItem
+        exclude = ('vendor_bill',)
+        read_only_fields = ('line_total',)
+
+
+class VendorBillSerializer(NestedLinesMixin, serializers.ModelSerializer):
+    totals = bill_totals
+    line_items = VendorBillLineItemNestedSerializer(many=True, required=False)
+
+    class Meta:
+        model = VendorBill
+        fields = '__all__'
+        read_only_fields = ('bill_amount', 'paid_amount')
+
+
+class VendorBillLineItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VendorBillLineItem
+        fields = '__all__'
+        read_only_fields = ('line_total',)
+
+
+class VendorPaymentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VendorPayment
+        fields = '__all__'
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import aging
+from .models import VendorBill, VendorBillLineItem, VendorPayment
+from .totals import bill_totals
+
+bill_totals.connect()
+
+
+@receiver(post_save, sender=VendorBill)
+@receiver(post_delete, sender=VendorBill)
+@receiver(post_save, sender=VendorBillLineItem)
+@receiver(post_delete, sender=VendorBillLineItem)
+@receiver(post_save, sender=VendorPayment)
+@receiver(post_delete, sender=VendorPayment)
+def refresh_aging(sender, **kwargs):
+    """Drop cached aging reports when bills or payments change"""
+    aging.invalidate()
@@ -0,0 +1,16 @@
+from core.totals import DocumentTotals
+from .models import VendorBill, VendorBillLineItem, VendorPayment
+
+# VendorPayment rows count toward paid_amount, cash plus any early-payment discount taken,
+# once their status is in paid_statuses.
+bill_totals = DocumentTotals(
+    header=VendorBill,
+    amount_field='bill_amount',
+    line=VendorBillLineItem,
+    line_fk='vendor_bill',
+    payment=VendorPayment,
+    payment_fk='vendor_bill',
+    paid_statuses=('PROCESSED',),
+    open_status='APPROVED',
+    payment_fields=('payment_amount', 'discount_amount'),
+)
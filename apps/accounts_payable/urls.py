@@ -5,8 +5,14 @@ from . import views
 app_name = 'accounts_payable'
 
 router = DefaultRouter()
+router.register(r'ap-agings', views.APAgingViewSet, basename='apaging')
+router.register(r'ap-discounts', views.APDiscountViewSet, basename='apdiscount')
+router.register(r'ap-reconciliations', views.APReconciliationViewSet, basename='apreconciliation')
+router.register(r'ap-settings', views.APSettingsViewSet, basename='apsettings')
+router.register(r'vendor-bills', views.VendorBillViewSet, basename='vendorbill')
+router.register(r'vendor-bill-line-items', views.VendorBillLineItemViewSet, basename='vendorbilllineitem')
+router.register(r'vendor-payments', views.VendorPaymentViewSet, basename='vendorpayment')
 
 urlpatterns = [
     path('', include(router.urls)),
 ]
-
@@ -1,8 +1,102 @@
-from rest_framework import viewsets
+from decimal import Decimal, InvalidOperation
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from core.pagination import KeysetOptInMixin
+from core.params import parse_date_param
 from .models import *
 from .serializers import *
+from . import aging
+from .payment_run import execute_run, plan_run
 
-class StandardPagination(PageNumberPagination):
+
+class StandardPagination(KeysetOptInMixin, PageNumberPagination):
     page_size = 50
 
+
+class APAgingViewSet(viewsets.ModelViewSet):
+    queryset = APAging.objects.all()
+    serializer_class = APAgingSerializer
+    pagination_class = StandardPagination
+
+    @action(detail=False, methods=['get'])
+    def report(self, request):
+        """Aging of open bills by vendor as of report_date (default today), cached until bills change"""
+        report_date = parse_date_param(request.query_params, 'report_date')
+        report = aging.aging_report(report_date)
+        return aging.bill_aging.paginated_response(report, request, self, StandardPagination.page_size)
+
+    @action(detail=False, methods=['post'])
+    def snapshot(self, request):
+        """Store the aging as of report_date (default today) as APAging rows"""
+        report_date = parse_date_param(request.data, 'report_date')
+        created = aging.build_snapshot(report_date)
+        return Response({'vendors': created}, status=status.HTTP_201_CREATED)
+
+
+class APDiscountViewSet(viewsets.ModelViewSet):
+    queryset = APDiscount.objects.all()
+    serializer_class = APDiscountSerializer
+    pagination_class = StandardPagination
+
+
+class APReconciliationViewSet(viewsets.ModelViewSet):
+    queryset = APReconciliation.objects.all()
+    serializer_class = APReconciliationSerializer
+    pagination_class = StandardPagination
+
+
+class APSettingsViewSet(viewsets.ModelViewSet):
+    queryset = APSettings.objects.all()
+    serializer_class = APSettingsSerializer
+    pagination_class = StandardPagination
+
+
+class VendorBillViewSet(viewsets.ModelViewSet):
+    queryset = VendorBill.objects.prefetch_related('line_items')
+    serializer_class = VendorBillSerializer
+    pagination_class = StandardPagination
+
+
+class VendorBillLineItemViewSet(viewsets.ModelViewSet):
+    queryset = VendorBillLineItem.objects.all()
+    serializer_class = VendorBillLineItemSerializer
+    pagination_class = StandardPagination
+
+
+class VendorPaymentViewSet(viewsets.ModelViewSet):
+    queryset = VendorPayment.objects.all()
+    serializer_class = VendorPaymentSerializer
+    pagination_class = StandardPagination
+
+    @action(detail=False, methods=['post'], url_path='payment-run')
+    def payment_run(self, request):
+        """Plan a payment run for budget on payment_date; with execute, create the pending payments"""
+        try:
+            budget = Decimal(str(request.data.get('budget', '')))
+        except InvalidOperation:
+            budget = None
+        if budget is None or budget < 0:
+            return Response({'detail': 'budget must be a non-negative amount'}, status=status.HTTP_400_BAD_REQUEST)
+        payment_date = parse_date_param(request.data, 'payment_date')
+        include_due = str(request.data.get('include_due', 'true')).lower() not in ('0', 'false')
+        execute = str(request.data.get('execute', '')).lower() in ('1', 'true')
+
+        plan = plan_run(budget, payment_date, include_due=include_due)
+        skipped = []
+        if execute:
+            _, skipped = execute_run(plan, request.data.get('payment_method') or 'BANK_TRANSFER')
+        return Response({
+            **{key: str(value) for key, value in plan.items() if key != 'payments'},
+            'bills_considered': plan['bills_considered'],
+            'executed': execute,
+            # Bills paid or changed by someone else between planning and execution.
+            'skipped_bills': skipped,
+            'payments': [
+                {**candidate._asdict(), **{
+                    field: str(getattr(candidate, field)) for field in ('outstanding', 'discount', 'payment')
+                }}
+                for candidate in plan['payments']
+            ],
+        })
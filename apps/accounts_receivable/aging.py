@@ -0,0 +1,27 @@
+"""
+Accounts receivable aging: open invoices (issued or partially paid) by
+customer, built on core.aging.
+"""
+
+from core.aging import DocumentAging
+
+from .models import ARaging, CustomerInvoice
+
+OPEN_STATUSES = ('ISSUED', 'PARTIALLY_PAID')
+
+invoice_aging = DocumentAging(
+    model=CustomerInvoice,
+    snapshot=ARaging,
+    amount_field='invoice_amount',
+    date_field='invoice_date',
+    party_field='customer_name',
+    open_statuses=OPEN_STATUSES,
+    cache_prefix='accounts-receivable',
+    report_key='customers',
+    charge_field='late_charge_amount',
+)
+
+aging_rows = invoice_aging.rows
+aging_report = invoice_aging.report
+build_snapshot = invoice_aging.build_snapshot
+invalidate = invoice_aging.invalidate
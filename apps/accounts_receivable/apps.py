@@ -5,3 +5,6 @@ class AccountsReceivableConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.accounts_receivable'
     verbose_name = 'Accounts Receivable'
+
+    def ready(self):
+        from . import signals  # noqa: F401
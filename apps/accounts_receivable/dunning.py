@@ -0,0 +1,158 @@
+"""
+Dunning runs for overdue customer invoices.
+
+A run walks invoices that are issued or partially paid, past due and not
+dunned within the last DUNNING_INTERVAL_DAYS, in (due_date, id) keyset order
+over the (status, due_date) index. Each batch is handled in its own short
+transaction: the late charge (late_payment_charge_percentage of the unpaid
+invoice amount, so charges are not charged on again, rounded half up to the
+cent) is computed once per invoice in Python, one UPDATE writes exactly those
+amounts with a CASE on pk and raises the dunning level, and one bulk_create logs a reminder per invoice as a
+CRM Communication. Reminder emails are handed to a rate-limited Celery task in
+chunks once the batch commits, so a run over hundreds of thousands of invoices
+never holds a long transaction or waits on the mail server.
+
+Late charges accumulate in late_charge_amount, apart from invoice_amount, which
+stays the sum of the invoice lines. They are owed on top of it: the invoice is
+only PAID once payments cover both, and the AR aging counts them as
+outstanding.
+"""
+
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Q, Value, When
+from django.utils import timezone
+
+from apps.accounting.models import Customer
+from apps.crm.models import Communication
+
+from . import aging
+from .aging import OPEN_STATUSES
+from .models import ARSettings, CustomerInvoice
+
+BATCH_SIZE = 2000
+DUNNING_INTERVAL_DAYS = getattr(settings, 'DUNNING_INTERVAL_DAYS', 30)
+EMAIL_CHUNK_SIZE = getattr(settings, 'DUNNING_EMAIL_CHUNK_SIZE', 100)
+
+FIELDS = ('pk', 'invoice_number', 'customer_name', 'due_date', 'invoice_amount', 'paid_amount',
+          'late_charge_amount', 'dunning_level')
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+HUNDRED = Decimal('100')
+AMOUNT = DecimalField(max_digits=15, decimal_places=2)
+
+NOTICES = {1: 'Payment reminder', 2: 'Second notice', 3: 'Final notice'}
+
+
+def overdue_invoices(as_of):
+    """Open invoices past due on as_of that are due for another reminder"""
+    return (
+        CustomerInvoice.objects
+        .filter(status__in=OPEN_STATUSES, due_date__lt=as_of)
+        .alias(outstanding=aging.invoice_aging.outstanding())
+        .filter(outstanding__gt=0)
+        .filter(Q(last_dunning_date__isnull=True) | Q(last_dunning_date__lte=as_of - timedelta(days=DUNNING_INTERVAL_DAYS)))
+    )
+
+
+def _batches(as_of, batch_size):
+    """Yield lists of overdue invoice ids and due dates in (due_date, id) keyset order"""
+    last = None
+    while True:
+        queryset = overdue_invoices(as_of)
+        if last is not None:
+            queryset = queryset.filter(Q(due_date__gt=last[0]) | Q(due_date=last[0], pk__gt=last[1]))
+        rows = list(queryset.order_by('due_date', 'pk').values_list('due_date', 'pk')[:batch_size])
+        if not rows:
+            return
+        yield [pk for _, pk in rows]
+        last = rows[-1]
+
+
+def _late_charge(outstanding, percentage):
+    return (outstanding * percentage / HUNDRED).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _reminder(as_of, invoice_number, customer_name, due_date, outstanding, late_charge, total_charges, level):
+    """Subject and body of a reminder; outstanding includes the late charge just applied"""
+    notice = NOTICES.get(level, NOTICES[3])
+    days = (as_of - due_date).days
+    subject = f'{notice}: invoice {invoice_number} is {days} days overdue'
+    lines = [
+        f'Dear {customer_name},',
+        '',
+        f'Invoice {invoice_number} was due on {due_date} and {outstanding} remains unpaid.',
+    ]
+    if late_charge:
+        lines.append(f'A late payment charge of {late_charge} has been applied ({total_charges} in total).')
+    lines += ['', 'Please arrange payment at your earliest convenience.']
+    return subject, '\n'.join(lines)
+
+
+def run_dunning(as_of=None, batch_size=BATCH_SIZE, send_email=True):
+    """Charge and remind every invoice due for dunning on as_of; return run totals"""
+    as_of = as_of or timezone.now().date()
+    ar_settings = ARSettings.objects.first() or ARSettings()
+    rate = ar_settings.late_payment_charge_percentage if ar_settings.late_payment_charge_enabled else ZERO
+    result = {'as_of': as_of, 'invoices': 0, 'late_charges': ZERO, 'communications': 0, 'emails_queued': 0}
+
+    for ids in _batches(as_of, batch_size):
+        with transaction.atomic():
+            # Lock the batch and re-read it so invoices paid or dunned since the scan are left alone.
+            rows = list(overdue_invoices(as_of).select_for_update().filter(pk__in=ids).values_list(*FIELDS))
+            names = {row[2] for row in rows}
+            emails = dict(Customer.objects.filter(name__in=names).exclude(email='').values_list('name', 'email'))
+            now = timezone.now()
+            communications = []
+            late_charges = {}
+            for pk, invoice_number, customer_name, due_date, amount, paid, charges, level in rows:
+                late_charge = _late_charge(max(amount - paid, ZERO), rate)
+                balance = amount + charges + late_charge - paid
+                subject, message = _reminder(
+                    as_of, invoice_number, customer_name, due_date, balance, late_charge, charges + late_charge, level + 1
+                )
+                communications.append(Communication(
+                    communication_type='EMAIL',
+                    recipient=emails.get(customer_name, customer_name),
+                    subject=subject,
+                    message=message,
+                    communication_date=now,
+                    related_to=f'CustomerInvoice:{invoice_number}',
+                ))
+                late_charges[pk] = late_charge
+                result['late_charges'] += late_charge
+
+            # The charges the reminders quote are the ones stored.
+            charge = Case(
+                *(When(pk=pk, then=Value(amount)) for pk, amount in late_charges.items() if amount),
+                default=Value(ZERO),
+                output_field=AMOUNT,
+            )
+            result['invoices'] += CustomerInvoice.objects.filter(pk__in=list(late_charges)).update(
+                late_charge_amount=F('late_charge_amount') + charge,
+                dunning_level=F('dunning_level') + 1,
+                last_dunning_date=as_of,
+            )
+            created = Communication.objects.bulk_create(communications)
+            result['communications'] += len(created)
+            if send_email:
+                email_ids = [communication.pk for communication in created if '@' in communication.recipient]
+                transaction.on_commit(lambda email_ids=email_ids: queue_emails(email_ids))
+                result['emails_queued'] += len(email_ids)
+
+    # Late charges are written by UPDATE, which the aging signals do not see.
+    if result['invoices']:
+        aging.invalidate()
+    return result
+
+
+def queue_emails(communication_ids):
+    """Hand reminder emails to the rate-limited Celery task in chunks"""
+    from .tasks import send_dunning_emails
+
+    for start in range(0, len(communication_ids), EMAIL_CHUNK_SIZE):
+        send_dunning_emails.delay(communication_ids[start:start + EMAIL_CHUNK_SIZE])
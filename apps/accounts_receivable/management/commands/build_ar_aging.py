@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.accounts_receivable.aging import build_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Compute AR aging from open customer invoices and store it as ARaging rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report-date', help='Aging date (YYYY-MM-DD); defaults to today')
+
+    def handle(self, *args, **options):
+        report_date = None
+        if options['report_date']:
+            report_date = parse_date(options['report_date'])
+            if report_date is None:
+                raise CommandError('--report-date must be a YYYY-MM-DD date')
+        started = time.perf_counter()
+        created = build_snapshot(report_date)
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored aging for {created} customers in {time.perf_counter() - started:.2f}s'
+        ))
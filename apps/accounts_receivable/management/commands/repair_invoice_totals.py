@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.accounts_receivable import aging
+from apps.accounts_receivable.totals import invoice_totals
+
+
+class Command(BaseCommand):
+    help = 'Recompute invoice line totals, invoice amounts, paid amounts and statuses from lines and payments'
+
+    def handle(self, *args, **options):
+        fixed = invoice_totals.repair()
+        aging.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Fixed {fixed['lines']} line totals, {fixed['headers']} invoice totals and {fixed['statuses']} statuses"
+        ))
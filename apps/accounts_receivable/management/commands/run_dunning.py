@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.accounts_receivable.dunning import run_dunning
+
+
+class Command(BaseCommand):
+    help = 'Apply late charges to overdue customer invoices and queue reminder emails'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Dunning date (YYYY-MM-DD); defaults to today')
+        parser.add_argument('--no-email', action='store_true', help='Log reminders without sending emails')
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['date']:
+            as_of = parse_date(options['date'])
+            if as_of is None:
+                raise CommandError('--date must be a YYYY-MM-DD date')
+        started = time.perf_counter()
+        result = run_dunning(as_of, send_email=not options['no_email'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Dunned {result['invoices']} invoices, late charges {result['late_charges']}, "
+            f"{result['emails_queued']} emails queued in {time.perf_counter() - started:.2f}s"
+        ))
@@ -15,6 +15,9 @@ class ARaging(models.Model):
     
     class Meta:
         verbose_name_plural = "AR Agings"
+        indexes = [
+            models.Index(fields=['report_date', 'customer_name']),
+        ]
     
     def __str__(self):
         return f"AR Aging - {self.customer_name}"
@@ -90,11 +93,19 @@ class CustomerInvoice(models.Model):
     customer_name = models.CharField(max_length=255)
     invoice_date = models.DateField()
     due_date = models.DateField()
-    invoice_amount = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
+    invoice_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     paid_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT')
     description = models.TextField(blank=True)
     issued_date = models.DateField(null=True, blank=True)
+    late_charge_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0, validators=[MinValueValidator(0)])
+    dunning_level = models.IntegerField(default=0)
+    last_dunning_date = models.DateField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'due_date']),
+        ]
     
     def __str__(self):
         return f"{self.invoice_number} - {self.customer_name}"
@@ -126,7 +137,7 @@ class InvoiceLineItem(models.Model):
     description = models.CharField(max_length=255)
     quantity = models.IntegerField(validators=[MinValueValidator(1)])
     unit_price = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
-    line_total = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
+    line_total = models.DecimalField(max_digits=15, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     
     def __str__(self):
         return f"{self.customer_invoice.invoice_number} - {self.description}"
@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from core.serializers import NestedLinesMixin
 from .models import *
+from .totals import invoice_totals
 
 
 class ARAingSerializer(serializers.ModelSerializer):
@@ -26,10 +28,21 @@ class ARSettingsSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class CustomerInvoiceSerializer(serializers.ModelSerializer):
+class InvoiceLineItemNestedSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InvoiceLineItem
+        exclude = ('customer_invoice',)
+        read_only_fields = ('line_total',)
+
+
+class CustomerInvoiceSerializer(NestedLinesMixin, serializers.ModelSerializer):
+    totals = invoice_totals
+    line_items = InvoiceLineItemNestedSerializer(many=True, required=False)
+
     class Meta:
         model = CustomerInvoice
         fields = '__all__'
+        read_only_fields = ('invoice_amount', 'paid_amount', 'late_charge_amount', 'dunning_level', 'last_dunning_date')
 
 
 class CustomerPaymentSerializer(serializers.ModelSerializer):
@@ -42,3 +55,4 @@ class InvoiceLineItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = InvoiceLineItem
         fields = '__all__'
+        read_only_fields = ('line_total',)
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import aging
+from .models import CustomerInvoice, InvoiceLineItem, CustomerPayment
+from .totals import invoice_totals
+
+invoice_totals.connect()
+
+
+@receiver(post_save, sender=CustomerInvoice)
+@receiver(post_delete, sender=CustomerInvoice)
+@receiver(post_save, sender=InvoiceLineItem)
+@receiver(post_delete, sender=InvoiceLineItem)
+@receiver(post_save, sender=CustomerPayment)
+@receiver(post_delete, sender=CustomerPayment)
+def refresh_aging(sender, **kwargs):
+    """Drop cached aging reports when invoices or payments change"""
+    aging.invalidate()
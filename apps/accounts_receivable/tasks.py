@@ -0,0 +1,42 @@
+from celery import shared_task
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.crm.models import Communication
+
+from .dunning import run_dunning
+from .models import ARSettings
+
+
+@shared_task(bind=True, rate_limit=getattr(settings, 'DUNNING_EMAIL_RATE_LIMIT', '10/m'), max_retries=5)
+def send_dunning_emails(self, communication_ids):
+    """Send a chunk of logged dunning reminders over one mail connection; a retry resends only the unsent ones"""
+    messages = [
+        (pk, EmailMessage(subject, message, None, [recipient]))
+        for pk, subject, message, recipient in Communication.objects
+        .filter(pk__in=communication_ids)
+        .order_by('pk')
+        .values_list('pk', 'subject', 'message', 'recipient')
+    ]
+    sent = 0
+    try:
+        with get_connection() as connection:
+            for _, message in messages:
+                connection.send_messages([message])
+                sent += 1
+    except OSError as exc:
+        unsent = [pk for pk, _ in messages[sent:]]
+        raise self.retry(args=(unsent,), exc=exc, countdown=2 ** self.request.retries)
+    return sent
+
+
+@shared_task
+def dunning_run(as_of=None, force=False):
+    """Run dunning for as_of (YYYY-MM-DD, default today) when auto dunning is enabled or forced"""
+    ar_settings = ARSettings.objects.first()
+    if not force and not (ar_settings and ar_settings.auto_dunning_enabled):
+        return {'skipped': 'auto dunning is disabled'}
+    result = run_dunning(parse_date(as_of) if as_of else timezone.now().date())
+    return {key: str(value) for key, value in result.items()}
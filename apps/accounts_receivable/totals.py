@@ -0,0 +1,15 @@
+from core.totals import DocumentTotals
+from .models import CustomerInvoice, InvoiceLineItem, CustomerPayment
+
+# CustomerPayment rows count toward paid_amount once their status is in paid_statuses.
+invoice_totals = DocumentTotals(
+    header=CustomerInvoice,
+    amount_field='invoice_amount',
+    line=InvoiceLineItem,
+    line_fk='customer_invoice',
+    payment=CustomerPayment,
+    payment_fk='customer_invoice',
+    paid_statuses=('RECEIVED',),
+    open_status='ISSUED',
+    charge_field='late_charge_amount',
+)
@@ -1,10 +1,15 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from core.pagination import KeysetOptInMixin
+from core.params import parse_date_param
 from .models import *
 from .serializers import *
+from . import aging
 
 
-class StandardPagination(PageNumberPagination):
+class StandardPagination(KeysetOptInMixin, PageNumberPagination):
     page_size = 50
 
 
@@ -13,6 +18,20 @@ class ARAingViewSet(viewsets.ModelViewSet):
     serializer_class = ARAingSerializer
     pagination_class = StandardPagination
 
+    @action(detail=False, methods=['get'])
+    def report(self, request):
+        """Aging of open invoices by customer as of report_date (default today), cached until invoices change"""
+        report_date = parse_date_param(request.query_params, 'report_date')
+        report = aging.aging_report(report_date)
+        return aging.invoice_aging.paginated_response(report, request, self, StandardPagination.page_size)
+
+    @action(detail=False, methods=['post'])
+    def snapshot(self, request):
+        """Store the aging as of report_date (default today) as ARaging rows"""
+        report_date = parse_date_param(request.data, 'report_date')
+        created = aging.build_snapshot(report_date)
+        return Response({'customers': created}, status=status.HTTP_201_CREATED)
+
 
 class ARDiscountViewSet(viewsets.ModelViewSet):
     queryset = ARDiscount.objects.all()
@@ -33,7 +52,7 @@ class ARSettingsViewSet(viewsets.ModelViewSet):
 
 
 class CustomerInvoiceViewSet(viewsets.ModelViewSet):
-    queryset = CustomerInvoice.objects.all()
+    queryset = CustomerInvoice.objects.prefetch_related('line_items')
     serializer_class = CustomerInvoiceSerializer
     pagination_class = StandardPagination
 
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.cash_management.revaluation import revalue
+
+
+class Command(BaseCommand):
+    help = 'Revalue FX exposures and treasury accounts into home currency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help='Revaluation date (YYYY-MM-DD); defaults to today')
+
+    def handle(self, *args, **options):
+        as_of_date = None
+        if options['as_of']:
+            as_of_date = parse_date(options['as_of'])
+            if as_of_date is None:
+                raise CommandError('--as-of must be a YYYY-MM-DD date')
+        result = revalue(as_of_date)
+        if result['missing_currencies']:
+            self.stderr.write(f"No rate for: {', '.join(result['missing_currencies'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Revalued {result['fx_exposures']} exposures and {result['treasury_accounts']} treasury accounts "
+            f"into {result['home_currency']} as of {result['as_of_date']}"
+        ))
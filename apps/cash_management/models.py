@@ -103,6 +103,7 @@ class TreasuryAccount(models.Model):
     account_type = models.CharField(max_length=50)
     currency = models.CharField(max_length=3)
     current_balance = models.DecimalField(max_digits=15, decimal_places=2)
+    home_currency_equivalent = models.DecimalField(max_digits=15, decimal_places=2, default=0)
     is_active = models.BooleanField(default=True)
     
     def __str__(self):
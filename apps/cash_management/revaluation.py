@@ -0,0 +1,75 @@
+"""
+Home-currency revaluation of FX exposures and treasury accounts.
+
+Rates come from the in-memory accounting.fx index; each model is revalued by a
+single UPDATE whose rate is chosen per row by currency, so the cost does not
+depend on the number of rows.
+"""
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Round, Upper
+from django.utils import timezone
+
+from apps.accounting.fx import MissingRateError, rates
+from .models import FxExposure, TreasuryAccount
+
+RATE = DecimalField(max_digits=18, decimal_places=8)
+AMOUNT = DecimalField(max_digits=15, decimal_places=2)
+
+
+def _currency_rates(index, queryset, as_of_date):
+    found, missing = {}, []
+    for currency in queryset.annotate(code=Upper('currency')).values_list('code', flat=True).distinct():
+        try:
+            found[currency] = index.rate(currency, as_of_date)
+        except MissingRateError:
+            missing.append(currency)
+    return found, missing
+
+
+def _rate_case(currency_rates):
+    return Case(
+        *[When(code=currency, then=Value(rate)) for currency, rate in currency_rates.items()],
+        output_field=RATE,
+    )
+
+
+def revalue(as_of_date=None):
+    """Recompute home_currency_equivalent for all FX exposures and treasury accounts"""
+    as_of_date = as_of_date or timezone.now().date()
+    index = rates.index()
+    result = {'as_of_date': as_of_date, 'home_currency': index.home_currency}
+    missing = set()
+
+    with transaction.atomic():
+        exposures = FxExposure.objects.all()
+        exposure_rates, exposure_missing = _currency_rates(index, exposures, as_of_date)
+        missing.update(exposure_missing)
+        result['fx_exposures'] = 0
+        if exposure_rates:
+            rate = _rate_case(exposure_rates)
+            result['fx_exposures'] = (
+                exposures.annotate(code=Upper('currency'))
+                .filter(code__in=list(exposure_rates))
+                .update(
+                    current_rate=Round(rate, 4, output_field=RATE),
+                    home_currency_equivalent=Round(F('amount') * rate, 2, output_field=AMOUNT),
+                    as_of_date=as_of_date,
+                )
+            )
+
+        accounts = TreasuryAccount.objects.all()
+        account_rates, account_missing = _currency_rates(index, accounts, as_of_date)
+        missing.update(account_missing)
+        result['treasury_accounts'] = 0
+        if account_rates:
+            rate = _rate_case(account_rates)
+            result['treasury_accounts'] = (
+                accounts.annotate(code=Upper('currency'))
+                .filter(code__in=list(account_rates))
+                .update(home_currency_equivalent=Round(F('current_balance') * rate, 2, output_field=AMOUNT))
+            )
+
+    result['missing_currencies'] = sorted(missing)
+    return result
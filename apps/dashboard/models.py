@@ -246,6 +246,9 @@ class DashboardActivity(models.Model):
     class Meta:
         verbose_name_plural = "Dashboard Activities"
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.action}"
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q, Sum, Count, Avg
 from django_filters.rest_framework import DjangoFilterBackend
+from core.pagination import OptionalKeysetPagination
 from .models import (
     Dashboard, DashboardWidget, DashboardKPI, DashboardChartData,
     UserDashboard, DashboardAlert, DashboardReport, DashboardMetric,
@@ -234,6 +235,8 @@ class DashboardActivityViewSet(viewsets.ModelViewSet):
     queryset = DashboardActivity.objects.all()
     serializer_class = DashboardActivitySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['user', 'dashboard', 'action']
     ordering_fields = ['timestamp']
+    keyset_ordering = ['-timestamp', '-id']
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from . import stock
 from .models import Category, Product, StockMovement
 
 
@@ -13,6 +14,7 @@ class ProductAdmin(admin.ModelAdmin):
     list_display = ('product_code', 'name', 'category', 'unit_price', 'current_stock')
     list_filter = ('category',)
     search_fields = ('product_code', 'name')
+    readonly_fields = ('current_stock',)
 
 
 @admin.register(StockMovement)
@@ -20,3 +22,12 @@ class StockMovementAdmin(admin.ModelAdmin):
     list_display = ('product', 'movement_type', 'quantity', 'created_at')
     list_filter = ('movement_type', 'created_at')
     search_fields = ('product__name', 'reference_id')
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        stock.record(obj)
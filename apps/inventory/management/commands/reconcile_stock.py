@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.inventory.stock import adopt_current_stock, drift, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute Product.current_stock from stock movements. Run while no movements are being recorded; '
+        'use --adopt once to turn stock held before the ledger existed into opening ADJUST movements.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted products without changing them')
+        parser.add_argument('--adopt', action='store_true',
+                            help='Keep current_stock and record ADJUST movements for the difference instead')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['dry_run']:
+            rows = drift()
+            for product_id, current, ledger in rows[:50]:
+                self.stdout.write(f'product {product_id}: current_stock {current}, movements {ledger}')
+            self.stdout.write(f'{len(rows)} products drifted')
+            return
+        if options['adopt']:
+            created = adopt_current_stock()
+            message = f'Recorded {created} opening ADJUST movements'
+        else:
+            message = f'Reset current_stock on {reconcile()} products'
+        self.stdout.write(self.style.SUCCESS(f'{message} in {time.perf_counter() - started:.2f}s'))
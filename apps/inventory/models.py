@@ -22,13 +22,25 @@ class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='products')
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     reorder_level = models.IntegerField(default=10)
+    reorder_quantity = models.IntegerField(default=0, help_text="Minimum quantity per replenishment order")
     current_stock = models.IntegerField(default=0)
+    preferred_vendor = models.ForeignKey(
+        'accounting.Vendor', on_delete=models.SET_NULL, null=True, blank=True, related_name='preferred_products'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'inventory_product'
         ordering = ['name']
+        indexes = [
+            # Covers only products below their reorder level, so replenishment scans stay small.
+            models.Index(
+                fields=['preferred_vendor', 'id'],
+                condition=models.Q(current_stock__lt=models.F('reorder_level')),
+                name='inventory_product_reorder_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -51,6 +63,9 @@ class StockMovement(models.Model):
     class Meta:
         db_table = 'inventory_stock_movement'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.product} - {self.movement_type}"
@@ -1,4 +1,6 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
+from . import stock
 from .models import Category, Product, StockMovement
 
 
@@ -12,9 +14,21 @@ class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = '__all__'
+        read_only_fields = ('current_stock',)
 
 
 class StockMovementSerializer(serializers.ModelSerializer):
     class Meta:
         model = StockMovement
         fields = '__all__'
+
+    def validate(self, attrs):
+        try:
+            stock.signed_quantity(attrs['movement_type'], attrs['quantity'])
+        except DjangoValidationError as error:
+            raise serializers.ValidationError({'quantity': error.messages})
+        return attrs
+
+    def create(self, validated_data):
+        """Record the movement and apply it to the product's current_stock"""
+        return stock.record(StockMovement(**validated_data))
@@ -0,0 +1,145 @@
+"""
+Stock ledger: StockMovement rows are the source of truth for current_stock.
+
+Recording a movement inserts it and moves the product's current_stock by its
+signed quantity (IN adds, OUT removes, ADJUST carries its own sign) with an
+F-expression UPDATE in the same transaction, so concurrent writers never lose
+each other's updates and the row lock lasts only for that short transaction.
+A single movement that removes stock is guarded by making the UPDATE
+conditional on enough stock being there; nothing is read first. Batches first
+lock every product they touch with one select_for_update in id order, so
+concurrent batches always take their row locks in the same order and cannot
+deadlock, check stock on the locked rows, then apply one UPDATE per product and
+one bulk_create for the movements.
+
+Movements are never edited or deleted; corrections are new ADJUST movements.
+reconcile() recomputes current_stock from the movements with one grouped
+aggregate and fixes drifted products in the same UPDATE; adopt_current_stock()
+goes the other way once, recording the stock held before the ledger existed as
+opening ADJUST movements.
+"""
+
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Product, StockMovement
+
+# Stock per product as the signed sum of its movements; OUT quantities are stored positive.
+LEDGER_SQL = (
+    'SELECT {product} AS product_id, '
+    "SUM(CASE WHEN {movement_type} = 'OUT' THEN -{quantity} ELSE {quantity} END) AS stock "
+    'FROM {movement} GROUP BY {product}'
+)
+
+
+class InsufficientStockError(ValidationError):
+    """Raised when a movement would take a product's stock below zero"""
+
+
+def signed_quantity(movement_type, quantity):
+    """Change in stock a movement makes"""
+    if movement_type == 'ADJUST':
+        if not quantity:
+            raise ValidationError('An adjustment needs a non-zero quantity')
+        return quantity
+    if quantity <= 0:
+        raise ValidationError(f'{movement_type} movements need a positive quantity')
+    return quantity if movement_type == 'IN' else -quantity
+
+
+def record(movement, allow_negative=False):
+    """Save an unsaved StockMovement and move its product's current_stock; return the movement"""
+    delta = signed_quantity(movement.movement_type, movement.quantity)
+    with transaction.atomic():
+        products = Product.objects.filter(pk=movement.product_id)
+        if delta < 0 and not allow_negative:
+            products = products.filter(current_stock__gte=-delta)
+        if not products.update(current_stock=F('current_stock') + delta):
+            if not Product.objects.filter(pk=movement.product_id).exists():
+                raise ValidationError(f'Product {movement.product_id} does not exist')
+            raise InsufficientStockError(f'Not enough stock of product {movement.product_id} for {-delta}')
+        movement.save()
+    return movement
+
+
+def record_many(movements, allow_negative=False):
+    """Save unsaved StockMovements and apply them to stock in one transaction; all or none are recorded"""
+    deltas = defaultdict(int)
+    for movement in movements:
+        deltas[movement.product_id] += signed_quantity(movement.movement_type, movement.quantity)
+
+    with transaction.atomic():
+        stock = dict(
+            Product.objects
+            .select_for_update()
+            .filter(pk__in=list(deltas))
+            .order_by('pk')
+            .values_list('pk', 'current_stock')
+        )
+        missing = sorted(set(deltas) - set(stock))
+        if missing:
+            raise ValidationError(f'Products {missing} do not exist')
+        if not allow_negative:
+            short = [product_id for product_id in sorted(deltas) if stock[product_id] + deltas[product_id] < 0]
+            if short:
+                raise InsufficientStockError(f'Not enough stock of products {short}')
+        for product_id in sorted(deltas):
+            if deltas[product_id]:
+                Product.objects.filter(pk=product_id).update(current_stock=F('current_stock') + deltas[product_id])
+        return StockMovement.objects.bulk_create(movements, batch_size=1000)
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _column(model, field):
+    return connection.ops.quote_name(model._meta.get_field(field).column)
+
+
+def _ledger_sql():
+    return LEDGER_SQL.format(
+        product=_column(StockMovement, 'product'),
+        movement_type=_column(StockMovement, 'movement_type'),
+        quantity=_column(StockMovement, 'quantity'),
+        movement=_table(StockMovement),
+    )
+
+
+def drift():
+    """(product id, current_stock, ledger stock) for every product whose stock disagrees with its movements"""
+    product, pk, stock = _table(Product), _column(Product, 'id'), _column(Product, 'current_stock')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT base.{pk}, base.{stock}, COALESCE(ledger.stock, 0) FROM {product} AS base '
+            f'LEFT JOIN ({_ledger_sql()}) AS ledger ON ledger.product_id = base.{pk} '
+            f'WHERE base.{stock} <> COALESCE(ledger.stock, 0) ORDER BY base.{pk}'
+        )
+        return cursor.fetchall()
+
+
+@transaction.atomic
+def reconcile():
+    """Set current_stock to the sum of each product's movements; return the number of products fixed"""
+    product, pk, stock = _table(Product), _column(Product, 'id'), _column(Product, 'current_stock')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {product} SET {stock} = COALESCE(ledger.stock, 0) '
+            f'FROM {product} AS base '
+            f'LEFT JOIN ({_ledger_sql()}) AS ledger ON ledger.product_id = base.{pk} '
+            f'WHERE {product}.{pk} = base.{pk} AND {product}.{stock} <> COALESCE(ledger.stock, 0)'
+        )
+        return cursor.rowcount
+
+
+@transaction.atomic
+def adopt_current_stock(remarks='Opening balance'):
+    """Record ADJUST movements so the ledger matches current_stock where they differ; return movements created"""
+    movements = [
+        StockMovement(product_id=product_id, movement_type='ADJUST', quantity=current - ledger, remarks=remarks)
+        for product_id, current, ledger in drift()
+    ]
+    return len(StockMovement.objects.bulk_create(movements, batch_size=1000))
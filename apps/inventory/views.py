@@ -1,4 +1,8 @@
-from rest_framework import viewsets
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from core.pagination import OptionalKeysetPagination
+from . import stock
 from .models import Category, Product, StockMovement
 from .serializers import CategorySerializer, ProductSerializer, StockMovementSerializer
 
@@ -15,7 +19,19 @@ class ProductViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'product_code']
 
 
-class StockMovementViewSet(viewsets.ModelViewSet):
+class StockMovementViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                           viewsets.GenericViewSet):
+    """Stock ledger; movements are append-only, corrections are new ADJUST movements"""
     queryset = StockMovement.objects.all()
     serializer_class = StockMovementSerializer
+    pagination_class = OptionalKeysetPagination
     filterset_fields = ['product', 'movement_type']
+    keyset_ordering = ['-created_at', '-id']
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Record a list of movements in one transaction; none are recorded if any product would go negative"""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        movements = stock.record_many([StockMovement(**item) for item in serializer.validated_data])
+        return Response(self.get_serializer(movements, many=True).data, status=status.HTTP_201_CREATED)
@@ -5,3 +5,6 @@ class ProcurementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.procurement'
     verbose_name = 'Procurement Management'
+
+    def ready(self):
+        from . import signals  # noqa: F401
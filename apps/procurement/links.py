@@ -0,0 +1,76 @@
+"""
+Foreign keys behind the document-number links between procurement records.
+
+Receipt lines, receipts, PO lines and quotations used to point at their parent
+only through a document number (goods_receipt_number, purchase_order_number,
+rfq_number), so every lookup of a document's children was a string join. Each
+now also carries an indexed foreign key. The number stays as the external
+reference: saving a child resolves the key from its number (or fills the number
+from the key when only the key is set), saving a parent links the children
+already carrying its number and moves its linked children to its current
+number, and backfill() links existing rows in batches, each one UPDATE with a
+correlated subquery. Deleting a parent leaves its children with their number
+and no key, as before the keys existed.
+"""
+
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+
+from .models import GoodsReceipt, GoodsReceiptLineItem, PoLineItem, PurchaseOrder, RequestForQuotation, VendorQuotation
+
+BATCH_SIZE = 10000
+
+Link = namedtuple('Link', 'model field number_field parent parent_number_field')
+
+LINKS = (
+    Link(GoodsReceipt, 'purchase_order', 'purchase_order_number', PurchaseOrder, 'po_number'),
+    Link(GoodsReceiptLineItem, 'goods_receipt', 'goods_receipt_number', GoodsReceipt, 'receipt_number'),
+    Link(PoLineItem, 'purchase_order', 'purchase_order_number', PurchaseOrder, 'po_number'),
+    Link(VendorQuotation, 'rfq', 'rfq_number', RequestForQuotation, 'rfq_number'),
+)
+
+
+def sync_link(link, instance):
+    """Point the foreign key at the parent with the instance's number, or fill the number from the key"""
+    number = getattr(instance, link.number_field)
+    if number:
+        parent_id = link.parent.objects.filter(**{link.parent_number_field: number}).values_list('pk', flat=True).first()
+        setattr(instance, f'{link.field}_id', parent_id)
+    elif getattr(instance, f'{link.field}_id') is not None:
+        setattr(instance, link.number_field, getattr(getattr(instance, link.field), link.parent_number_field))
+
+
+def link_children(parent, instance):
+    """Link the children carrying a saved parent's number to it and renumber children linked to it"""
+    for link in LINKS:
+        if link.parent is not parent:
+            continue
+        number = getattr(instance, link.parent_number_field)
+        children = link.model.objects
+        children.filter(**{link.number_field: number}).exclude(**{link.field: instance}).update(**{link.field: instance})
+        children.filter(**{link.field: instance}).exclude(**{link.number_field: number}).update(**{link.number_field: number})
+
+
+def backfill(batch_size=BATCH_SIZE):
+    """Set missing foreign keys from document numbers, one short transaction per batch; return rows linked"""
+    linked = {}
+    for link in LINKS:
+        parent = (
+            link.parent.objects
+            .filter(**{link.parent_number_field: OuterRef(link.number_field)})
+            .values('pk')[:1]
+        )
+        last_pk = link.model.objects.aggregate(last=Max('pk'))['last'] or 0
+        count = 0
+        for start in range(0, last_pk, batch_size):
+            with transaction.atomic():
+                count += (
+                    link.model.objects
+                    .filter(pk__gt=start, pk__lte=start + batch_size, **{f'{link.field}__isnull': True})
+                    .filter(**{f'{link.number_field}__in': link.parent.objects.values(link.parent_number_field)})
+                    .update(**{link.field: Subquery(parent)})
+                )
+        linked[link.model.__name__] = count
+    return linked
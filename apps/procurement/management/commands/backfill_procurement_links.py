@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.procurement.links import BATCH_SIZE, backfill
+
+
+class Command(BaseCommand):
+    help = 'Link procurement receipts, lines and quotations to their parents by document number'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows updated per transaction')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        linked = backfill(options['batch_size'])
+        summary = ', '.join(f'{count} {name}' for name, count in linked.items())
+        self.stdout.write(self.style.SUCCESS(f'Linked {summary} in {time.perf_counter() - started:.2f}s'))
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.procurement.matching import run_matching
+
+
+class Command(BaseCommand):
+    help = 'Three-way match purchase orders against goods receipts and vendor bills'
+
+    def add_arguments(self, parser):
+        parser.add_argument('po_numbers', nargs='*', help='PO numbers to match; defaults to every PO past draft')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = run_matching(options['po_numbers'] or None)
+        statuses = ', '.join(f'{count} {status.lower()}' for status, count in sorted(result['statuses'].items()))
+        self.stdout.write(self.style.SUCCESS(
+            f"Matched {result['purchase_orders']} purchase orders ({statuses or 'none'}) "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
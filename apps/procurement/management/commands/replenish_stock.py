@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.procurement.replenishment import run_replenishment
+
+
+class Command(BaseCommand):
+    help = 'Create draft purchase orders for products below their reorder level'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = run_replenishment()
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['purchase_orders']} purchase orders with {result['lines']} lines "
+            f"({result['total_amount']}); {result['covered']} already on order, "
+            f"{result['without_vendor']} without a preferred vendor, in {time.perf_counter() - started:.2f}s"
+        ))
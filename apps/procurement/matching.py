@@ -0,0 +1,210 @@
+"""
+Three-way matching of purchase orders, goods receipts and vendor bills.
+
+Receipts and PO lines are joined to their PO through the procurement foreign
+keys, vendor bills through VendorBill.purchase_order_number, and lines on their
+normalized item description. A run works through POs in batches: each batch
+loads its PO lines, receipt lines and bill lines with one query apiece into
+dicts keyed by PO number and item, computes the variances in Python and
+replaces the batch's ThreeWayMatching rows with one delete and one
+bulk_create, so 50k POs take a few dozen queries.
+
+Per item, the quantity variance is billed minus received quantity and the
+price variance is the billed amount minus the billed quantity at the PO price.
+A PO's variance_amount is the billed amount minus the received quantity at PO
+prices, i.e. what the bills ask for beyond what was delivered at the agreed
+price. Status is PENDING until a bill arrives, UNMATCHED when a receipt or bill
+has items that are not on the PO, MATCHED when quantities agree and prices are
+within THREE_WAY_MATCH_TOLERANCE_PERCENTAGE, and VARIANCE otherwise.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accounts_payable.models import VendorBillLineItem
+
+from .models import GoodsReceipt, GoodsReceiptLineItem, PoLineItem, PurchaseOrder, ThreeWayMatching
+
+MATCHABLE_STATUSES = ('SENT', 'ACKNOWLEDGED', 'RECEIVED', 'INVOICED', 'PAID')
+BILLED_STATUSES = ('RECEIVED', 'APPROVED', 'PARTIALLY_PAID', 'PAID')
+BATCH_SIZE = 5000
+TOLERANCE_PERCENTAGE = Decimal(str(getattr(settings, 'THREE_WAY_MATCH_TOLERANCE_PERCENTAGE', 0)))
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+HUNDRED = Decimal('100')
+
+
+def item_key(description):
+    """Normalized item description used to line up PO, receipt and bill lines"""
+    return ' '.join(description.split()).upper()
+
+
+class ItemTotals:
+    """Quantity and amount accumulated for one item on one document type"""
+
+    __slots__ = ('quantity', 'amount')
+
+    def __init__(self):
+        self.quantity = 0
+        self.amount = ZERO
+
+    def add(self, quantity, unit_price):
+        self.quantity += quantity
+        self.amount += quantity * unit_price
+
+
+def _index(rows):
+    """{po_number: {item: ItemTotals}} from (po_number, description, quantity, unit_price) rows"""
+    index = defaultdict(lambda: defaultdict(ItemTotals))
+    for po_number, description, quantity, unit_price in rows:
+        index[po_number][item_key(description)].add(quantity, unit_price)
+    return index
+
+
+def _document_numbers(rows):
+    numbers = defaultdict(list)
+    for po_number, number in rows:
+        numbers[po_number].append(number)
+    return numbers
+
+
+def _load(po_ids):
+    """PO, receipt and bill line indexes plus latest receipt and bill numbers for a batch of {PO id: number}"""
+    ordered = _index(
+        (po_ids[po_id], description, quantity, unit_price)
+        for po_id, description, quantity, unit_price in PoLineItem.objects
+        .filter(purchase_order_id__in=list(po_ids))
+        .values_list('purchase_order_id', 'item_description', 'quantity', 'unit_price')
+    )
+    receipt_rows = GoodsReceipt.objects.filter(purchase_order_id__in=list(po_ids), status='RECEIVED')
+    receipts = {
+        receipt_id: (receipt_number, po_ids[po_id])
+        for receipt_id, receipt_number, po_id in receipt_rows
+        .order_by('receipt_date', 'pk')
+        .values_list('pk', 'receipt_number', 'purchase_order_id')
+    }
+    received = _index(
+        (receipts[receipt_id][1], description, quantity, unit_price)
+        for receipt_id, description, quantity, unit_price in GoodsReceiptLineItem.objects
+        .filter(goods_receipt__in=receipt_rows)
+        .values_list('goods_receipt_id', 'item_description', 'received_quantity', 'unit_price')
+    )
+    bill_lines = list(
+        VendorBillLineItem.objects
+        .filter(vendor_bill__purchase_order_number__in=list(po_ids.values()), vendor_bill__status__in=BILLED_STATUSES)
+        .order_by('vendor_bill__bill_date', 'vendor_bill_id')
+        .values_list('vendor_bill__purchase_order_number', 'vendor_bill__bill_number',
+                     'description', 'quantity', 'unit_price')
+    )
+    billed = _index((po_number, description, quantity, unit_price)
+                    for po_number, _, description, quantity, unit_price in bill_lines)
+    receipt_numbers = _document_numbers((po_number, number) for number, po_number in receipts.values())
+    bill_numbers = _document_numbers((line[0], line[1]) for line in bill_lines)
+    return ordered, received, billed, receipt_numbers, bill_numbers
+
+
+def match_po(ordered, received, billed):
+    """Variances and status for one PO from its {item: ItemTotals} indexes"""
+    lines = []
+    quantity_variance = 0
+    price_variance = variance_amount = ZERO
+    within_tolerance = True
+    for item in sorted(set(ordered) | set(received) | set(billed)):
+        po_line, receipt, bill = ordered.get(item), received.get(item), billed.get(item)
+        received_quantity = receipt.quantity if receipt else 0
+        billed_quantity = bill.quantity if bill else 0
+        billed_amount = bill.amount if bill else ZERO
+        po_price = po_line.amount / po_line.quantity if po_line else None
+        line = {
+            'item': item,
+            'ordered_quantity': po_line.quantity if po_line else 0,
+            'received_quantity': received_quantity,
+            'billed_quantity': billed_quantity,
+            'quantity_variance': billed_quantity - received_quantity,
+        }
+        if po_price is not None:
+            line_price_variance = (billed_amount - billed_quantity * po_price).quantize(CENT)
+            line_variance = (billed_amount - received_quantity * po_price).quantize(CENT)
+            tolerance = billed_quantity * po_price * TOLERANCE_PERCENTAGE / HUNDRED
+            within_tolerance = within_tolerance and abs(line_price_variance) <= tolerance
+            line['price_variance'] = str(line_price_variance)
+            line['variance_amount'] = str(line_variance)
+            price_variance += line_price_variance
+            variance_amount += line_variance
+        quantity_variance += line['quantity_variance']
+        lines.append(line)
+
+    if not billed:
+        # Nothing is billed yet, so there is nothing to be at variance.
+        status = 'PENDING'
+        quantity_variance, price_variance, variance_amount = 0, ZERO, ZERO
+    elif not set(received) <= set(ordered) or not set(billed) <= set(ordered):
+        status = 'UNMATCHED'
+    elif within_tolerance and all(line['quantity_variance'] == 0 for line in lines):
+        status = 'MATCHED'
+    else:
+        status = 'VARIANCE'
+    return {
+        'status': status,
+        'quantity_variance': quantity_variance,
+        'price_variance': price_variance,
+        'variance_amount': variance_amount,
+        'line_variances': lines,
+    }
+
+
+def _batches(po_numbers, batch_size):
+    """Yield {PO id: PO number} batches of the given POs, or of every PO past draft in id order"""
+    if po_numbers is not None:
+        po_numbers = sorted(set(po_numbers))
+        for start in range(0, len(po_numbers), batch_size):
+            yield dict(
+                PurchaseOrder.objects
+                .filter(po_number__in=po_numbers[start:start + batch_size])
+                .values_list('pk', 'po_number')
+            )
+        return
+    last = 0
+    while True:
+        batch = dict(
+            PurchaseOrder.objects
+            .filter(status__in=MATCHABLE_STATUSES, pk__gt=last)
+            .order_by('pk')
+            .values_list('pk', 'po_number')[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last = max(batch)
+
+
+def run_matching(po_numbers=None, matching_date=None, batch_size=BATCH_SIZE):
+    """Match the given POs (default: every PO past draft) and replace their ThreeWayMatching rows"""
+    matching_date = matching_date or timezone.now().date()
+    result = {'purchase_orders': 0, 'statuses': defaultdict(int), 'variance_amount': ZERO}
+    for batch in _batches(po_numbers, batch_size):
+        ordered, received, billed, receipt_numbers, bill_numbers = _load(batch)
+        matches = []
+        for po_number in batch.values():
+            match = match_po(ordered.get(po_number, {}), received.get(po_number, {}), billed.get(po_number, {}))
+            matches.append(ThreeWayMatching(
+                po_number=po_number,
+                # The latest receipt and bill stand for the PO when there are several.
+                goods_receipt_number=receipt_numbers[po_number][-1] if po_number in receipt_numbers else '',
+                invoice_number=bill_numbers[po_number][-1] if po_number in bill_numbers else '',
+                matching_date=matching_date,
+                **match,
+            ))
+            result['statuses'][match['status']] += 1
+            result['variance_amount'] += match['variance_amount']
+        with transaction.atomic():
+            ThreeWayMatching.objects.filter(po_number__in=list(batch.values())).delete()
+            ThreeWayMatching.objects.bulk_create(matches)
+        result['purchase_orders'] += len(matches)
+    result['statuses'] = dict(result['statuses'])
+    return result
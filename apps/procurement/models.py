@@ -4,7 +4,8 @@ from django.core.validators import MinValueValidator
 
 class GoodsReceiptLineItem(models.Model):
     """Goods receipt line items"""
-    goods_receipt_number = models.CharField(max_length=100)
+    goods_receipt = models.ForeignKey('GoodsReceipt', on_delete=models.SET_NULL, null=True, blank=True, related_name='line_items')
+    goods_receipt_number = models.CharField(max_length=100, db_index=True)
     item_description = models.CharField(max_length=255)
     ordered_quantity = models.IntegerField(validators=[MinValueValidator(1)])
     received_quantity = models.IntegerField(validators=[MinValueValidator(1)])
@@ -23,7 +24,8 @@ class GoodsReceipt(models.Model):
     )
     
     receipt_number = models.CharField(max_length=100, unique=True)
-    purchase_order_number = models.CharField(max_length=100)
+    purchase_order = models.ForeignKey('PurchaseOrder', on_delete=models.SET_NULL, null=True, blank=True, related_name='receipts')
+    purchase_order_number = models.CharField(max_length=100, db_index=True)
     receipt_date = models.DateField()
     total_items = models.IntegerField(validators=[MinValueValidator(1)])
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
@@ -35,7 +37,9 @@ class GoodsReceipt(models.Model):
 
 class PoLineItem(models.Model):
     """PO line items"""
-    purchase_order_number = models.CharField(max_length=100)
+    purchase_order = models.ForeignKey('PurchaseOrder', on_delete=models.SET_NULL, null=True, blank=True, related_name='line_items')
+    purchase_order_number = models.CharField(max_length=100, db_index=True)
+    product = models.ForeignKey('inventory.Product', on_delete=models.SET_NULL, null=True, blank=True, related_name='po_line_items')
     item_description = models.CharField(max_length=255)
     quantity = models.IntegerField(validators=[MinValueValidator(1)])
     unit_price = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
@@ -118,6 +122,14 @@ class ThreeWayMatching(models.Model):
     matching_date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     variance_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    quantity_variance = models.IntegerField(default=0)
+    price_variance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    line_variances = models.JSONField(default=list, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['po_number']),
+        ]
     
     def __str__(self):
         return f"Match: {self.po_number}/{self.goods_receipt_number}/{self.invoice_number}"
@@ -134,7 +146,8 @@ class VendorQuotation(models.Model):
     
     quotation_number = models.CharField(max_length=100, unique=True)
     vendor_name = models.CharField(max_length=255)
-    rfq_number = models.CharField(max_length=100)
+    rfq = models.ForeignKey(RequestForQuotation, on_delete=models.SET_NULL, null=True, blank=True, related_name='quotations')
+    rfq_number = models.CharField(max_length=100, db_index=True)
     quotation_date = models.DateField()
     expiry_date = models.DateField()
     total_amount = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
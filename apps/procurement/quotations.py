@@ -0,0 +1,124 @@
+"""
+Ranked comparison of the vendor quotations received for an RFQ.
+
+Quotations for any number of RFQs are read in one query, with each vendor's
+rating joined from procurement.Vendor by name, and scored in memory. The score
+weighs price (cheapest total / this total), vendor rating (rating /
+RATING_SCALE) and remaining validity (days until expiry / the longest validity
+on the RFQ) by QUOTATION_SCORE_WEIGHTS. Quotations already expired, rejected
+or marked expired are listed but not ranked.
+
+Rankings are cached per RFQ and day under a version key that is bumped
+whenever a quotation or vendor changes, so the buyer dashboard can compare
+hundreds of open RFQs with one cache round trip and one query for the misses.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Vendor, VendorQuotation
+
+RANKED_STATUSES = ('QUOTED', 'ACCEPTED')
+OPEN_RFQ_STATUSES = ('OPEN', 'QUOTED')
+WEIGHTS = getattr(settings, 'QUOTATION_SCORE_WEIGHTS', {'price': 0.6, 'rating': 0.25, 'validity': 0.15})
+RATING_SCALE = Decimal('5')
+
+CACHE_TIMEOUT = 60 * 60
+VERSION_KEY = 'procurement:quotation-version'
+
+ZERO = Decimal('0')
+SCORE = Decimal('0.0001')
+
+
+def quotation_version():
+    return cache.get_or_set(VERSION_KEY, 0, timeout=None)
+
+
+def invalidate():
+    """Invalidate cached comparisons after quotation or vendor writes"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
+
+
+def _quotations(rfq_ids):
+    """Quotation rows with vendor rating for the given RFQs, as one query"""
+    rating = Vendor.objects.filter(name=OuterRef('vendor_name')).order_by('-rating').values('rating')[:1]
+    return (
+        VendorQuotation.objects
+        .filter(rfq_id__in=rfq_ids)
+        .annotate(vendor_rating=Subquery(rating))
+        .order_by('rfq_id', 'pk')
+        .values('rfq_id', 'pk', 'quotation_number', 'vendor_name', 'quotation_date', 'expiry_date',
+                'total_amount', 'status', 'vendor_rating')
+    )
+
+
+def _rankable(row, today):
+    return row['status'] in RANKED_STATUSES and row['expiry_date'] >= today and row['total_amount'] > 0
+
+
+def rank(quotations, today):
+    """Score and rank one RFQ's quotation rows; unrankable ones follow with rank None"""
+    weights = {key: Decimal(str(value)) for key, value in WEIGHTS.items()}
+    valid = [row for row in quotations if _rankable(row, today)]
+    cheapest = min((row['total_amount'] for row in valid), default=ZERO)
+    longest = max(((row['expiry_date'] - today).days for row in valid), default=0)
+
+    ranked, others = [], []
+    for row in quotations:
+        days_valid = (row['expiry_date'] - today).days
+        rating = row['vendor_rating'] or ZERO
+        entry = {
+            'quotation_id': row['pk'],
+            'quotation_number': row['quotation_number'],
+            'vendor_name': row['vendor_name'],
+            'total_amount': str(row['total_amount']),
+            'expiry_date': str(row['expiry_date']),
+            'days_valid': days_valid,
+            'vendor_rating': str(rating),
+            'status': row['status'],
+            'score': None,
+            'rank': None,
+        }
+        if not _rankable(row, today):
+            others.append(entry)
+            continue
+        score = (
+            weights.get('price', ZERO) * cheapest / row['total_amount']
+            + weights.get('rating', ZERO) * min(rating / RATING_SCALE, 1)
+            + weights.get('validity', ZERO) * (Decimal(days_valid) / longest if longest else 1)
+        )
+        entry['score'] = score.quantize(SCORE)
+        ranked.append(entry)
+
+    ranked.sort(key=lambda entry: (-entry['score'], Decimal(entry['total_amount']), -entry['days_valid']))
+    for position, entry in enumerate(ranked, 1):
+        entry['rank'] = position
+        entry['score'] = str(entry['score'])
+    return ranked + others
+
+
+def compare(rfq_ids, today=None):
+    """{rfq_id: ranked quotations} for the given RFQs, from the cache where possible"""
+    today = today or timezone.now().date()
+    version = quotation_version()
+    keys = {rfq_id: f'procurement:rfq-compare:{rfq_id}:{today}:{version}' for rfq_id in rfq_ids}
+    cached = cache.get_many(list(keys.values()))
+    result = {rfq_id: cached[key] for rfq_id, key in keys.items() if key in cached}
+
+    missing = [rfq_id for rfq_id in rfq_ids if rfq_id not in result]
+    if missing:
+        rows = defaultdict(list)
+        for row in _quotations(missing):
+            rows[row['rfq_id']].append(row)
+        computed = {rfq_id: rank(rows[rfq_id], today) for rfq_id in missing}
+        cache.set_many({keys[rfq_id]: ranking for rfq_id, ranking in computed.items()}, CACHE_TIMEOUT)
+        result.update(computed)
+    return result
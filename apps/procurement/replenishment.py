@@ -0,0 +1,113 @@
+"""
+Automatic replenishment: draft purchase orders for products below reorder level.
+
+Products with current_stock below reorder_level are read in one query over a
+partial index that holds only such products, so the scan grows with the
+number of products needing stock rather than with the catalog. The same query
+brings each product's quantity already on order (lines of draft, sent or
+acknowledged POs) through a correlated subquery, and rows arrive ordered by
+preferred vendor, so they are streamed and grouped without loading the whole
+set.
+
+A product is ordered up to its reorder level, or reorder_quantity if that is
+larger, less what is already on order, so repeated runs do not reorder the
+same shortfall. Each vendor gets one draft PurchaseOrder with its lines written
+by one bulk_create, in a transaction of its own, numbered with a random run id
+so runs started in the same second cannot collide. Products without a preferred
+vendor are counted and skipped. Preferred vendors are accounting.Vendor rows,
+the vendor master, rather than the legacy procurement.Vendor.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from itertools import groupby
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.inventory.models import Product
+
+from .models import PoLineItem, PurchaseOrder
+
+OPEN_PO_STATUSES = ('DRAFT', 'SENT', 'ACKNOWLEDGED')
+LEAD_DAYS = getattr(settings, 'REORDER_LEAD_DAYS', 7)
+CHUNK_SIZE = 5000
+
+ZERO = Decimal('0.00')
+
+
+def reorder_candidates():
+    """Products below reorder level with their open PO quantity, ordered by preferred vendor"""
+    on_order = (
+        PoLineItem.objects
+        .filter(product=OuterRef('pk'), purchase_order__status__in=OPEN_PO_STATUSES)
+        .values('product')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    return (
+        Product.objects
+        .filter(current_stock__lt=F('reorder_level'))
+        .annotate(on_order=Coalesce(Subquery(on_order, output_field=IntegerField()), 0))
+        .order_by('preferred_vendor_id', 'id')
+        .values_list('pk', 'product_code', 'name', 'unit_price', 'current_stock', 'reorder_level',
+                     'reorder_quantity', 'on_order', 'preferred_vendor', 'preferred_vendor__vendor_name')
+    )
+
+
+def order_quantity(current_stock, reorder_level, reorder_quantity, on_order):
+    return max(reorder_level - current_stock, reorder_quantity) - on_order
+
+
+def _create_order(po_number, vendor_name, po_date, lines):
+    with transaction.atomic():
+        order = PurchaseOrder.objects.create(
+            po_number=po_number,
+            vendor_name=vendor_name,
+            po_date=po_date,
+            delivery_date=po_date + timedelta(days=LEAD_DAYS),
+            total_amount=sum((line.line_total for line in lines), ZERO),
+            status='DRAFT',
+        )
+        for line in lines:
+            line.purchase_order = order
+            line.purchase_order_number = po_number
+        PoLineItem.objects.bulk_create(lines, batch_size=1000)
+    return order
+
+
+def run_replenishment(po_date=None):
+    """Create one draft PO per preferred vendor for products below reorder level; return run totals"""
+    po_date = po_date or timezone.now().date()
+    prefix = f"AUTO-{timezone.now():%Y%m%d%H%M%S}-{uuid4().hex[:8].upper()}"
+    result = {'purchase_orders': 0, 'lines': 0, 'total_amount': ZERO, 'without_vendor': 0, 'covered': 0}
+
+    rows = reorder_candidates().iterator(chunk_size=CHUNK_SIZE)
+    for (vendor_id, vendor_name), products in groupby(rows, key=lambda row: (row[8], row[9])):
+        lines = []
+        for pk, code, name, unit_price, stock, level, minimum, on_order, _, _ in products:
+            if vendor_id is None:
+                result['without_vendor'] += 1
+                continue
+            quantity = order_quantity(stock, level, minimum, on_order)
+            if quantity <= 0:
+                result['covered'] += 1
+                continue
+            lines.append(PoLineItem(
+                product_id=pk,
+                item_description=f'{code} - {name}',
+                quantity=quantity,
+                unit_price=unit_price,
+                line_total=quantity * unit_price,
+            ))
+        if not lines:
+            continue
+        order = _create_order(f'{prefix}-{vendor_id}', vendor_name, po_date, lines)
+        result['purchase_orders'] += 1
+        result['lines'] += len(lines)
+        result['total_amount'] += order.total_amount
+    return result
@@ -1,5 +1,51 @@
 from rest_framework import serializers
-from .models import Vendor
+from .models import (
+    GoodsReceipt, PoLineItem, PurchaseOrder, RequestForQuotation, ThreeWayMatching, Vendor, VendorQuotation,
+)
+
+
+class GoodsReceiptSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GoodsReceipt
+        fields = '__all__'
+        read_only_fields = ('purchase_order',)
+
+
+class PoLineItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PoLineItem
+        fields = '__all__'
+        read_only_fields = ('purchase_order',)
+
+
+class PurchaseOrderSerializer(serializers.ModelSerializer):
+    line_items = PoLineItemSerializer(many=True, read_only=True)
+    receipts = GoodsReceiptSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = PurchaseOrder
+        fields = '__all__'
+
+
+class VendorQuotationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VendorQuotation
+        fields = '__all__'
+        read_only_fields = ('rfq',)
+
+
+class RequestForQuotationSerializer(serializers.ModelSerializer):
+    quotations = VendorQuotationSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = RequestForQuotation
+        fields = '__all__'
+
+
+class ThreeWayMatchingSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ThreeWayMatching
+        fields = '__all__'
 
 
 class VendorSerializer(serializers.ModelSerializer):
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import quotations
+from .links import LINKS, link_children, sync_link
+from .models import Vendor, VendorQuotation
+
+
+def _link_handler(link):
+    def handler(sender, instance, raw=False, **kwargs):
+        """Keep the foreign key and the document number of a saved row in step"""
+        if not raw:
+            sync_link(link, instance)
+    return handler
+
+
+for link in LINKS:
+    pre_save.connect(_link_handler(link), sender=link.model, weak=False, dispatch_uid=f'procurement_link_{link.model.__name__}')
+
+
+def link_saved_parent(sender, instance, raw=False, **kwargs):
+    """Pick up children saved before the parent existed or under its new number"""
+    if not raw:
+        link_children(sender, instance)
+
+
+for parent in {link.parent for link in LINKS}:
+    post_save.connect(link_saved_parent, sender=parent, dispatch_uid=f'procurement_link_parent_{parent.__name__}')
+
+
+@receiver(post_save, sender=VendorQuotation)
+@receiver(post_delete, sender=VendorQuotation)
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+def refresh_quotation_comparisons(sender, **kwargs):
+    """Drop cached RFQ comparisons when quotations or vendor ratings change"""
+    quotations.invalidate()
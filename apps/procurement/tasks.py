@@ -0,0 +1,25 @@
+from celery import shared_task
+
+from .matching import run_matching
+from .replenishment import run_replenishment
+from .models import ProcurementSettings
+
+
+@shared_task
+def three_way_matching(force=False):
+    """Match every open PO when ProcurementSettings requires three-way matching or forced"""
+    procurement_settings = ProcurementSettings.objects.first()
+    if not force and procurement_settings is not None and not procurement_settings.three_way_matching_required:
+        return {'skipped': 'three-way matching is not required'}
+    result = run_matching()
+    return {**result, 'variance_amount': str(result['variance_amount'])}
+
+
+@shared_task
+def replenish_stock():
+    """Draft purchase orders for products below reorder level when auto PO generation is enabled"""
+    procurement_settings = ProcurementSettings.objects.first()
+    if procurement_settings is None or not procurement_settings.auto_po_generation:
+        return {'skipped': 'auto PO generation is disabled'}
+    result = run_replenishment()
+    return {**result, 'total_amount': str(result['total_amount'])}
@@ -1,10 +1,19 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import VendorViewSet
+from .views import (
+    GoodsReceiptViewSet, PoLineItemViewSet, PurchaseOrderViewSet, RequestForQuotationViewSet, ThreeWayMatchingViewSet,
+    VendorQuotationViewSet, VendorViewSet,
+)
 
 app_name = 'procurement'
 
 router = DefaultRouter()
+router.register(r'goods-receipts', GoodsReceiptViewSet)
+router.register(r'po-line-items', PoLineItemViewSet)
+router.register(r'purchase-orders', PurchaseOrderViewSet)
+router.register(r'rfqs', RequestForQuotationViewSet)
+router.register(r'three-way-matchings', ThreeWayMatchingViewSet)
+router.register(r'vendor-quotations', VendorQuotationViewSet)
 router.register(r'vendors', VendorViewSet)
 
 urlpatterns = [
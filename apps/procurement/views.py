@@ -1,9 +1,103 @@
-from rest_framework import viewsets
-from .models import Vendor
-from .serializers import VendorSerializer
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from .matching import run_matching
+from .models import GoodsReceipt, PoLineItem, PurchaseOrder, RequestForQuotation, ThreeWayMatching, Vendor, VendorQuotation
+from .quotations import OPEN_RFQ_STATUSES, compare
+from .serializers import (
+    GoodsReceiptSerializer, PoLineItemSerializer, PurchaseOrderSerializer, RequestForQuotationSerializer,
+    ThreeWayMatchingSerializer, VendorQuotationSerializer, VendorSerializer,
+)
+from .tasks import three_way_matching
+
+
+class GoodsReceiptViewSet(viewsets.ModelViewSet):
+    queryset = GoodsReceipt.objects.all()
+    serializer_class = GoodsReceiptSerializer
+    search_fields = ['receipt_number', 'purchase_order_number']
+
+
+class PoLineItemViewSet(viewsets.ModelViewSet):
+    queryset = PoLineItem.objects.all()
+    serializer_class = PoLineItemSerializer
+    search_fields = ['purchase_order_number', 'item_description']
+
+
+class PurchaseOrderViewSet(viewsets.ModelViewSet):
+    # Lines and receipts come from one indexed query each, whatever the page size.
+    queryset = PurchaseOrder.objects.prefetch_related('line_items', 'receipts')
+    serializer_class = PurchaseOrderSerializer
+    search_fields = ['po_number', 'vendor_name']
+
+
+class RequestForQuotationViewSet(viewsets.ModelViewSet):
+    queryset = RequestForQuotation.objects.prefetch_related('quotations')
+    serializer_class = RequestForQuotationSerializer
+    search_fields = ['rfq_number']
+
+    @action(detail=True, methods=['get'], url_path='compare', url_name='compare-quotations')
+    def compare_quotations(self, request, pk=None):
+        """Quotations for this RFQ ranked by price, vendor rating and validity"""
+        rfq = self.get_object()
+        return Response({'rfq_id': rfq.pk, 'rfq_number': rfq.rfq_number, 'quotations': compare([rfq.pk])[rfq.pk]})
+
+    @action(detail=False, methods=['get'])
+    def compare(self, request):
+        """Ranked quotations for a page of open RFQs, or for the RFQs listed in ?ids=1,2,3"""
+        queryset = RequestForQuotation.objects.order_by('pk')
+        ids = request.query_params.get('ids')
+        if ids:
+            try:
+                queryset = queryset.filter(pk__in=[int(value) for value in ids.split(',')])
+            except ValueError:
+                return Response({'ids': 'Expected comma-separated RFQ ids'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            queryset = queryset.filter(status__in=OPEN_RFQ_STATUSES)
+        rfqs = queryset.values('pk', 'rfq_number', 'status', 'required_delivery_date')
+        page = self.paginate_queryset(rfqs)
+        rfqs = page if page is not None else list(rfqs)
+        rankings = compare([rfq['pk'] for rfq in rfqs])
+        results = [
+            {
+                'rfq_id': rfq['pk'],
+                'rfq_number': rfq['rfq_number'],
+                'status': rfq['status'],
+                'required_delivery_date': rfq['required_delivery_date'],
+                'quotations': rankings[rfq['pk']],
+            }
+            for rfq in rfqs
+        ]
+        return self.get_paginated_response(results) if page is not None else Response(results)
+
+
+class ThreeWayMatchingViewSet(viewsets.ModelViewSet):
+    queryset = ThreeWayMatching.objects.all()
+    serializer_class = ThreeWayMatchingSerializer
+    search_fields = ['po_number', 'goods_receipt_number', 'invoice_number']
+
+    @action(detail=False, methods=['post'])
+    def rematch(self, request):
+        """Re-run three-way matching for po_numbers and return the results; without them, queue a run over every open PO"""
+        po_numbers = request.data.get('po_numbers')
+        if po_numbers is None:
+            task = three_way_matching.delay(force=True)
+            return Response({'task_id': task.id}, status=status.HTTP_202_ACCEPTED)
+        if not isinstance(po_numbers, list) or not all(isinstance(number, str) for number in po_numbers):
+            return Response({'po_numbers': 'Expected a list of PO numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        result = run_matching(po_numbers)
+        result['variance_amount'] = str(result['variance_amount'])
+        matches = self.get_queryset().filter(po_number__in=po_numbers).order_by('po_number')
+        result['matches'] = self.get_serializer(matches, many=True).data
+        return Response(result)
 
 
 class VendorViewSet(viewsets.ModelViewSet):
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
     search_fields = ['name', 'email', 'phone']
+
+
+class VendorQuotationViewSet(viewsets.ModelViewSet):
+    queryset = VendorQuotation.objects.all()
+    serializer_class = VendorQuotationSerializer
+    search_fields = ['quotation_number', 'vendor_name', 'rfq_number']
@@ -1 +1,5 @@
 # ERP Core Module
+
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
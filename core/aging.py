@@ -0,0 +1,149 @@
+"""
+Aging of open documents shared by customer invoices and vendor bills.
+
+Open documents (in one of the open statuses, with an unpaid balance) are
+bucketed by how far their due_date lies before the report date. The buckets
+are summed per party in one grouped query with conditional aggregation,
+comparing due_date against precomputed cutoff dates so the database does no
+date arithmetic per row. Payments reach the aging through the documents'
+paid_amount; charges billed on top of the amount (late charges) are owed too.
+
+The on-demand report is cached per report date under a version key that is
+bumped on every document or payment write; snapshot rows are written in bulk.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+
+BUCKETS = ('current_amount', 'amount_30_days', 'amount_60_days', 'amount_90_days', 'amount_over_90_days')
+
+CACHE_TIMEOUT = 60 * 60
+BATCH_SIZE = 5000
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+AMOUNT = DecimalField(max_digits=15, decimal_places=2)
+
+
+def _bucket(condition, outstanding):
+    return Sum(Case(When(condition, then=outstanding), default=Value(ZERO), output_field=AMOUNT))
+
+
+class DocumentAging:
+    """
+    Aging report and snapshots for one document model.
+
+    `party_field` names the customer or vendor column rows are grouped by and
+    `report_key` the list the parties appear under in the report.
+    """
+
+    def __init__(self, model, snapshot, amount_field, date_field, party_field, open_statuses, cache_prefix, report_key,
+                 charge_field=None):
+        self.model = model
+        self.snapshot = snapshot
+        self.amount_field = amount_field
+        self.date_field = date_field
+        self.party_field = party_field
+        self.open_statuses = tuple(open_statuses)
+        self.cache_prefix = cache_prefix
+        self.report_key = report_key
+        self.charge_field = charge_field
+        self.version_key = f'{cache_prefix}:aging-version'
+
+    def version(self):
+        return cache.get_or_set(self.version_key, 0, timeout=None)
+
+    def invalidate(self):
+        """Invalidate cached aging reports after document or payment writes"""
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, 1, timeout=None)
+
+    def outstanding(self):
+        """Expression for what a document still owes"""
+        amount = F(self.amount_field)
+        if self.charge_field:
+            amount = amount + F(self.charge_field)
+        return amount - F('paid_amount')
+
+    def rows(self, report_date):
+        """Per-party outstanding amounts by aging bucket, as one grouped query"""
+        days_30, days_60, days_90 = (report_date - timedelta(days=days) for days in (30, 60, 90))
+        outstanding = self.outstanding()
+        return (
+            self.model.objects
+            .filter(status__in=self.open_statuses, **{f'{self.date_field}__lte': report_date})
+            .alias(outstanding=outstanding)
+            .filter(outstanding__gt=0)
+            .values(self.party_field)
+            .annotate(
+                total_outstanding=Sum(outstanding, output_field=AMOUNT),
+                current_amount=_bucket(Q(due_date__gte=report_date), outstanding),
+                amount_30_days=_bucket(Q(due_date__lt=report_date, due_date__gte=days_30), outstanding),
+                amount_60_days=_bucket(Q(due_date__lt=days_30, due_date__gte=days_60), outstanding),
+                amount_90_days=_bucket(Q(due_date__lt=days_60, due_date__gte=days_90), outstanding),
+                amount_over_90_days=_bucket(Q(due_date__lt=days_90), outstanding),
+            )
+            .order_by(self.party_field)
+        )
+
+    def report(self, report_date=None):
+        """Aging by party with totals, served from the cache until documents or payments change"""
+        report_date = report_date or timezone.now().date()
+        key = f'{self.cache_prefix}:aging:{report_date}:{self.version()}'
+        report = cache.get(key)
+        if report is not None:
+            return report
+
+        totals = dict.fromkeys(('total_outstanding',) + BUCKETS, ZERO)
+        parties = []
+        for row in self.rows(report_date).iterator(chunk_size=BATCH_SIZE):
+            for field in totals:
+                totals[field] += row[field]
+            parties.append({
+                self.party_field: row[self.party_field],
+                **{field: str(row[field].quantize(CENT)) for field in totals},
+            })
+
+        report = {
+            'report_date': str(report_date),
+            self.report_key: parties,
+            'totals': {field: str(value.quantize(CENT)) for field, value in totals.items()},
+        }
+        cache.set(key, report, CACHE_TIMEOUT)
+        return report
+
+    def build_snapshot(self, report_date=None):
+        """Replace the snapshot rows for report_date with the computed aging; return the number of parties"""
+        report_date = report_date or timezone.now().date()
+        created = 0
+        with transaction.atomic():
+            self.snapshot.objects.filter(report_date=report_date).delete()
+            batch = []
+            for row in self.rows(report_date).iterator(chunk_size=BATCH_SIZE):
+                batch.append(self.snapshot(report_date=report_date, **row))
+                if len(batch) >= BATCH_SIZE:
+                    self.snapshot.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            self.snapshot.objects.bulk_create(batch)
+            created += len(batch)
+        return created
+
+    def paginated_response(self, report, request, view, page_size):
+        """Page through a report's party list, keeping report_date and totals on every page"""
+        paginator = PageNumberPagination()
+        paginator.page_size = page_size
+        paginator.page_size_query_param = 'page_size'
+        parties = paginator.paginate_queryset(report[self.report_key], request, view=view)
+        response = paginator.get_paginated_response(parties)
+        response.data['report_date'] = report['report_date']
+        response.data['totals'] = report['totals']
+        return response
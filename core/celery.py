@@ -0,0 +1,15 @@
+"""
+Celery application for ERP background tasks.
+
+Tasks are discovered from each installed app's tasks module.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+app = Celery('core')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -0,0 +1,14 @@
+"""
+REST framework exception handling shared by all API modules.
+"""
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+from rest_framework.views import exception_handler as drf_exception_handler
+
+
+def exception_handler(exc, context):
+    """Return model-level validation errors (e.g. locked periods) as 400 responses"""
+    if isinstance(exc, DjangoValidationError):
+        exc = ValidationError(exc.message_dict if hasattr(exc, 'error_dict') else exc.messages)
+    return drf_exception_handler(exc, context)
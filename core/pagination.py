@@ -0,0 +1,189 @@
+"""
+Keyset (cursor) pagination shared by high-volume API endpoints.
+
+Page-number pagination runs COUNT(*) and OFFSET n for every page, which gets
+slower the deeper a client pages. Keyset pagination instead filters on the
+last seen (timestamp, id) pair and reads one page from an index, so page
+10,000 costs the same as page 1. Total counts are not reported.
+
+Endpoints opt in per request with ?pagination=keyset (or by following a
+returned cursor link); page-number pagination remains the default.
+"""
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate on a unique composite key such as ('-timestamp', '-id').
+
+    Views set `keyset_ordering`; all fields must share one direction and the
+    last field must be unique. Back the ordering with a matching index.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = ('-id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = tuple(getattr(view, 'keyset_ordering', self.ordering))
+        self.model = queryset.model
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+        ordering = self._reversed(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(cursor['position'], ordering))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        page = results[:self.page_size]
+        if reverse:
+            page.reverse()
+            self.has_next, self.has_previous = bool(page), has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None and bool(page)
+
+        self.next_position = self._position(page[-1]) if self.has_next else None
+        self.previous_position = self._position(page[0]) if self.has_previous else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self._link(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self._link(self.previous_position, reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            position = [
+                self._field(name).to_python(value)
+                for name, value in zip(self.ordering, payload['p'])
+            ]
+            if len(position) != len(self.ordering):
+                raise ValueError
+            return {'position': position, 'reverse': bool(payload.get('r'))}
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'), default=str)
+        return base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii')
+
+    def _link(self, position, reverse):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    def _field(self, name):
+        name = name.lstrip('-')
+        return self.model._meta.pk if name == 'pk' else self.model._meta.get_field(name)
+
+    def _position(self, instance):
+        return [
+            self._field(name).value_to_string(instance)
+            for name in self.ordering
+        ]
+
+    @staticmethod
+    def _reversed(ordering):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+    @staticmethod
+    def _after(position, ordering):
+        """Row-value comparison (a, b) < (x, y) expanded into index-friendly ORs"""
+        condition = Q()
+        equal = Q()
+        for name, value in zip(ordering, position):
+            attr = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{attr}__{lookup}': value})
+            equal &= Q(**{attr: value})
+        return condition
+
+
+class KeysetOptInMixin:
+    """Switch a page-number paginator to keyset pagination on request"""
+    keyset_query_param = 'pagination'
+    keyset_pagination_class = KeysetPagination
+    # Page size in keyset mode; None uses the paginator's own page_size.
+    keyset_page_size = None
+
+    def _use_keyset(self, request):
+        return (
+            request.query_params.get(self.keyset_query_param) == 'keyset'
+            or self.keyset_pagination_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self._use_keyset(request):
+            self.keyset = self.keyset_pagination_class()
+            self.keyset.page_size = self.keyset_page_size or self.page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_previous_link()
+        return super().get_previous_link()
+
+
+class OptionalKeysetPagination(KeysetOptInMixin, PageNumberPagination):
+    """Default page-number pagination (global PAGE_SIZE) with opt-in keyset mode"""
+    keyset_page_size = KeysetPagination.page_size
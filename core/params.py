@@ -0,0 +1,20 @@
+"""
+Request parameter parsing shared by API views.
+"""
+
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+
+def parse_date_param(params, name):
+    """Parse an optional YYYY-MM-DD request parameter: None when missing, a 400 response when malformed"""
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        parsed = parse_date(value)
+    except (TypeError, ValueError):
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: f'{name} must be a YYYY-MM-DD date'})
+    return parsed
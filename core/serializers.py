@@ -0,0 +1,58 @@
+"""
+Writable nested line items for document serializers (invoices, bills).
+
+A header and all of its lines are written in one request: the header is
+inserted with its amount already summed from the lines, and the lines follow
+in one bulk_create, so a document costs the same handful of queries whether
+it has 2 lines or 200. Replacing the lines on update deletes the old ones and
+bulk-inserts the new ones with the per-line totals handlers suspended, then
+sets the header amount once. Updates without line_items leave lines alone.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+
+
+class NestedLinesMixin:
+    """
+    ModelSerializer mixin for a header with a writable nested `line_items` list.
+
+    Subclasses set `totals` to the header's DocumentTotals and declare the
+    nested field, e.g. `line_items = LineSerializer(many=True, required=False)`.
+    """
+
+    totals = None
+    lines_field = 'line_items'
+
+    def _amount(self, lines):
+        return sum((line.line_total for line in lines), Decimal('0.00'))
+
+    @transaction.atomic
+    def create(self, validated_data):
+        lines = validated_data.pop(self.lines_field, [])
+        instance = self.Meta.model(**validated_data)
+        instances = self.totals.build_lines(instance, lines)
+        setattr(instance, self.totals.amount_field, self._amount(instances))
+        instance.save()
+        self.totals.line.objects.bulk_create(instances)
+        return instance
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        """Save only the submitted fields so server-maintained totals are never overwritten"""
+        lines = validated_data.pop(self.lines_field, None)
+        fields = list(validated_data)
+        if lines is not None:
+            instances = self.totals.build_lines(instance, lines)
+            with self.totals.suspended():
+                self.totals.line.objects.filter(**{self.totals.line_fk: instance}).delete()
+                self.totals.line.objects.bulk_create(instances)
+            self.totals.set_amount(instance.pk, self._amount(instances))
+            instance.refresh_from_db(fields=[self.totals.amount_field, 'status'])
+            fields.append(self.totals.amount_field)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # Saving the header last lets its post_save receivers see the new totals.
+        instance.save(update_fields=fields)
+        return instance
@@ -7,6 +7,7 @@ from pathlib import Path
 import os
 from decouple import config
 from datetime import timedelta
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -75,6 +76,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.accounting.audit.AuditContextMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -153,6 +155,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.AcceptHeaderVersioning',
+    'EXCEPTION_HANDLER': 'core.exceptions.exception_handler',
 }
 
 # JWT Configuration
@@ -163,6 +166,78 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Cache Configuration
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('REDIS_URL', default='redis://localhost:6379/0'),
+    }
+}
+
+# Reporting currency used when no Currency is flagged as the base currency.
+HOME_CURRENCY = config('HOME_CURRENCY', default='USD')
+
+# Celery Configuration
+CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_ACKS_LATE = True
+CELERY_BEAT_SCHEDULE = {
+    # Create upcoming audit log partitions and archive those past the retention window.
+    'audit-partitions': {
+        'task': 'apps.accounting.tasks.manage_audit_partitions',
+        'schedule': crontab(minute=15, hour=0),
+    },
+    # Recognize deferred revenue and expenses for the month just ended.
+    'amortize-deferrals': {
+        'task': 'apps.accounting.tasks.amortize_deferrals',
+        'schedule': crontab(minute=30, hour=1, day_of_month=1),
+    },
+    # Charge and remind overdue customer invoices when ARSettings.auto_dunning_enabled is set.
+    'dunning-run': {
+        'task': 'apps.accounts_receivable.tasks.dunning_run',
+        'schedule': crontab(minute=0, hour=6),
+    },
+    # Re-match purchase orders against receipts and bills when three-way matching is required.
+    'three-way-matching': {
+        'task': 'apps.procurement.tasks.three_way_matching',
+        'schedule': crontab(minute=0, hour=2),
+    },
+    # Draft purchase orders for products below reorder level when auto PO generation is enabled.
+    'replenish-stock': {
+        'task': 'apps.procurement.tasks.replenish_stock',
+        'schedule': crontab(minute=0, hour=3),
+    },
+}
+
+# Dunning: days between reminders for one invoice, and how fast reminder emails
+# go out (Celery rate limit per worker, applied to chunks of DUNNING_EMAIL_CHUNK_SIZE;
+# a failed chunk is retried with only the messages not yet sent).
+DUNNING_INTERVAL_DAYS = config('DUNNING_INTERVAL_DAYS', default=30, cast=int)
+DUNNING_EMAIL_CHUNK_SIZE = config('DUNNING_EMAIL_CHUNK_SIZE', default=100, cast=int)
+DUNNING_EMAIL_RATE_LIMIT = config('DUNNING_EMAIL_RATE_LIMIT', default='10/m')
+
+# Bill price deviation from the PO price still accepted as a three-way match, per line.
+THREE_WAY_MATCH_TOLERANCE_PERCENTAGE = config('THREE_WAY_MATCH_TOLERANCE_PERCENTAGE', default='0')
+
+# Days from order to expected delivery on automatically generated purchase orders.
+REORDER_LEAD_DAYS = config('REORDER_LEAD_DAYS', default=7, cast=int)
+
+# Audit Log Configuration
+# 'buffered' writes from an in-process background thread, 'celery' hands batches
+# to a Celery task for durability, 'off' disables automatic audit records.
+AUDIT_LOG_MODE = config('AUDIT_LOG_MODE', default='buffered')
+AUDIT_LOG_BATCH_SIZE = config('AUDIT_LOG_BATCH_SIZE', default=500, cast=int)
+AUDIT_LOG_FLUSH_INTERVAL = config('AUDIT_LOG_FLUSH_INTERVAL', default=2.0, cast=float)
+AUDIT_LOG_MAX_QUEUE = config('AUDIT_LOG_MAX_QUEUE', default=10000, cast=int)
+# Monthly audit partitions older than the retention window are archived by the daily
+# manage_audit_partitions task (or the command of the same name).
+AUDIT_LOG_RETENTION_MONTHS = config('AUDIT_LOG_RETENTION_MONTHS', default=24, cast=int)
+AUDIT_LOG_ARCHIVE_DIR = config('AUDIT_LOG_ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'archive', 'audit_logs'))
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
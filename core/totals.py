@@ -0,0 +1,232 @@
+"""
+Server-maintained document totals shared by customer invoices and vendor bills.
+
+Line totals are computed from quantity x unit price before a line is saved.
+Each line or payment write then moves its header's amount and paid_amount by
+the difference it makes, with a single UPDATE using F-expressions, so
+concurrent writers never overwrite each other and list views read stored
+totals without aggregating lines. The same UPDATE moves the header between
+its open, partially paid and paid statuses.
+
+Bulk line writes (nested invoice serializers) suspend the per-line handlers
+and set the header amount once with set_amount().
+
+repair() recomputes everything from the lines and payments: one UPDATE for
+line totals and one aggregate-join UPDATE for the headers.
+"""
+
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, F, Q, Value, When
+from django.db.models.functions import Round
+from django.db.models.lookups import GreaterThan, LessThanOrEqual
+from django.db.models.signals import post_delete, post_save, pre_save
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+AMOUNT = DecimalField(max_digits=15, decimal_places=2)
+
+
+class DocumentTotals:
+    """
+    Keep a header's amount and paid_amount in step with its lines and payments.
+
+    `open_status` is the status a header returns to when nothing is paid; only
+    headers in that status or already partially paid/paid change status.
+    `payment_fields` are the payment columns that together settle the header,
+    e.g. the cash paid plus a discount taken. `charge_field` names a header
+    column billed on top of the line amount (late charges); it must be paid
+    too before the header counts as paid.
+    """
+
+    def __init__(self, header, amount_field, line, line_fk, payment, payment_fk, paid_statuses, open_status,
+                 payment_fields=('payment_amount',), charge_field=None):
+        self.header = header
+        self.amount_field = amount_field
+        self.line = line
+        self.line_fk = line_fk
+        self.payment = payment
+        self.payment_fk = payment_fk
+        self.paid_statuses = tuple(paid_statuses)
+        self.open_status = open_status
+        self.payment_fields = tuple(payment_fields)
+        self.charge_field = charge_field
+        self.settled_statuses = (open_status, 'PARTIALLY_PAID', 'PAID')
+        self._local = threading.local()
+
+    @contextmanager
+    def suspended(self):
+        """Skip incremental maintenance in this thread, for callers that set totals themselves"""
+        self._local.suspended = True
+        try:
+            yield
+        finally:
+            self._local.suspended = False
+
+    def _active(self, raw=False):
+        return not raw and not getattr(self._local, 'suspended', False)
+
+    # Incremental maintenance ---------------------------------------------
+
+    def status_expression(self, amount, paid):
+        """Status a header should hold for the given amount and paid expressions"""
+        if self.charge_field:
+            amount = amount + F(self.charge_field)
+        return Case(
+            When(~Q(status__in=self.settled_statuses), then=F('status')),
+            When(Q(GreaterThan(amount, ZERO), LessThanOrEqual(amount, paid)), then=Value('PAID')),
+            When(GreaterThan(paid, ZERO), then=Value('PARTIALLY_PAID')),
+            default=Value(self.open_status),
+        )
+
+    def apply(self, header_id, amount_delta=ZERO, paid_delta=ZERO):
+        """Move a header's amount and paid_amount by the given deltas in one UPDATE"""
+        if header_id is None or (not amount_delta and not paid_delta):
+            return
+        amount = F(self.amount_field) + amount_delta
+        paid = F('paid_amount') + paid_delta
+        self.header.objects.filter(pk=header_id).update(**{
+            self.amount_field: amount,
+            'paid_amount': paid,
+            'status': self.status_expression(amount, paid),
+        })
+
+    def set_amount(self, header_id, amount):
+        """Set a header's amount outright, e.g. after replacing all of its lines"""
+        amount = Value(amount, output_field=AMOUNT)
+        self.header.objects.filter(pk=header_id).update(**{
+            self.amount_field: amount,
+            'status': self.status_expression(amount, F('paid_amount')),
+        })
+
+    def line_total(self, line):
+        return (Decimal(line.quantity) * Decimal(str(line.unit_price))).quantize(CENT)
+
+    def build_lines(self, header, lines):
+        """Unsaved line instances for header from validated line data, with line totals set"""
+        instances = [self.line(**{self.line_fk: header}, **data) for data in lines]
+        for instance in instances:
+            instance.line_total = self.line_total(instance)
+        return instances
+
+    def _stored(self, sender, instance, fields):
+        if instance._state.adding or instance.pk is None:
+            return None
+        return sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+
+    def before_line_save(self, sender, instance, raw=False, **kwargs):
+        if not self._active(raw):
+            return
+        instance.line_total = self.line_total(instance)
+        instance._stored_total = self._stored(sender, instance, (f'{self.line_fk}_id', 'line_total'))
+
+    def after_line_save(self, sender, instance, raw=False, **kwargs):
+        if not self._active(raw):
+            return
+        current = (getattr(instance, f'{self.line_fk}_id'), instance.line_total)
+        self._move(getattr(instance, '_stored_total', None), current, 'amount_delta')
+
+    def after_line_delete(self, sender, instance, **kwargs):
+        if not self._active():
+            return
+        self.apply(getattr(instance, f'{self.line_fk}_id'), amount_delta=-instance.line_total)
+
+    def _settled(self, status, amounts):
+        if status not in self.paid_statuses:
+            return ZERO
+        return sum((Decimal(str(amount)) for amount in amounts), ZERO)
+
+    def _payment_value(self, payment):
+        return self._settled(payment.status, (getattr(payment, field) for field in self.payment_fields))
+
+    def before_payment_save(self, sender, instance, raw=False, **kwargs):
+        if not self._active(raw):
+            return
+        stored = self._stored(sender, instance, (f'{self.payment_fk}_id', 'status') + self.payment_fields)
+        instance._stored_payment = None
+        if stored is not None:
+            header_id, status, *amounts = stored
+            instance._stored_payment = (header_id, self._settled(status, amounts))
+
+    def after_payment_save(self, sender, instance, raw=False, **kwargs):
+        if not self._active(raw):
+            return
+        current = (getattr(instance, f'{self.payment_fk}_id'), self._payment_value(instance))
+        self._move(getattr(instance, '_stored_payment', None), current, 'paid_delta')
+
+    def after_payment_delete(self, sender, instance, **kwargs):
+        if not self._active():
+            return
+        self.apply(getattr(instance, f'{self.payment_fk}_id'), paid_delta=-self._payment_value(instance))
+
+    def _move(self, previous, current, delta_name):
+        """Apply the change from a previous (header, value) to the current one, across headers if it moved"""
+        header_id, value = current
+        if previous is None:
+            self.apply(header_id, **{delta_name: value})
+        elif previous[0] == header_id:
+            self.apply(header_id, **{delta_name: value - previous[1]})
+        else:
+            self.apply(previous[0], **{delta_name: -previous[1]})
+            self.apply(header_id, **{delta_name: value})
+
+    def connect(self):
+        name = self.header.__name__
+        pre_save.connect(self.before_line_save, sender=self.line, dispatch_uid=f'totals_line_pre_{name}')
+        post_save.connect(self.after_line_save, sender=self.line, dispatch_uid=f'totals_line_post_{name}')
+        post_delete.connect(self.after_line_delete, sender=self.line, dispatch_uid=f'totals_line_delete_{name}')
+        pre_save.connect(self.before_payment_save, sender=self.payment, dispatch_uid=f'totals_payment_pre_{name}')
+        post_save.connect(self.after_payment_save, sender=self.payment, dispatch_uid=f'totals_payment_post_{name}')
+        post_delete.connect(self.after_payment_delete, sender=self.payment, dispatch_uid=f'totals_payment_delete_{name}')
+
+    # Bulk repair ---------------------------------------------------------
+
+    def _column(self, model, field):
+        return connection.ops.quote_name(model._meta.get_field(field).column)
+
+    def _table(self, model):
+        return connection.ops.quote_name(model._meta.db_table)
+
+    @transaction.atomic
+    def repair(self):
+        """Recompute line totals, header amounts, paid amounts and statuses; return rows fixed per step"""
+        expected = Round(F('quantity') * F('unit_price'), 2, output_field=AMOUNT)
+        lines_fixed = self.line.objects.exclude(line_total=expected).update(line_total=expected)
+
+        header, line, payment = self._table(self.header), self._table(self.line), self._table(self.payment)
+        pk = self._column(self.header, self.header._meta.pk.name)
+        amount = self._column(self.header, self.amount_field)
+        paid = self._column(self.header, 'paid_amount')
+        line_fk, line_total = self._column(self.line, self.line_fk), self._column(self.line, 'line_total')
+        payment_fk = self._column(self.payment, self.payment_fk)
+        payment_amount = ' + '.join(self._column(self.payment, field) for field in self.payment_fields)
+        status = self._column(self.payment, 'status')
+        placeholders = ', '.join(['%s'] * len(self.paid_statuses))
+        # Headers without lines keep their amount; headers without payments go back to zero paid.
+        sql = (
+            f'UPDATE {header} SET {amount} = COALESCE(lines.total, base.{amount}), '
+            f'{paid} = COALESCE(payments.total, 0) '
+            f'FROM {header} AS base '
+            f'LEFT JOIN (SELECT {line_fk} AS header_id, SUM({line_total}) AS total FROM {line} GROUP BY {line_fk}) AS lines '
+            f'ON lines.header_id = base.{pk} '
+            f'LEFT JOIN (SELECT {payment_fk} AS header_id, SUM({payment_amount}) AS total FROM {payment} '
+            f'WHERE {status} IN ({placeholders}) GROUP BY {payment_fk}) AS payments '
+            f'ON payments.header_id = base.{pk} '
+            f'WHERE {header}.{pk} = base.{pk} '
+            f'AND ({header}.{amount} <> COALESCE(lines.total, base.{amount}) OR {header}.{paid} <> COALESCE(payments.total, 0))'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, self.paid_statuses)
+            headers_fixed = cursor.rowcount
+
+        target = self.status_expression(F(self.amount_field), F('paid_amount'))
+        statuses_fixed = (
+            self.header.objects
+            .filter(status__in=self.settled_statuses)
+            .exclude(status=target)
+            .update(status=target)
+        )
+        return {'lines': lines_fixed, 'headers': headers_fixed, 'statuses': statuses_fixed}